@@ -0,0 +1,624 @@
+import argparse
+import json
+import math
+import re
+import sys
+import time
+
+import numpy as np
+
+from irr_solver import STATUS_NAMES, solve_irr
+from quantile_sketch import RunningMoments, StreamSummary
+from result_cache import ResultCache
+
+# Results of earlier runs, keyed by what they depend on
+cache_dir = "../cache"
+
+# Part of every cache key: bump it when a change alters the results for the
+# same inputs and seed, so older cached results aren't reused
+ENGINE_VERSION = 1
+
+# Paths per deal; the calculator page runs PAGE_SIMS
+N_SIMS = 100_000
+PAGE_SIMS = 1000
+
+# Same Year 1 front-load shape as the calculator page (irr/index.html)
+FRONT_LOAD_BASE = [
+    1.8, 1.4, 1.2, 1.0,
+    0.9, 0.8, 0.75, 0.7,
+    0.65, 0.6, 0.55, 0.5,
+]
+FRONT_LOAD_MONTHS = 12
+# Summed left to right like FRONT_LOAD_BASE.reduce, so the weights match to the bit
+FRONT_LOAD_SUM = 0.0
+for _w in FRONT_LOAD_BASE:
+    FRONT_LOAD_SUM += _w
+
+# Initial values of the page's inputs, keyed like its `els` (and its saved
+# irr_calc_data), so a deal saved from the browser loads as it is
+INPUT_DEFAULTS = {
+    "year1Cf": "5000000",
+    "budget100": "25000",
+    "budget50": "25000",
+    "physMfgCost": "0",
+    "physMultiple": "0",
+    "discountRate": "10",
+    "artistSplit": "50",
+    "yearsToMap": "10",
+    "revFactor": "0.0035",
+    "mu": "-10",
+    "sigma": "30",
+    "simSeed": "1",
+}
+
+# Percentiles reported across paths
+PERCENTILES = [5, 50, 95]
+
+# Paths simulated at a time; each chunk is summarized and dropped
+CHUNK_PATHS = 10_000
+
+# The pages' generator (createRandomStream in js/philox.js): Philox4x32-10 multipliers and key increments
+PHILOX_M = (0xD2511F53, 0xCD9E8D57)
+PHILOX_W = (0x9E3779B9, 0xBB67AE85)
+
+_FLOAT_PREFIX = re.compile(r"\s*[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?")
+
+
+def read_float(value, fallback=0.0):
+    """A page input as a number, like readFloat: commas dropped, leading number parsed."""
+    if value is None:
+        return fallback
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _FLOAT_PREFIX.match(str(value).replace(",", "").strip())
+    return float(match.group(0)) if match else fallback
+
+
+def deal_terms(inputs):
+    """The model's terms from page inputs, derived as in runSimulationAndUpdate."""
+    rev_factor = read_float(inputs.get("revFactor"), 0)
+    phys_mfg_cost = read_float(inputs.get("physMfgCost"), 0)
+    return {
+        "year1_revenue": read_float(inputs.get("year1Cf"), 0) * rev_factor,
+        "physical_revenue": phys_mfg_cost * read_float(inputs.get("physMultiple"), 0),
+        "rev_factor": rev_factor,
+        "phys_mfg_cost": phys_mfg_cost,
+        "budget100": read_float(inputs.get("budget100"), 0),
+        "budget50": read_float(inputs.get("budget50"), 0),
+        "years_to_map": max(1, math.floor(read_float(inputs.get("yearsToMap"), 10))),
+        "mu_pct": read_float(inputs.get("mu"), 0),
+        "sigma_pct": read_float(inputs.get("sigma"), 0),
+        "artist_split_pct": read_float(inputs.get("artistSplit"), 50),
+        "discount_rate_pct": read_float(inputs.get("discountRate"), 10),
+    }
+
+
+def year1_base(year1_revenue, physical_revenue, months):
+    """Deterministic front-loaded revenue of the first (up to) 12 months."""
+    return [(year1_revenue + physical_revenue) * (w / FRONT_LOAD_SUM)
+            for w in FRONT_LOAD_BASE[:min(FRONT_LOAD_MONTHS, months)]]
+
+
+def simulate_revenue_paths(year1_revenue, physical_revenue, years_to_map, mu_pct, sigma_pct, n_sims,
+                           rng=None, uniforms=None, antithetic=False):
+    """Monthly revenue of `n_sims` paths as one (n_sims, months) array.
+
+    The same model as simulateRevenuePaths: month 0 is the front-load base
+    with uniform noise, months 1-11 grow by the ratio of the front-load
+    shape, later months by mu / 12, each step drawn uniformly within
+    ±sigma / 12 of its growth, and a path that hits zero stays there.
+
+    Each step's factor 1 + r is drawn for every path at once and the paths
+    are their running products. Draws come from `rng` (a numpy Generator),
+    or `uniforms`, an (n_sims, months) array in [0, 1); given the page's
+    draws, the paths equal the page's bit for bit.
+
+    `rng` is drawn month by month, so a path's draw for a month doesn't
+    depend on the term. With `antithetic`, only half the paths are drawn:
+    the second half mirrors the first (u -> 1 - u), so each pair's noise is
+    opposite around the same trend.
+    """
+    months = years_to_map * 12
+    spread = sigma_pct / 100 / 12
+    base = year1_base(year1_revenue, physical_revenue, months)
+
+    # Expected growth of each step; month 0 is noise around base[0]
+    expected = np.full(months, mu_pct / 100 / 12)
+    expected[0] = 0.0
+    for m in range(1, len(base)):
+        expected[m] = base[m] / base[m - 1] - 1
+    low = expected - spread
+    width = (expected + spread) - low
+
+    if uniforms is not None:
+        paths = np.array(uniforms, dtype=np.float64)
+        if paths.shape != (n_sims, months):
+            raise ValueError(f"uniforms must be ({n_sims}, {months}), not {paths.shape}")
+    else:
+        drawn = (n_sims + 1) // 2 if antithetic else n_sims
+        u = (rng or np.random.default_rng()).random((months, drawn)).T
+        if antithetic:
+            u = np.concatenate([u, 1.0 - u])[:n_sims]
+        paths = np.ascontiguousarray(u)
+
+    # In place: u -> low + width * u -> 1 + r, clamped so a path can't go negative
+    paths *= width
+    paths += low
+    paths += 1.0
+    np.maximum(paths, 0.0, out=paths)
+    paths[:, 0] *= base[0]
+    np.cumprod(paths, axis=1, out=paths)
+    return paths
+
+
+def philox4x32(c0, c1, c2, c3, k0, k1):
+    """Philox4x32-10 blocks for arrays of counter words (uint64 holding uint32 values)."""
+    mask = np.uint64(0xFFFFFFFF)
+    m0, m1 = np.uint64(PHILOX_M[0]), np.uint64(PHILOX_M[1])
+    k0, k1 = np.uint64(k0), np.uint64(k1)
+    for _ in range(10):
+        p0 = c0 * m0
+        p1 = c2 * m1
+        c0, c1, c2, c3 = (p1 >> np.uint64(32)) ^ c1 ^ k0, p1 & mask, (p0 >> np.uint64(32)) ^ c3 ^ k1, p0 & mask
+        k0 = (k0 + np.uint64(PHILOX_W[0])) & mask
+        k1 = (k1 + np.uint64(PHILOX_W[1])) & mask
+    return c0, c1, c2, c3
+
+
+def page_uniforms(seed, n_sims, months, antithetic=True):
+    """The draws the page makes for `seed`, as an (n_sims, months) array for simulate_revenue_paths.
+
+    Path s reads stream s (stream s // 2 with antithetic, odd paths
+    mirrored) of createRandomStream: block i of a stream is Philox4x32-10
+    of counter (i, stream) under the seed, and gives two 53-bit doubles.
+    """
+    seed = int(seed)
+    streams = np.arange(n_sims) // 2 if antithetic else np.arange(n_sims)
+    blocks = (months + 1) // 2
+    index = np.broadcast_to(np.arange(blocks, dtype=np.uint64), (n_sims, blocks))
+    stream = np.broadcast_to(streams.astype(np.uint64)[:, None], (n_sims, blocks))
+    words = philox4x32(index & np.uint64(0xFFFFFFFF), index >> np.uint64(32),
+                       stream & np.uint64(0xFFFFFFFF), stream >> np.uint64(32),
+                       seed & 0xFFFFFFFF, (seed >> 32) & 0xFFFFFFFF)
+    first = ((words[0] >> np.uint64(5)) * np.uint64(1 << 26) + (words[1] >> np.uint64(6))) / float(1 << 53)
+    second = ((words[2] >> np.uint64(5)) * np.uint64(1 << 26) + (words[3] >> np.uint64(6))) / float(1 << 53)
+    u = np.stack([first, second], axis=2).reshape(n_sims, 2 * blocks)[:, :months]
+    if antithetic:
+        u[1::2] = 1.0 - u[1::2]
+    return u
+
+
+def deterministic_path(year1_revenue, physical_revenue, years_to_map, mu_pct):
+    """The base-case monthly path (buildDeterministicMonthlyPath): no noise."""
+    months = years_to_map * 12
+    monthly = year1_base(year1_revenue, physical_revenue, months)
+    factor = 1 + mu_pct / 100 / 12
+    cf = monthly[-1]
+    for _ in range(len(monthly), months):
+        cf = max(cf * factor, 0.0)
+        monthly.append(cf)
+    return np.array(monthly)
+
+
+def annual_totals(monthly):
+    """Sums of each 12-month block of (n, months) values, as (n, years).
+
+    Added month by month across all rows, in the page's order; a partial
+    last year sums the months it has.
+    """
+    n, months = monthly.shape
+    years = -(-months // 12)
+    totals = np.zeros((n, years))
+    for m in range(months):
+        totals[:, m // 12] += monthly[:, m]
+    return totals
+
+
+def first_month(hits):
+    """1-based month of each row's first True, NaN if none."""
+    month = hits.argmax(axis=1) + 1.0
+    month[~hits.any(axis=1)] = np.nan
+    return month
+
+
+class Recoup:
+    """The recoup waterfall (computeRecoupAndIRR) of every revenue path at once.
+
+    Each month the artist accrues artistSplit of revenue against the
+    recoupable budget (budget100 plus half of budget50 and manufacturing).
+    While unrecouped, the label keeps all revenue; in the month the ledger
+    crosses zero the artist is paid the excess, and after that their
+    split. Only the per-path results and the monthly means are kept, so a
+    chunk of paths isn't held in several copies.
+    """
+
+    def __init__(self, revenue, budget100, budget50, phys_mfg_cost, artist_split_pct, discount_rate_pct):
+        revenue = np.atleast_2d(revenue)
+        n, months = revenue.shape
+        outlay = budget100 + budget50 + phys_mfg_cost
+        recoupable = budget100 + 0.5 * (budget50 + phys_mfg_cost)
+        accrued = revenue * (artist_split_pct / 100)
+
+        # The ledger moves by the accrued royalty every month, recouped or not
+        ledger = np.empty((n, months + 1))
+        ledger[:, 0] = -recoupable
+        ledger[:, 1:] = accrued
+        np.cumsum(ledger, axis=1, out=ledger)
+
+        artist_cash = np.where(ledger[:, :-1] < 0, np.maximum(ledger[:, 1:], 0.0), accrued)
+        del accrued
+        label_cf = revenue - artist_cash
+
+        cumulative = np.empty((n, months + 1))
+        cumulative[:, 0] = -outlay
+        cumulative[:, 1:] = label_cf
+        np.cumsum(cumulative, axis=1, out=cumulative)
+
+        self.months = months
+        self.label_payback_month = first_month(cumulative[:, 1:] >= 0)
+        self.artist_payback_month = first_month(artist_cash > 0)
+        del artist_cash
+        self.label_cumulative_mean = cumulative.mean(axis=0)
+        self.artist_ledger_mean = ledger.mean(axis=0)
+        self.final_ledger = ledger[:, -1].copy()
+        del cumulative, ledger
+
+        self.cash_flows = np.empty((n, -(-months // 12) + 1))
+        self.cash_flows[:, 0] = -outlay
+        self.cash_flows[:, 1:] = annual_totals(label_cf)
+        del label_cf
+
+        rate = (discount_rate_pct or 0) / 100
+        self.npv = np.zeros(n)
+        for t in range(self.cash_flows.shape[1]):
+            self.npv += self.cash_flows[:, t] / (1 + rate) ** t
+
+    def irr(self):
+        """IRR of every path's annual cash flows (an irr_solver.IRRResult)."""
+        return solve_irr(self.cash_flows)
+
+    def case(self, i, irr):
+        """Row `i` as computeRecoupAndIRR reports it (paybacks in years, None if never)."""
+        def years(month):
+            return None if np.isnan(month) else float(month) / 12
+
+        return {
+            "irr": _number(irr.irr[i]),
+            "irr_status": STATUS_NAMES[int(irr.status[i])],
+            "npv": _number(self.npv[i]),
+            "label_payback_years": years(self.label_payback_month[i]),
+            "artist_payback_years": years(self.artist_payback_month[i]),
+        }
+
+
+def _number(v):
+    v = float(v)
+    return v if math.isfinite(v) else None
+
+
+def band(summary, columns=None):
+    """p5 / mean / p95 of each stream of a StreamSummary (or its first `columns`)."""
+    p5, p95 = summary.quantile([0.05, 0.95])[:, :columns]
+    return {"p5": p5.tolist(), "mean": summary.mean[:columns].tolist(), "p95": p95.tolist()}
+
+
+def distribution(summary, j, n, units=None):
+    """Percentiles and mean of stream `j` of per-path values; `share` is how many of the `n` paths had one.
+
+    With `units` (RunningMoments over independent units, see
+    antithetic_units), also the mean's standard error `mean_se`.
+    """
+    count = summary.count[j]
+    result = {"share": float(count / n) if n else 0.0}
+    if count:
+        for p, v in zip(PERCENTILES, summary.quantile([p / 100 for p in PERCENTILES])[:, j]):
+            result[f"p{p}"] = float(v)
+        result["mean"] = float(summary.mean[j])
+        if units is not None and units.count[j] > 1:
+            result["mean_se"] = float(np.sqrt(units.variance()[j] / units.count[j]))
+    return result
+
+
+def seed_sequence(seed):
+    """A run's root SeedSequence: `seed` itself if it is one, else SeedSequence(seed) (fresh entropy for None)."""
+    return seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+
+
+def chunk_rng(root, index):
+    """Philox generator for chunk `index` of a run.
+
+    Philox is counter-based: each chunk's stream is keyed by the root's
+    entropy and spawn key plus the chunk index, so chunks (or sweep points)
+    can be drawn in any order, on any worker, and still be the same.
+    """
+    return np.random.Generator(np.random.Philox(
+        np.random.SeedSequence(root.entropy, spawn_key=tuple(root.spawn_key) + (index,))))
+
+
+def antithetic_units(values, antithetic):
+    """Independent units of a chunk's per-path values, for standard errors.
+
+    Antithetic pairs (path i and i + ceil(n / 2)) are negatively
+    correlated, so each pair's mean is one unit; otherwise each path is.
+    NaN values are left out of their pair's mean.
+    """
+    if not antithetic:
+        return values
+    half = (len(values) + 1) // 2
+    pairs = np.full((2,) + (half,) + values.shape[1:], np.nan)
+    pairs[0] = values[:half]
+    pairs[1, :len(values) - half] = values[half:]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.nansum(pairs, axis=0) / (~np.isnan(pairs)).sum(axis=0)
+
+
+# Per-path results sketched across paths, in StreamSummary column order
+PATH_RESULTS = ["irr", "npv", "label_payback_months", "artist_payback_months"]
+
+
+def run(terms, n_sims=N_SIMS, seed=None, uniforms=None, chunk=CHUNK_PATHS, antithetic=False):
+    """Simulate one deal and summarize it as the page does, plus per-path results.
+
+    Paths are simulated `chunk` at a time. Each chunk goes through the
+    recoup waterfall and the IRR solver, is folded into quantile sketches
+    and running moments (quantile_sketch.py), and is dropped, so memory
+    depends on the term and the chunk, not on `n_sims`. Percentiles are
+    t-digest estimates (well within 0.1% in rank); means are exact.
+
+    `seed` is an int or a SeedSequence; each chunk draws from its own
+    Philox stream under it (chunk_rng), so a seed, `n_sims` and `chunk`
+    reproduce a run exactly. Runs of other deal terms with the same seed
+    share their draws (common random numbers), so their difference is the
+    terms, not sampling noise. `antithetic` mirrors half of each chunk's
+    paths (simulate_revenue_paths), which narrows the standard error of
+    the mean IRR and NPV for the same number of paths.
+
+    Returns a JSON-able dict: the base, P5-path and P95-path cases the
+    page shows, the Year 1 monthly and annual revenue bands, and, over all
+    paths, IRR (with how many paths had none), NPV, label and artist
+    payback months and the share of paths that recoup within the term.
+    """
+    if terms["year1_revenue"] + terms["physical_revenue"] <= 0:
+        raise ValueError("Enter Year 1 streams or physical goods data to run the forecast.")
+    started = time.perf_counter()
+    root = seed_sequence(seed)
+    antithetic = antithetic and uniforms is None
+    if antithetic:
+        chunk += chunk % 2
+    years = terms["years_to_map"]
+    months = years * 12
+    waterfall = (terms["budget100"], terms["budget50"], terms["phys_mfg_cost"],
+                 terms["artist_split_pct"], terms["discount_rate_pct"])
+
+    monthly = StreamSummary(months)
+    annual = StreamSummary(years)
+    per_path = StreamSummary(len(PATH_RESULTS))
+    # IRR and NPV over independent units, for the means' standard errors
+    units = RunningMoments(2)
+    label_cumulative = np.zeros(months + 1)
+    artist_ledger = np.zeros(months + 1)
+    irr_status = dict.fromkeys(STATUS_NAMES.values(), 0)
+    recouped = 0
+    timing = dict.fromkeys(["simulate_s", "recoup_s", "irr_s", "summarize_s"], 0.0)
+
+    for offset in range(0, n_sims, chunk):
+        k = min(chunk, n_sims - offset)
+        t0 = time.perf_counter()
+        paths = simulate_revenue_paths(terms["year1_revenue"], terms["physical_revenue"], years,
+                                       terms["mu_pct"], terms["sigma_pct"], k, rng=chunk_rng(root, offset // chunk),
+                                       uniforms=None if uniforms is None else uniforms[offset:offset + k],
+                                       antithetic=antithetic)
+        t1 = time.perf_counter()
+        recoup = Recoup(paths, *waterfall)
+        t2 = time.perf_counter()
+        path_irr = recoup.irr()
+        t3 = time.perf_counter()
+
+        monthly.add(paths)
+        annual.add(annual_totals(paths))
+        values = np.column_stack([path_irr.solved(), recoup.npv,
+                                  recoup.label_payback_month, recoup.artist_payback_month])
+        per_path.add(values)
+        units.add(antithetic_units(values[:, :2], antithetic))
+        label_cumulative += recoup.label_cumulative_mean * k
+        artist_ledger += recoup.artist_ledger_mean * k
+        for name, count in path_irr.counts().items():
+            irr_status[name] += count
+        recouped += int(np.count_nonzero(~np.isnan(recoup.label_payback_month)))
+        del paths, recoup
+        t4 = time.perf_counter()
+        for key, seconds in zip(timing, (t1 - t0, t2 - t1, t3 - t2, t4 - t3)):
+            timing[key] += seconds
+
+    # The page's three cases: the no-noise path and the monthly P5 / P95 paths
+    p5_path, p95_path = monthly.quantile([0.05, 0.95])
+    base = deterministic_path(terms["year1_revenue"], terms["physical_revenue"], years, terms["mu_pct"])
+    cases = Recoup(np.vstack([base, p5_path, p95_path]), *waterfall)
+    irr = cases.irr()
+
+    result = {
+        "terms": terms,
+        "sims": n_sims,
+        # Pass as `seed` (with the spawn key, if any) to reproduce the run
+        "seed": root.entropy,
+        "spawn_key": list(root.spawn_key),
+        "antithetic": antithetic,
+        "base": cases.case(0, irr),
+        "p5": cases.case(1, irr),
+        "p95": cases.case(2, irr),
+        "year1_monthly": band(monthly, FRONT_LOAD_MONTHS),
+        "annual": band(annual),
+        "paths": {
+            "irr": distribution(per_path, 0, n_sims, units),
+            "irr_status": irr_status,
+            "npv": distribution(per_path, 1, n_sims, units),
+            "label_payback_months": distribution(per_path, 2, n_sims),
+            "artist_payback_months": distribution(per_path, 3, n_sims),
+            "recoup_probability": recouped / n_sims if n_sims else 0.0,
+        },
+        "label_cumulative_mean": (label_cumulative / max(1, n_sims)).tolist(),
+        "artist_ledger_mean": (artist_ledger / max(1, n_sims)).tolist(),
+    }
+    result["timing"] = {key: round(seconds, 4) for key, seconds in timing.items()}
+    result["timing"]["total_s"] = round(time.perf_counter() - started, 4)
+    return result
+
+
+def run_payload(terms, n_sims, seed, chunk=CHUNK_PATHS, antithetic=False):
+    """Everything run() with these arguments (and no `uniforms`) depends on, as a ResultCache key."""
+    root = seed_sequence(seed)
+    return {"engine": ENGINE_VERSION, "terms": terms, "sims": n_sims, "seed": root.entropy,
+            "spawn_key": list(root.spawn_key), "chunk": chunk, "antithetic": antithetic}
+
+
+def page_payload(terms, seed):
+    """The ResultCache key of a replay of the page's paths for `seed`."""
+    return {"engine": ENGINE_VERSION, "terms": terms, "page_seed": seed}
+
+
+def format_money(v):
+    if v is None:
+        return "–"
+    return ("-$" if v < 0 else "$") + f"{abs(v):,.0f}"
+
+
+def format_pct(v):
+    return "–" if v is None else f"{v * 100:.1f}%"
+
+
+def format_months(d, key):
+    return "–" if key not in d else f"{d[key]:.0f}"
+
+
+def format_ci(d, fmt):
+    """Half-width of the 95% confidence interval on the mean, if known."""
+    return "" if "mean_se" not in d else f" ±{fmt(1.96 * d['mean_se'])}"
+
+
+def format_pct_fine(v):
+    return f"{v * 100:.3f}%"
+
+
+def print_summary(result):
+    timing = result["timing"]
+    print(f"{result['sims']:,} paths over {result['terms']['years_to_map']} years "
+          + (f"from the cache (the run took {timing['total_s']:.2f}s)" if result.get("cached") else
+             f"in {timing['total_s']:.2f}s (simulate {timing['simulate_s']:.2f}s, recoup {timing['recoup_s']:.2f}s, "
+             f"IRR {timing['irr_s']:.2f}s, summarize {timing['summarize_s']:.2f}s)"))
+    print(f"  {'case':<10} {'IRR':>8} {'NPV':>16} {'label payback':>14} {'artist payback':>15}")
+    for key, label in [("base", "Base"), ("p5", "P5 path"), ("p95", "P95 path")]:
+        case = result[key]
+        paybacks = ["–" if y is None else f"{y:.2f} yrs" for y in
+                    (case["label_payback_years"], case["artist_payback_years"])]
+        print(f"  {label:<10} {format_pct(case['irr']):>8} {format_money(case['npv']):>16} "
+              f"{paybacks[0]:>14} {paybacks[1]:>15}")
+
+    paths = result["paths"]
+    irr, npv = paths["irr"], paths["npv"]
+    print("Across paths:")
+    print(f"  IRR            p5 {format_pct(irr.get('p5')):>14}  p50 {format_pct(irr.get('p50')):>14}  "
+          f"p95 {format_pct(irr.get('p95')):>14}  mean {format_pct(irr.get('mean'))}{format_ci(irr, format_pct_fine)}")
+    unsolved = {k: v for k, v in paths["irr_status"].items() if k != "solved" and v}
+    if unsolved:
+        print("  IRR            " + ", ".join(f"{v:,} paths {k}" for k, v in unsolved.items()))
+    print(f"  NPV            p5 {format_money(npv.get('p5')):>14}  p50 {format_money(npv.get('p50')):>14}  "
+          f"p95 {format_money(npv.get('p95')):>14}  mean {format_money(npv.get('mean'))}{format_ci(npv, format_money)}")
+    for key, label in [("label_payback_months", "Label payback"), ("artist_payback_months", "Artist payback")]:
+        d = paths[key]
+        print(f"  {label:<14} p5 {format_months(d, 'p5'):>10} mo  p50 {format_months(d, 'p50'):>10} mo  "
+              f"p95 {format_months(d, 'p95'):>10} mo  ({d['share']:.1%} of paths)")
+    print(f"  Recoup within term: {paths['recoup_probability']:.1%}")
+
+
+def load_inputs(path):
+    """Page inputs from a saved deal: the irr_calc_data JSON the page keeps in localStorage."""
+    inputs = dict(INPUT_DEFAULTS)
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            inputs.update(json.load(f))
+    return inputs
+
+
+# CLI option -> page input it overrides
+INPUT_OPTIONS = {
+    "year1_streams": "year1Cf",
+    "rev_factor": "revFactor",
+    "budget100": "budget100",
+    "budget50": "budget50",
+    "phys_mfg_cost": "physMfgCost",
+    "phys_multiple": "physMultiple",
+    "years": "yearsToMap",
+    "mu": "mu",
+    "sigma": "sigma",
+    "artist_split": "artistSplit",
+    "discount_rate": "discountRate",
+}
+
+
+def add_input_arguments(parser):
+    parser.add_argument("--inputs", metavar="JSON",
+                        help="saved deal (the page's irr_calc_data); missing inputs take the page's defaults")
+    for option, key in INPUT_OPTIONS.items():
+        parser.add_argument("--" + option.replace("_", "-"), dest=option, metavar="N",
+                            help=f"override {key} (default {INPUT_DEFAULTS[key]})")
+
+
+def inputs_from_args(args):
+    inputs = load_inputs(args.inputs)
+    for option, key in INPUT_OPTIONS.items():
+        if getattr(args, option) is not None:
+            inputs[key] = getattr(args, option)
+    return inputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo revenue, recoup and IRR for one deal.")
+    add_input_arguments(parser)
+    parser.add_argument("--sims", type=int, default=N_SIMS, help=f"paths to simulate (default {N_SIMS:,})")
+    parser.add_argument("--seed", type=int, help="seed for reproducible paths (default: fresh, and printed)")
+    parser.add_argument("--antithetic", action="store_true",
+                        help="draw half the paths and mirror them, for tighter mean IRR / NPV")
+    parser.add_argument("--chunk", type=int, default=CHUNK_PATHS,
+                        help=f"paths held in memory at a time (default {CHUNK_PATHS:,})")
+    parser.add_argument("--page", action="store_true",
+                        help=f"replay the page's own {PAGE_SIMS:,} paths for the deal's Simulation Seed (or --seed)")
+    parser.add_argument("--json", metavar="PATH", help="also write the full result as JSON")
+    parser.add_argument("--no-cache", action="store_true", help=f"always simulate; don't read or write {cache_dir}")
+    args = parser.parse_args()
+
+    try:
+        inputs = inputs_from_args(args)
+        terms = deal_terms(inputs)
+        cache = None if args.no_cache else ResultCache(cache_dir)
+        if args.page:
+            seed = args.seed if args.seed is not None else read_float(inputs.get("simSeed"), math.nan)
+            if math.isnan(seed):
+                raise ValueError("the deal has no Simulation Seed (the page drew a fresh one); pass --seed")
+            seed = abs(math.floor(seed))
+
+            def compute():
+                return run(terms, PAGE_SIMS, uniforms=page_uniforms(seed, PAGE_SIMS, terms["years_to_map"] * 12))
+            payload = page_payload(terms, seed)
+        else:
+            # Drawn here rather than in run() so the result is cached under it
+            seed = args.seed if args.seed is not None else np.random.SeedSequence().entropy
+            chunk = max(1, args.chunk)
+
+            def compute():
+                return run(terms, args.sims, seed, chunk=chunk, antithetic=args.antithetic)
+            payload = run_payload(terms, args.sims, seed, chunk, args.antithetic)
+        result = cache.fetch(payload, compute) if cache else compute()
+        print_summary(result)
+        if args.seed is None and not args.page:
+            print(f"Seed {result['seed']} (pass --seed {result['seed']} to rerun these paths)")
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(result, f, indent=1)
+            print(f"Wrote {args.json}")
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import numpy as np
+
+# Rate range searched for a root, as in the page's computeIRR
+IRR_LOW = -0.99
+IRR_HIGH = 5.0
+
+# Outcome of each row
+SOLVED = 0
+NO_ROOT = 1          # NPV doesn't change sign over [low, high]
+MULTIPLE = 2         # solved, but NPV has more than one root in range; the one nearest 0% is reported
+NOT_CONVERGED = 3    # ran out of iterations; `irr` is the last estimate
+
+STATUS_NAMES = {SOLVED: "solved", NO_ROOT: "no root", MULTIPLE: "multiple roots", NOT_CONVERGED: "not converged"}
+
+# Rates sampled to find the roots of rows that may have several
+SCAN_POINTS = 64
+
+
+def sign_changes(cf):
+    """Sign changes between the nonzero cash flows of each row.
+
+    By Descartes' rule of signs this bounds the number of IRRs above
+    -100%: one change (an outlay, then returns) means exactly one.
+    """
+    count = np.zeros(len(cf), dtype=np.int64)
+    last = np.zeros(len(cf))
+    for t in range(cf.shape[1]):
+        s = np.sign(cf[:, t])
+        count += (s != 0) & (last != 0) & (s != last)
+        last = np.where(s != 0, s, last)
+    return count
+
+
+def npv_and_slope(cf, rate):
+    """NPV of each row at its `rate`, and dNPV/drate.
+
+    NPV is a polynomial in x = 1 / (1 + rate), evaluated with its
+    derivative by Horner's rule: one multiply-add per cash flow, no pow.
+    """
+    x = 1.0 / (1.0 + rate)
+    p = cf[:, -1].copy()
+    dp = np.zeros_like(p)
+    for t in range(cf.shape[1] - 2, -1, -1):
+        dp = dp * x + p
+        p = p * x + cf[:, t]
+    return p, -x * x * dp
+
+
+class IRRResult:
+    """IRR of each row, with how it was found."""
+
+    def __init__(self, n):
+        self.irr = np.full(n, np.nan)
+        self.status = np.full(n, NO_ROOT, dtype=np.int8)
+        # Roots seen in [low, high]: 1 for a well-behaved deal
+        self.roots = np.zeros(n, dtype=np.int64)
+        self.iterations = np.zeros(n, dtype=np.int64)
+
+    def solved(self):
+        """`irr`, with NaN for the rows that don't have one (neither SOLVED nor MULTIPLE)."""
+        return np.where((self.status == SOLVED) | (self.status == MULTIPLE), self.irr, np.nan)
+
+    def counts(self):
+        return {STATUS_NAMES[s]: int(np.count_nonzero(self.status == s)) for s in STATUS_NAMES}
+
+    def report(self):
+        counts = self.counts()
+        return ", ".join(f"{v:,} {k}" for k, v in counts.items() if v) or "no rows"
+
+
+def solve_irr(cash_flows, low=IRR_LOW, high=IRR_HIGH, tol=1e-12, max_iter=100):
+    """IRR of every row of `cash_flows` (periods along the rows), solved together.
+
+    Each row is bracketed first. With one sign change in its cash flows
+    the root is unique, and [low, high] is the bracket if NPV changes sign
+    across it. Otherwise NPV is sampled at SCAN_POINTS rates to count the
+    roots in range and bracket the one nearest 0%. Then all rows take safeguarded
+    Newton steps on the analytic derivative at once. A row whose step
+    would leave its bracket, or isn't at least halving, bisects instead,
+    so every row converges as surely as bisection and most in a handful
+    of steps.
+
+    Returns an IRRResult; rows without a root are NaN with status NO_ROOT,
+    where computeIRR returned null.
+    """
+    cf = np.atleast_2d(np.asarray(cash_flows, dtype=np.float64))
+    n, periods = cf.shape
+    result = IRRResult(n)
+    if periods < 2 or n == 0:
+        return result
+
+    a = np.full(n, low)
+    b = np.full(n, high)
+    fa = npv_and_slope(cf, a)[0]
+    fb = npv_and_slope(cf, b)[0]
+    changes = sign_changes(cf)
+    result.roots[changes == 1] = (fa * fb <= 0)[changes == 1]
+
+    several = np.flatnonzero(changes > 1)
+    if len(several):
+        rates = np.expm1(np.linspace(np.log1p(low), np.log1p(high), SCAN_POINTS))
+        rates[0], rates[-1] = low, high
+        sub = cf[several]
+        values = np.empty((len(several), SCAN_POINTS))
+        for g, rate in enumerate(rates):
+            values[:, g] = npv_and_slope(sub, np.full(len(several), rate))[0]
+        s = np.sign(values)
+        crossing = (s[:, :-1] * s[:, 1:] < 0) | (s[:, :-1] == 0)
+        crossing[:, -1] |= s[:, -1] == 0
+        result.roots[several] = crossing.sum(axis=1)
+        distance = np.where(crossing, np.abs(rates[:-1] + rates[1:]), np.inf)
+        nearest = distance.argmin(axis=1)
+        rows = np.arange(len(several))
+        a[several] = rates[nearest]
+        b[several] = rates[nearest + 1]
+        fa[several] = values[rows, nearest]
+
+    result.status[result.roots > 0] = NOT_CONVERGED
+    active = np.flatnonzero(result.roots > 0)
+    at_low = active[fa[active] == 0]
+    result.irr[at_low] = a[at_low]
+    result.status[at_low] = SOLVED
+    active = active[fa[active] != 0]
+
+    a, b, fa = a[active], b[active], fa[active]
+    sub = cf[active]
+    # Most deals return somewhere near 10%; start there if it's in the bracket
+    r = np.where((a < 0.1) & (0.1 < b), 0.1, (a + b) / 2)
+    last_step = b - a
+    for i in range(1, max_iter + 1):
+        if not len(active):
+            break
+        f, df = npv_and_slope(sub, r)
+        same = np.sign(f) == np.sign(fa)
+        a = np.where(same, r, a)
+        fa = np.where(same, f, fa)
+        b = np.where(same, b, r)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = f / df
+        newton = r - step
+        bisect = (~np.isfinite(newton) | (newton <= a) | (newton >= b)
+                  | (np.abs(step) > 0.5 * np.abs(last_step)))
+        r_next = np.where(bisect, (a + b) / 2, newton)
+        last_step = r_next - r
+
+        scale = tol * (1 + np.abs(r_next))
+        done = (f == 0) | (np.abs(last_step) <= scale) | (b - a <= scale)
+        if done.any():
+            rows = active[done]
+            result.irr[rows] = np.where(f[done] == 0, r[done], r_next[done])
+            result.status[rows] = SOLVED
+            result.iterations[rows] = i
+        keep = ~done
+        active, sub = active[keep], sub[keep]
+        a, b, fa, r, last_step = a[keep], b[keep], fa[keep], r_next[keep], last_step[keep]
+
+    result.irr[active] = r
+    result.iterations[active] = max_iter
+    result.status[(result.status == SOLVED) & (result.roots > 1)] = MULTIPLE
+    return result
@@ -0,0 +1,248 @@
+import argparse
+import csv
+import itertools
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import irr_engine
+from result_cache import ResultCache
+
+output_path = "../sweep.csv"
+
+# Fewer paths per point than a single run: a sweep compares hundreds of points
+SWEEP_SIMS = 20_000
+
+# Inputs a sweep can vary (irr_engine CLI options); the rest stay single values
+SWEEPABLE = ["mu", "sigma", "artist_split", "budget100", "budget50", "phys_multiple", "years"]
+
+# Columns written per grid point, after the swept inputs. Payback
+# percentiles are over the paths that pay back within the term.
+METRICS = [
+    "base_irr",
+    "irr_p5", "irr_p50", "irr_p95", "irr_mean", "irr_mean_se", "irr_solved",
+    "npv_p5", "npv_p50", "npv_p95", "npv_mean", "npv_mean_se",
+    "label_payback_p5", "label_payback_p50", "label_payback_p95",
+    "artist_payback_p50",
+    "recoup_probability",
+]
+
+# Metrics written as heatmaps over two swept inputs
+HEATMAP_METRICS = ["irr_p50", "irr_p5", "label_payback_p50", "recoup_probability"]
+
+
+def parse_values(text):
+    """An option's values: `a` alone, a list `a,b,c`, or an inclusive range `start:stop:step`."""
+    text = str(text).replace(" ", "")
+    if ":" in text:
+        parts = text.split(":")
+        if len(parts) != 3:
+            raise ValueError(f"a range is start:stop:step, not {text!r}")
+        start, stop, step = (irr_engine.read_float(p, math.nan) for p in parts)
+        if any(math.isnan(v) for v in (start, stop, step)) or step == 0 or (stop - start) / step < 0:
+            raise ValueError(f"bad range {text!r}")
+        count = math.floor((stop - start) / step + 1e-9) + 1
+        # Rounded so 0.1 steps read as 0.3, not 0.30000000000000004
+        return [round(start + i * step, 10) for i in range(count)]
+    return [v for v in text.split(",") if v]
+
+
+def grid(base_inputs, axes):
+    """Every combination of the swept values, as (point, page inputs) pairs.
+
+    `axes` maps an irr_engine CLI option to its values; the point is those
+    values by option, in the order given.
+    """
+    options = list(axes)
+    for values in itertools.product(*(axes[o] for o in options)):
+        point = dict(zip(options, values))
+        inputs = dict(base_inputs)
+        for option, value in point.items():
+            inputs[irr_engine.INPUT_OPTIONS[option]] = value
+        yield point, inputs
+
+
+def run_point(job):
+    """Simulate one grid point and reduce the engine's result to METRICS."""
+    index, point, inputs, n_sims, seed, crn, antithetic, cache = job
+    # With common random numbers every point replays the sweep's own draws;
+    # otherwise each gets its own stream, derived from the seed and its index
+    point_seed = np.random.SeedSequence(seed) if crn else np.random.SeedSequence(seed, spawn_key=(index,))
+    try:
+        terms = irr_engine.deal_terms(inputs)
+
+        def compute():
+            return irr_engine.run(terms, n_sims, point_seed, antithetic=antithetic)
+        if cache:
+            result = ResultCache(cache).fetch(
+                irr_engine.run_payload(terms, n_sims, point_seed, antithetic=antithetic), compute)
+        else:
+            result = compute()
+    except ValueError as e:
+        return dict(point, error=str(e))
+    paths = result["paths"]
+    irr, npv = paths["irr"], paths["npv"]
+    label, artist = paths["label_payback_months"], paths["artist_payback_months"]
+    row = dict(point)
+    row.update({
+        "base_irr": result["base"]["irr"],
+        "irr_p5": irr.get("p5"), "irr_p50": irr.get("p50"), "irr_p95": irr.get("p95"),
+        "irr_mean": irr.get("mean"), "irr_mean_se": irr.get("mean_se"), "irr_solved": irr["share"],
+        "npv_p5": npv.get("p5"), "npv_p50": npv.get("p50"), "npv_p95": npv.get("p95"), "npv_mean": npv.get("mean"),
+        "npv_mean_se": npv.get("mean_se"),
+        "label_payback_p5": label.get("p5"), "label_payback_p50": label.get("p50"),
+        "label_payback_p95": label.get("p95"),
+        "artist_payback_p50": artist.get("p50"),
+        "recoup_probability": paths["recoup_probability"],
+    })
+    return row
+
+
+def sweep(base_inputs, axes, n_sims=SWEEP_SIMS, seed=None, jobs=None, progress=None, crn=False, antithetic=False,
+          cache=None):
+    """Run every grid point across a process pool; returns one row per point, in grid order.
+
+    Without a `seed` one is drawn, so all points still derive from a
+    single root. With `crn`, every point draws the same paths. `cache` is
+    a ResultCache directory shared by the workers.
+    """
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    todo = [(i, point, inputs, n_sims, seed, crn, antithetic, cache)
+            for i, (point, inputs) in enumerate(grid(base_inputs, axes))]
+    jobs = jobs or os.cpu_count() or 1
+    if jobs > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = pool.map(run_point, todo, chunksize=max(1, len(todo) // (jobs * 8)))
+            rows = []
+            for row in results:
+                rows.append(row)
+                if progress:
+                    progress(len(rows), len(todo))
+    else:
+        rows = []
+        for job in todo:
+            rows.append(run_point(job))
+            if progress:
+                progress(len(rows), len(todo))
+    return rows
+
+
+def _cell(v):
+    if v is None or (isinstance(v, float) and math.isnan(v)):
+        return ""
+    return v
+
+
+def write_table(path, options, rows):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(options + METRICS + ["error"])
+        for row in rows:
+            writer.writerow([_cell(row.get(k)) for k in options + METRICS + ["error"]])
+
+
+def write_heatmap(path, metric, options, axes, rows, x, y):
+    """`metric` over `x` (rows) by `y` (columns), one block per combination of the other inputs."""
+    others = [o for o in options if o not in (x, y)]
+    by_point = {tuple(row[o] for o in options): row for row in rows}
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        for fixed in itertools.product(*(axes[o] for o in others)):
+            if others:
+                writer.writerow([", ".join(f"{o}={v}" for o, v in zip(others, fixed))])
+            writer.writerow([f"{x} \\ {y}"] + axes[y])
+            for xv in axes[x]:
+                cells = []
+                for yv in axes[y]:
+                    values = dict(zip(others, fixed), **{x: xv, y: yv})
+                    cells.append(_cell(by_point[tuple(values[o] for o in options)].get(metric)))
+                writer.writerow([xv] + cells)
+            writer.writerow([])
+
+
+def heatmap_path(path, metric):
+    root, ext = os.path.splitext(path)
+    return f"{root}-{metric}{ext or '.csv'}"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the IRR Monte Carlo over a grid of deal terms.",
+        epilog="Swept options take a list (20,30,40) or an inclusive range (--mu=-20:0:5). "
+               f"Sweepable: {', '.join('--' + o.replace('_', '-') for o in SWEEPABLE)}.")
+    irr_engine.add_input_arguments(parser)
+    parser.add_argument("--sims", type=int, default=SWEEP_SIMS, help=f"paths per grid point (default {SWEEP_SIMS:,})")
+    parser.add_argument("--seed", type=int, help="seed for reproducible sweeps (default: fresh, and printed)")
+    parser.add_argument("--crn", action="store_true",
+                        help="common random numbers: every point draws the same paths, so points differ only by their terms")
+    parser.add_argument("--antithetic", action="store_true", help="mirror half of each point's paths")
+    parser.add_argument("--no-cache", action="store_true",
+                        help=f"always simulate; don't read or write {irr_engine.cache_dir}")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--output", default=output_path, help="CSV with one row per grid point")
+    parser.add_argument("--heatmap", nargs=2, metavar=("ROWS", "COLUMNS"),
+                        help="swept inputs to lay out the heatmaps over (default: the first two swept)")
+    args = parser.parse_args()
+
+    try:
+        axes = {}
+        for option in irr_engine.INPUT_OPTIONS:
+            value = getattr(args, option)
+            if value is None:
+                continue
+            values = parse_values(value)
+            if len(values) > 1 and option not in SWEEPABLE:
+                raise ValueError(f"--{option.replace('_', '-')} can't be swept")
+            if len(values) > 1:
+                axes[option] = values
+        if not axes:
+            raise ValueError("give at least one input a list or range of values to sweep")
+        # Single values override the base deal like they do in irr_engine.py
+        base_inputs = irr_engine.inputs_from_args(args)
+        options = list(axes)
+        points = math.prod(len(v) for v in axes.values())
+
+        heatmap = args.heatmap or (options[:2] if len(options) >= 2 else None)
+        if heatmap:
+            heatmap = [h.replace("-", "_") for h in heatmap]
+            for h in heatmap:
+                if h not in axes:
+                    raise ValueError(f"--heatmap: {h} isn't swept")
+
+        seed = args.seed if args.seed is not None else np.random.SeedSequence().entropy
+        print(f"Sweeping {points:,} points ({' x '.join(f'{o} {len(axes[o])}' for o in options)}) "
+              f"at {args.sims:,} paths each on {args.jobs} workers, seed {seed}")
+        start = time.perf_counter()
+
+        def progress(done, total):
+            if done == total or done % max(1, total // 10) == 0:
+                elapsed = time.perf_counter() - start
+                print(f"  {done:,}/{total:,} points, {elapsed:.1f}s", flush=True)
+
+        rows = sweep(base_inputs, axes, args.sims, seed, args.jobs, progress, args.crn, args.antithetic,
+                     None if args.no_cache else irr_engine.cache_dir)
+        elapsed = time.perf_counter() - start
+
+        write_table(args.output, options, rows)
+        written = [args.output]
+        if heatmap:
+            for metric in HEATMAP_METRICS:
+                path = heatmap_path(args.output, metric)
+                write_heatmap(path, metric, options, axes, rows, *heatmap)
+                written.append(path)
+        failed = sum(1 for row in rows if row.get("error"))
+        print(f"Ran {len(rows):,} points in {elapsed:.1f}s ({len(rows) / elapsed:.1f} points/s)"
+              + (f"; {failed:,} had no forecast (see the error column)" if failed else ""))
+        print("Wrote " + ", ".join(written))
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import numpy as np
+
+# Centroids per stream are at most COMPRESSION / 2 + 1; larger is more accurate
+COMPRESSION = 200
+
+
+class RunningMoments:
+    """Count, mean and variance of each of `width` columns, updated batch by batch.
+
+    Batches merge with Chan et al.'s pairwise update, so the result
+    doesn't depend on how the rows were split. NaN values are skipped.
+    """
+
+    def __init__(self, width):
+        self.count = np.zeros(width)
+        self.mean = np.zeros(width)
+        self.m2 = np.zeros(width)
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64).reshape(-1, len(self.mean))
+        valid = ~np.isnan(values)
+        n = valid.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            batch_mean = np.where(valid, values, 0.0).sum(axis=0) / n
+            batch_m2 = (np.where(valid, values - batch_mean, 0.0) ** 2).sum(axis=0)
+            total = self.count + n
+            delta = batch_mean - self.mean
+            self.mean = np.where(n > 0, self.mean + delta * n / total, self.mean)
+            self.m2 = np.where(n > 0, self.m2 + batch_m2 + delta * delta * self.count * n / total, self.m2)
+        self.count = total
+
+    def variance(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.count > 1, self.m2 / (self.count - 1), np.nan)
+
+
+class TDigest:
+    """t-digests of `width` independent streams (e.g. one per month), updated together.
+
+    Each stream is summarized by weighted centroids, grouped along the k1
+    scale function: groups stay small near the tails, where p5 and p95 are
+    read, and coarse in the middle. A batch is sorted, grouped the same
+    way and merged into the running centroids. Memory is O(width * COMPRESSION) no
+    matter how many values are added. NaN values are skipped.
+    """
+
+    def __init__(self, width, compression=COMPRESSION):
+        self.width = width
+        self.compression = compression
+        self.buckets = compression // 2 + 1
+        self.means = np.empty((width, 0))
+        self.weights = np.empty((width, 0))
+        self.min = np.full(width, np.inf)
+        self.max = np.full(width, -np.inf)
+
+    def add(self, values):
+        """Fold in a (rows, width) batch."""
+        values = np.sort(np.asarray(values, dtype=np.float64).reshape(-1, self.width).T, axis=1)
+        n = values.shape[1]
+        if not n:
+            return
+        if np.isnan(values[:, -1]).any():
+            # NaN sorts last; it gets no weight and so never moves a centroid
+            valid = ~np.isnan(values)
+            if valid.any():
+                self.min = np.minimum(self.min, np.where(valid, values, np.inf).min(axis=1))
+                self.max = np.maximum(self.max, np.where(valid, values, -np.inf).max(axis=1))
+            self._merge(values, valid.astype(np.float64))
+            return
+
+        # Every stream has n values: group the sorted batch by rank once for all
+        # of them, then merge that small digest into the running one
+        bucket = self._bucket((np.arange(n) + 0.5) / n)
+        starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+        counts = np.diff(np.r_[starts, n]).astype(np.float64)
+        self.min = np.minimum(self.min, values[:, 0])
+        self.max = np.maximum(self.max, values[:, -1])
+        self._merge(np.add.reduceat(values, starts, axis=1) / counts,
+                    np.broadcast_to(counts, (self.width, len(counts))))
+
+    def _bucket(self, q):
+        """Group of each quantile: the integer part of k1(q) = compression / 2pi * asin(2q - 1), shifted to start at 0."""
+        bucket = np.floor(self.compression / 2 * (np.arcsin(2 * q - 1) / np.pi + 0.5)).astype(np.int64)
+        return np.minimum(bucket, self.buckets - 1)
+
+    def _merge(self, means, weights):
+        """Regroup the centroids together with weighted points (each row sorted)."""
+        means = np.concatenate([self.means, means], axis=1)
+        weights = np.concatenate([self.weights, weights], axis=1)
+        # Two sorted runs: a stable sort merges them in linear time
+        order = np.argsort(np.where(weights > 0, means, np.inf), axis=1, kind="stable")
+        means = np.take_along_axis(means, order, axis=1)
+        weights = np.take_along_axis(weights, order, axis=1)
+
+        total = weights.sum(axis=1, keepdims=True)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            q = (np.cumsum(weights, axis=1) - weights / 2) / total
+        bucket = self._bucket(np.clip(np.nan_to_num(q), 0.0, 1.0))
+
+        ids = (bucket + np.arange(self.width)[:, None] * self.buckets).ravel()
+        size = self.width * self.buckets
+        w = np.bincount(ids, weights=weights.ravel(), minlength=size)
+        s = np.bincount(ids, weights=(np.where(weights > 0, means, 0.0) * weights).ravel(), minlength=size)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.means = np.where(w > 0, s / w, np.inf).reshape(self.width, self.buckets)
+        self.weights = w.reshape(self.width, self.buckets)
+
+    def count(self):
+        return self.weights.sum(axis=1)
+
+    def quantile(self, qs):
+        """Values at quantiles `qs` of every stream, as (len(qs), width); NaN for an empty stream.
+
+        Interpolates linearly between centroid centers, and between the
+        outer centroids and the stream's min and max.
+        """
+        qs = np.atleast_1d(np.asarray(qs, dtype=np.float64))
+        result = np.full((len(qs), self.width), np.nan)
+        for j in range(self.width):
+            keep = self.weights[j] > 0
+            if not keep.any():
+                continue
+            w = self.weights[j][keep]
+            total = w.sum()
+            centers = np.cumsum(w) - w / 2
+            x = np.concatenate([[0.0], centers, [total]])
+            y = np.concatenate([[self.min[j]], self.means[j][keep], [self.max[j]]])
+            result[:, j] = np.interp(qs * total, x, y)
+        return result
+
+
+class StreamSummary:
+    """Quantile sketch and moments of `width` streams, fed the same batches."""
+
+    def __init__(self, width, compression=COMPRESSION):
+        self.digest = TDigest(width, compression)
+        self.moments = RunningMoments(width)
+
+    def add(self, values):
+        self.digest.add(values)
+        self.moments.add(values)
+
+    def quantile(self, qs):
+        return self.digest.quantile(qs)
+
+    @property
+    def count(self):
+        return self.moments.count
+
+    @property
+    def mean(self):
+        return self.moments.mean
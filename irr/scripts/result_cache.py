@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+
+# Results kept; past this the least recently used are deleted
+CACHE_ENTRIES = 1000
+
+
+def canonical(payload):
+    """`payload` (JSON-able) as one canonical string: sorted keys, no whitespace."""
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"), allow_nan=False)
+
+
+def content_key(payload):
+    return hashlib.blake2b(canonical(payload).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ResultCache:
+    """Engine results on disk, one JSON file per content key, bounded as an LRU.
+
+    A file holds the canonical payload it was keyed on, which is checked
+    on read, and the result. A hit touches the file, so file mtimes order
+    the entries by last use. Files are written aside and moved into
+    place, so several processes (a sweep's workers) can share a directory.
+    """
+
+    def __init__(self, directory, entries=CACHE_ENTRIES):
+        self.directory = directory
+        self.entries = entries
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, payload):
+        """The result stored for `payload`, or None."""
+        path = self.path(content_key(payload))
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry["result"] if entry.get("key") == canonical(payload) else None
+
+    def put(self, payload, result):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(content_key(payload))
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"key": canonical(payload), "result": result}, f)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """Delete the least recently used entries past `entries`."""
+        try:
+            names = [n for n in os.listdir(self.directory) if n.endswith(".json")]
+        except OSError:
+            return
+        if len(names) <= self.entries:
+            return
+        used = []
+        for name in names:
+            try:
+                used.append((os.stat(os.path.join(self.directory, name)).st_mtime_ns, name))
+            except OSError:
+                pass
+        used.sort()
+        for _, name in used[:len(used) - self.entries]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def fetch(self, payload, compute):
+        """The stored result for `payload`, marked `cached`, or compute() stored under it."""
+        result = self.get(payload)
+        if result is not None:
+            result["cached"] = True
+            return result
+        result = compute()
+        self.put(payload, result)
+        return result
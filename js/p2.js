@@ -0,0 +1,69 @@
+// Streaming p-quantile shared by the simulators (Jain & Chlamtac's P²
+// algorithm): five markers track the min, p/2, p, (1+p)/2 and max, and are
+// nudged toward their ideal positions with a parabolic fit. O(1) memory per
+// estimate, so Monte Carlo bands don't need the paths kept.
+function createP2Quantile(p) {
+    const q = [];
+    const n = [0, 1, 2, 3, 4];
+    const desired = [0, 2 * p, 4 * p, 2 + 2 * p, 4];
+    const increments = [0, p / 2, p, (1 + p) / 2, 1];
+    let count = 0;
+
+    function parabolic(i, d) {
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+            (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        );
+    }
+
+    function linear(i, d) {
+        return q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i]);
+    }
+
+    return {
+        add(x) {
+            count++;
+            if (count <= 5) {
+                q.push(x);
+                q.sort((a, b) => a - b);
+                return;
+            }
+
+            // Cell the observation falls in, widening the ends if needed
+            let k;
+            if (x < q[0]) {
+                q[0] = x;
+                k = 0;
+            } else if (x >= q[4]) {
+                q[4] = x;
+                k = 3;
+            } else {
+                k = 0;
+                while (x >= q[k + 1]) k++;
+            }
+            for (let i = k + 1; i < 5; i++) n[i]++;
+            for (let i = 0; i < 5; i++) desired[i] += increments[i];
+
+            for (let i = 1; i < 4; i++) {
+                const d = desired[i] - n[i];
+                if ((d >= 1 && n[i + 1] - n[i] > 1) || (d <= -1 && n[i - 1] - n[i] < -1)) {
+                    const step = d > 0 ? 1 : -1;
+                    let h = parabolic(i, step);
+                    if (!(q[i - 1] < h && h < q[i + 1])) h = linear(i, step);
+                    q[i] = h;
+                    n[i] += step;
+                }
+            }
+        },
+
+        value() {
+            if (count > 5) return q[2];
+            // Exact (interpolated) until the markers are set up
+            if (count === 0) return NaN;
+            const index = (count - 1) * p;
+            const lower = Math.floor(index);
+            const upper = Math.min(lower + 1, count - 1);
+            return q[lower] + (q[upper] - q[lower]) * (index - lower);
+        }
+    };
+}
@@ -0,0 +1,86 @@
+// Seeded, counter-based generator shared by the simulators: Philox4x32-10
+// (Salmon et al., "Parallel Random Numbers: As Easy as 1, 2, 3", SC 2011).
+// Every block is a pure function of (seed, stream, index), so a path's draws
+// don't depend on any other path's and a seed replays a run exactly.
+// irr/scripts/irr_engine.py replays the same streams in NumPy.
+const PHILOX_M0 = 0xD2511F53;
+const PHILOX_M1 = 0xCD9E8D57;
+const PHILOX_W0 = 0x9E3779B9;
+const PHILOX_W1 = 0xBB67AE85;
+
+// High 32 bits of the 64-bit product of two uint32s, from 16-bit halves
+// (Hacker's Delight mulhu); every partial sum stays below 2^32
+function mulhi32(a, b) {
+    const aLo = a & 0xffff;
+    const aHi = a >>> 16;
+    const bLo = b & 0xffff;
+    const bHi = b >>> 16;
+    const mid = aHi * bLo + ((aLo * bLo) >>> 16);
+    const mid2 = aLo * bHi + (mid & 0xffff);
+    return aHi * bHi + (mid >>> 16) + (mid2 >>> 16);
+}
+
+// One block: the counter (c0..c3) encrypted under the key (k0, k1), into `out`
+function philox4x32(out, c0, c1, c2, c3, k0, k1) {
+    for (let round = 0; round < 10; round++) {
+        const hi0 = mulhi32(PHILOX_M0, c0);
+        const lo0 = Math.imul(PHILOX_M0, c0) >>> 0;
+        const hi1 = mulhi32(PHILOX_M1, c2);
+        const lo1 = Math.imul(PHILOX_M1, c2) >>> 0;
+        c0 = (hi1 ^ c1 ^ k0) >>> 0;
+        c1 = lo1;
+        c2 = (hi0 ^ c3 ^ k1) >>> 0;
+        c3 = lo0;
+        k0 = (k0 + PHILOX_W0) >>> 0;
+        k1 = (k1 + PHILOX_W1) >>> 0;
+    }
+    out[0] = c0;
+    out[1] = c1;
+    out[2] = c2;
+    out[3] = c3;
+}
+
+// Uniform draws in [0, 1) from stream `stream` of `seed` (integers below 2^53).
+// Each block of four words gives two 53-bit doubles.
+function createRandomStream(seed, stream) {
+    const k0 = seed >>> 0;
+    const k1 = Math.floor(seed / 4294967296) >>> 0;
+    const s0 = stream >>> 0;
+    const s1 = Math.floor(stream / 4294967296) >>> 0;
+    const block = new Uint32Array(4);
+    let index = 0;
+    let used = 2;
+
+    return function () {
+        if (used === 2) {
+            philox4x32(block, index >>> 0, Math.floor(index / 4294967296) >>> 0, s0, s1, k0, k1);
+            index++;
+            used = 0;
+        }
+        const hi = block[2 * used] >>> 5;
+        const lo = block[2 * used + 1] >>> 6;
+        used++;
+        return (hi * 67108864 + lo) / 9007199254740992;
+    };
+}
+
+// Standard normals from stream `stream` of `seed` into `out`, a whole path at
+// a time: each block's two doubles go through Box-Muller, and both outputs are
+// kept. A block whose first double is 0 is skipped.
+function fillNormals(out, seed, stream) {
+    const k0 = seed >>> 0;
+    const k1 = Math.floor(seed / 4294967296) >>> 0;
+    const s0 = stream >>> 0;
+    const s1 = Math.floor(stream / 4294967296) >>> 0;
+    const block = new Uint32Array(4);
+    const n = out.length;
+    for (let index = 0, j = 0; j < n; index++) {
+        philox4x32(block, index >>> 0, Math.floor(index / 4294967296) >>> 0, s0, s1, k0, k1);
+        const u = ((block[0] >>> 5) * 67108864 + (block[1] >>> 6)) / 9007199254740992;
+        const v = ((block[2] >>> 5) * 67108864 + (block[3] >>> 6)) / 9007199254740992;
+        if (u === 0) continue;
+        const r = Math.sqrt(-2.0 * Math.log(u));
+        out[j++] = r * Math.cos(2.0 * Math.PI * v);
+        if (j < n) out[j++] = r * Math.sin(2.0 * Math.PI * v);
+    }
+}
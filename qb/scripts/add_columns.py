@@ -1,4 +1,4 @@
-import os
+from patch_engine import Patch, patch_file
 
 file_path = "/Users/warren/Desktop/web-apps (EMAILED JAN 29)/QB Tool/accounting_dashboard_v2.html"
 
@@ -108,23 +108,18 @@ events_target = """const inputs = [els.dateStart, els.dateEnd, els.classIn, els.
 events_replacement = """const inputs = [els.dateStart, els.dateEnd, els.classIn, els.accountIn, els.typeIn, els.categoryIn, els.masterIn, els.nameIn];"""
 
 
-# Read file
-with open(file_path, 'r', encoding='utf-8') as f:
-    content = f.read()
-
-# Apply replacements
-content = content.replace(html_target, html_replacement)
-content = content.replace(colgroup_target, colgroup_replacement)
-content = content.replace(cols_target, cols_replacement)
-content = content.replace(els_target, els_replacement)
-content = content.replace(els_dl_target, els_dl_replacement)
-content = content.replace(pop_target, pop_replacement)
-content = content.replace(handle_target, handle_replacement)
-content = content.replace(handle_logic_target, handle_logic_replacement)
-content = content.replace(events_target, events_replacement)
-
-# Write back
-with open(file_path, 'w', encoding='utf-8') as f:
-    f.write(content)
-
-print("Successfully added Category and Master Vertical columns/filters")
+PATCHES = [
+    Patch("add_columns: category/master filter inputs", html_target, html_replacement),
+    Patch("add_columns: colgroup", colgroup_target, colgroup_replacement),
+    Patch("add_columns: column definitions", cols_target, cols_replacement),
+    Patch("add_columns: filter elements", els_target, els_replacement),
+    Patch("add_columns: datalist elements", els_dl_target, els_dl_replacement),
+    Patch("add_columns: populate filters", pop_target, pop_replacement),
+    Patch("add_columns: filter values", handle_target, handle_replacement),
+    Patch("add_columns: filter checks", handle_logic_target, handle_logic_replacement),
+    Patch("add_columns: filter events", events_target, events_replacement),
+]
+
+if __name__ == "__main__":
+    patch_file(file_path, PATCHES)
+    print("Successfully added Category and Master Vertical columns/filters")
@@ -1,4 +1,4 @@
-import os
+from patch_engine import Patch, patch_file
 
 file_path = "/Users/warren/Desktop/web-apps (EMAILED JAN 29)/QB Tool/accounting_dashboard_v2.html"
 
@@ -129,16 +129,11 @@ logic_replacement = """            renderData();
         // Sorting"""
 
 
-# Read file
-with open(file_path, 'r', encoding='utf-8') as f:
-    content = f.read()
+PATCHES = [
+    Patch("add_summaries: summary tables", html_target, html_replacement),
+    Patch("add_summaries: renderSummaries", logic_target, logic_replacement),
+]
 
-# Apply replacements
-content = content.replace(html_target, html_replacement)
-content = content.replace(logic_target, logic_replacement)
-
-# Write back
-with open(file_path, 'w', encoding='utf-8') as f:
-    f.write(content)
-
-print("Successfully added Summary Subtables")
+if __name__ == "__main__":
+    patch_file(file_path, PATCHES)
+    print("Successfully added Summary Subtables")
@@ -1,4 +1,4 @@
-import os
+from patch_engine import Patch, patch_file
 
 file_path = "/Users/warren/Desktop/web-apps (EMAILED JAN 29)/QB Tool/accounting_dashboard_v2.html"
 
@@ -161,18 +161,13 @@ js_replacement = """        // User Guide Modal
         const inputs = [els.dateStart, els.dateEnd, els.classIn, els.accountIn, els.typeIn, els.categoryIn, els.masterIn, els.nameIn];"""
 
 
-# Read file
-with open(file_path, 'r', encoding='utf-8') as f:
-    content = f.read()
+PATCHES = [
+    Patch("add_user_guide: header button", header_target, header_replacement),
+    Patch("add_user_guide: modal CSS", css_target, css_replacement),
+    Patch("add_user_guide: modal HTML", "</body>", modal_html + "\n</body>"),
+    Patch("add_user_guide: modal events", js_target, js_replacement),
+]
 
-# Apply replacements
-content = content.replace(header_target, header_replacement)
-content = content.replace(css_target, css_replacement)
-content = content.replace("</body>", modal_html + "\n</body>")
-content = content.replace(js_target, js_replacement)
-
-# Write back
-with open(file_path, 'w', encoding='utf-8') as f:
-    f.write(content)
-
-print("Successfully added User Guide")
+if __name__ == "__main__":
+    patch_file(file_path, PATCHES)
+    print("Successfully added User Guide")
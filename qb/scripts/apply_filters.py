@@ -1,4 +1,4 @@
-import os
+from patch_engine import Patch, patch_file
 
 file_path = "/Users/warren/Desktop/web-apps (EMAILED JAN 29)/QB Tool/accounting_dashboard_v2.html"
 
@@ -223,24 +223,16 @@ events_replacement = """        // Events
         });"""
 
 
-# Read file
-with open(file_path, 'r', encoding='utf-8') as f:
-    content = f.read()
+PATCHES = [
+    Patch("apply_filters: filter inputs", html_target, html_replacement),
+    Patch("apply_filters: filter elements", els_target, els_replacement),
+    Patch("apply_filters: handleFilter", handle_filter_target, handle_filter_replacement),
+    Patch("apply_filters: filter events", events_target, events_replacement),
+    # Populate the filter datalists wherever the table is initialised after a load
+    # (the `function initTable()` definition has no `;`, so it isn't matched)
+    Patch("apply_filters: populateFilters call", "initTable();", "populateFilters(rawData); initTable();"),
+]
 
-# Apply replacements
-content = content.replace(html_target, html_replacement)
-content = content.replace(els_target, els_replacement)
-content = content.replace(handle_filter_target, handle_filter_replacement)
-content = content.replace(events_target, events_replacement)
-
-# Inject populateFilters call
-# There are two places: initTable(); call inside fetchCSV
-# We will replace `initTable();` with `populateFilters(rawData); initTable();`
-# Be careful not to replace definition of initTable
-content = content.replace("initTable();", "populateFilters(rawData); initTable();")
-
-# Write back
-with open(file_path, 'w', encoding='utf-8') as f:
-    f.write(content)
-
-print("Successfully updated accounting_dashboard_v2.html")
+if __name__ == "__main__":
+    patch_file(file_path, PATCHES)
+    print("Successfully updated accounting_dashboard_v2.html")
@@ -1,48 +1,58 @@
-
-import re
+import csv
+import json
 import os
+import re
+
+from build_dashboard import DATA_CLOSE, DATA_OPEN, PLACEHOLDER
+from gl_compress import COMPRESSED_FORMAT, read_envelope
+from gl_payload import iter_decoded_rows
+from gl_shards import SHARD_INDEX_FORMAT
+from marker_split import find_region, mapped, splice
 
 index_path = "../index.html"
 csv_output_path = "../QB GL Python Print - public_csv.csv" # Save to root so it matches original location
 template_output_path = "accounting_dashboard_template.html"
 
-with open(index_path, "r", encoding="utf-8") as f:
-    content = f.read()
-
-# 1. Extract CSV Data
-# const LOCAL_CSV_DATA = `...`;
-csv_pattern = r'(const LOCAL_CSV_DATA = `)([\s\S]*?)(`;)'
-match = re.search(csv_pattern, content)
-if match:
-    csv_data = match.group(2)
-    # If it's the placeholder, we can't extract (but we know it's not based on previous reads)
-    if "CSV_DATA_PLACEHOLDER" not in csv_data:
-        with open(csv_output_path, "w", encoding="utf-8") as f:
-            f.write(csv_data)
-        print(f"Extracted CSV data to {csv_output_path}")
-    else:
-        print("Warning: CSV data in index.html is already a placeholder or empty.")
-else:
-    print("Error: Could not find LOCAL_CSV_DATA in index.html")
-
-# 2. Create Template with Placeholder
-def replace_csv_placeholder(match):
-    return match.group(1) + "__CSV_DATA_PLACEHOLDER__" + match.group(3)
-
-template_content = re.sub(csv_pattern, replace_csv_placeholder, content)
-
-# 3. Apply PDF Changes to Template
-# We look for the generatePDF function body or the whole function
-# Since regex replacement of large code blocks is fragile, we'll try to find unique markers
-# The original code has: // LOGO ... const logoUrl = ...
-# And: // --- PAGE 2: EXECUTIVE SUMMARY --- ... doc.addPage();
-# And ends with: console.log("PDF download triggered."); ... }
-
-# Let's replace the ENTIRE generatePDF function to be safe.
+# We replace the ENTIRE generatePDF body, found by plain markers rather than a
+# regex over the whole page (the embedded data makes that slow).
 # It starts with: async function generatePDF() {
 # It ends before: function setupPdfBtn() {
+PDF_START = b"async function generatePDF()"
+PDF_END = b"function setupPdfBtn"
+
+
+def find_pdf_body(buf):
+    """Offsets of the generatePDF body: after its `{`, up to the newline before setupPdfBtn."""
+    start, end = find_region(buf, PDF_START, PDF_END)
+    brace = buf.find(b"{", start, end)
+    if brace == -1 or buf[start:brace].strip():
+        raise ValueError("generatePDF() has no body")
+    # Back up over the blank lines and indentation before setupPdfBtn
+    pos = end
+    while pos > brace + 1 and buf[pos - 1:pos] in (b" ", b"\t", b"\r", b"\n"):
+        pos -= 1
+    newline = buf.find(b"\n", pos, end)
+    if newline == -1:
+        raise ValueError("setupPdfBtn does not start on its own line")
+    return brace + 1, newline
+
+
+def write_csv(buf, start, end):
+    """Decode the embedded payload between `start` and `end` back into the GL CSV."""
+    m = re.match(rb'\s*\{"format":\s*"([^"]*)"', bytes(buf[start:start + 64]))
+    fmt = m.group(1).decode() if m else None
+    if fmt == SHARD_INDEX_FORMAT:
+        print("Warning: index.html is a sharded build; the GL rows are in the shard files.")
+        return
+    if fmt == COMPRESSED_FORMAT:
+        payload = read_envelope(json.loads(bytes(buf[start:end])), os.path.dirname(index_path))
+        rows = iter_decoded_rows(payload)
+    else:
+        rows = iter_decoded_rows(buf, start, end)
+    with open(csv_output_path, "w", encoding="utf-8", newline="") as f:
+        csv.writer(f).writerows(rows)
+    print(f"Extracted CSV data to {csv_output_path}")
 
-pdf_func_pattern = r'(async function generatePDF\(\)\s*\{)([\s\S]*?)(\n\s*function setupPdfBtn)'
 
 new_pdf_logic = r"""
             const btn = document.getElementById('export-pdf-btn');
@@ -133,36 +143,23 @@ new_pdf_logic = r"""
                 doc.setDrawColor(0, 0, 0);
                 doc.line(14, 26, 196, 26);
 
-                let totalIncome = 0;
-                let totalExpense = 0;
-                let totalNet = 0;
-                let count = filteredData.length;
-                let minDate = null;
-                let maxDate = null;
+                // Totals come from the same summary as the dashboard panels
+                // (answered from the build-time cube when the filters allow)
+                const summary = currentSummary;
+                const totalIncome = summary.income;
+                const totalExpense = summary.expense;
+                const totalNet = summary.net;
+                const count = summary.count;
 
                 // Category Breakdown
                 const incomeByCategory = {};
-
-                filteredData.forEach(row => {
-                    const amt = parseFloat(String(row['Amount'] || '0').replace(/,/g, ''));
-                    if (!isNaN(amt)) {
-                        totalNet += amt;
-                        if (amt > 0) {
-                            totalIncome += amt;
-                            const cat = row['Category'] || 'Uncategorized';
-                            incomeByCategory[cat] = (incomeByCategory[cat] || 0) + amt;
-                        }
-                        else totalExpense += amt;
-                    }
-                    let d = row['Date'] ? new Date(row['Date']) : null;
-                    if (d && !isNaN(d.getTime())) {
-                        if (!minDate || d < minDate) minDate = d;
-                        if (!maxDate || d > maxDate) maxDate = d;
-                    }
+                Object.entries(summary.incomeByCategory).forEach(([cat, amt]) => {
+                    const label = cat || 'Uncategorized';
+                    incomeByCategory[label] = (incomeByCategory[label] || 0) + amt;
                 });
 
-                const dateRangeStr = (minDate && maxDate) 
-                    ? `${minDate.toISOString().split('T')[0]} to ${maxDate.toISOString().split('T')[0]}`
+                const dateRangeStr = (summary.minDay !== NO_DATE && summary.maxDay !== NO_DATE)
+                    ? `${isoDays(summary.minDay)} to ${isoDays(summary.maxDay)}`
                     : "All Time";
                 
                 // Prepare Table Body with Breakdown
@@ -197,17 +194,9 @@ new_pdf_logic = r"""
                     columnStyles: { 0: { fontStyle: 'bold', cellWidth: 100 }, 1: { halign: 'right' } }
                 });
 
-                // Top Classes & Accounts Logic (Unchanged but included)
-                const classTotals = {};
-                const accountTotals = {};
-                filteredData.forEach(row => {
-                    const amt = parseFloat(String(row['Amount'] || '0').replace(/,/g, ''));
-                    if (isNaN(amt)) return;
-                    const cls = row['Class'] || '(No Class)';
-                    const acc = row['Account'] || '(No Account)';
-                    classTotals[cls] = (classTotals[cls] || 0) + amt;
-                    accountTotals[acc] = (accountTotals[acc] || 0) + amt;
-                });
+                // Top Classes & Accounts
+                const classTotals = summary.byClass;
+                const accountTotals = summary.byAccount;
 
                 const sortedClass = Object.entries(classTotals)
                     .sort((a, b) => Math.abs(b[1]) - Math.abs(a[1]))
@@ -280,15 +269,33 @@ new_pdf_logic = r"""
             }
         """
 
-def replace_pdf_logic(match):
-    return match.group(1) + new_pdf_logic + match.group(3)
-
-if re.search(pdf_func_pattern, template_content):
-    template_content = re.sub(pdf_func_pattern, replace_pdf_logic, template_content)
-    print("Applied PDF logic changes.")
-else:
-    print("Error: Could not find PDF logic in template.")
+edits = []
+with mapped(index_path) as buf:
+    # 1. Extract CSV Data
+    # <script id="local-gl-data" type="application/json">...</script>
+    try:
+        data_start, data_end = find_region(buf, DATA_OPEN.encode(), DATA_CLOSE.encode())
+    except ValueError:
+        print("Error: Could not find the embedded GL data in index.html")
+    else:
+        if buf[data_start:data_end].strip() == PLACEHOLDER.encode():
+            print("Warning: GL data in index.html is already a placeholder or empty.")
+        else:
+            write_csv(buf, data_start, data_end)
+
+        # 2. Create Template with Placeholder
+        edits.append((data_start, data_end, PLACEHOLDER.encode()))
+
+    # 3. Apply PDF Changes to Template
+    try:
+        body_start, body_end = find_pdf_body(buf)
+    except ValueError:
+        print("Error: Could not find PDF logic in template.")
+    else:
+        edits.append((body_start, body_end, new_pdf_logic.encode("utf-8")))
+        print("Applied PDF logic changes.")
 
-with open(template_output_path, "w", encoding="utf-8") as f:
-    f.write(template_content)
+    # One pass over the mapped page writes the template with both regions swapped
+    with open(template_output_path, "wb") as out:
+        splice(buf, edits, out.write)
 print(f"Created updated template at {template_output_path}")
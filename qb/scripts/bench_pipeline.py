@@ -0,0 +1,178 @@
+import argparse
+import datetime
+import glob
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+
+import build_dashboard
+import synthetic_ledger
+from marker_split import find_region, mapped
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 5_000_000]
+work_dir = "../bench"
+results_path = "../bench/results.json"
+
+RESULTS_FORMAT = "qb-bench"
+RESULTS_VERSION = 1
+
+# (name, script, output checked for size), run in this order in the scratch tree.
+# extract_template.py and apply_pdf_changes.py both read the page the build wrote.
+STAGES = [
+    ("build", ["build_dashboard.py", "--force"], "../index.html"),
+    ("extract_template", ["extract_template.py"], "accounting_dashboard_template.html"),
+    ("apply_pdf_changes", ["apply_pdf_changes.py"], "accounting_dashboard_template.html"),
+]
+
+# Lower is better for every metric compared
+COMPARED = ["wall_s", "peak_rss_mb", "output_bytes"]
+
+
+def rss_mb(rusage):
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return rusage.ru_maxrss * scale / 2 ** 20
+
+
+def run_stage(args, cwd):
+    """Run one script in `cwd`; its wall time and the peak RSS of that process alone."""
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable] + args, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output = proc.stdout.read().decode("utf-8", "replace")
+    # wait4 gives the resource usage of this child, not the max over all children
+    _, status, rusage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    wall = time.perf_counter() - start
+    failed = proc.returncode != 0 or any(line.startswith("Error:") for line in output.splitlines())
+    if failed:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{output}")
+    return {"wall_s": round(wall, 3), "peak_rss_mb": round(rss_mb(rusage), 1)}
+
+
+def ledger_csv(rows, seed):
+    """Path of the synthetic ledger for this size, generating it once."""
+    path = os.path.join(work_dir, f"ledger-{rows}-{seed}.csv")
+    if not os.path.exists(path):
+        start = time.perf_counter()
+        with open(path + ".tmp", "w", encoding="utf-8", newline="") as f:
+            synthetic_ledger.write_csv(f, rows, seed)
+        os.replace(path + ".tmp", path)
+        print(f"  generated {rows:,} rows in {time.perf_counter() - start:.1f}s")
+    return path
+
+
+def make_tree(tree):
+    """A scratch copy of qb/ with just the scripts and the template."""
+    shutil.rmtree(tree, ignore_errors=True)
+    scripts = os.path.join(tree, "scripts")
+    os.makedirs(scripts)
+    for path in glob.glob("*.py") + [build_dashboard.template_path]:
+        shutil.copy2(path, scripts)
+    return scripts
+
+
+def parse_cost(page):
+    """Seconds to JSON-parse the page's embedded payload, as the browser does first."""
+    with mapped(page) as buf:
+        start, end = find_region(buf, build_dashboard.DATA_OPEN.encode(), build_dashboard.DATA_CLOSE.encode())
+        data = bytes(buf[start:end])
+    t = time.perf_counter()
+    json.loads(data)
+    return {"payload_bytes": len(data), "payload_parse_s": round(time.perf_counter() - t, 3)}
+
+
+def bench_size(rows, seed, stream):
+    csv_file = ledger_csv(rows, seed)
+    scripts = make_tree(os.path.join(work_dir, "tree"))
+    # Copied, not linked: apply_pdf_changes.py rewrites the CSV in place
+    shutil.copyfile(csv_file, os.path.join(scripts, build_dashboard.csv_path))
+
+    result = {"rows": rows, "csv_bytes": os.path.getsize(csv_file), "stages": {}}
+    for name, args, output in STAGES:
+        if name == "build" and stream:
+            args = args + ["--stream"]
+        stage = run_stage(args, scripts)
+        stage["output_bytes"] = os.path.getsize(os.path.join(scripts, output))
+        result["stages"][name] = stage
+        # Parse the page the build wrote before the later stages touch the tree
+        if name == "build":
+            result.update(parse_cost(os.path.join(scripts, output)))
+        print(f"  {name:<18} {stage['wall_s']:>8.2f}s {stage['peak_rss_mb']:>8.1f} MB {stage['output_bytes']:>14,} bytes")
+    print(f"  {'payload parse':<18} {result['payload_parse_s']:>8.2f}s")
+    shutil.rmtree(os.path.dirname(scripts), ignore_errors=True)
+    return result
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--", "."], capture_output=True, text=True).stdout
+        return out.stdout.strip() + ("-dirty" if dirty.strip() else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    """Print each metric's change against an earlier results file."""
+    before = {r["rows"]: r for r in baseline["results"]}
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'} ({baseline.get('date', '?')}):")
+    for r in results["results"]:
+        old = before.get(r["rows"])
+        if not old:
+            continue
+        for name, stage in r["stages"].items():
+            for metric in COMPARED:
+                a, b = old["stages"].get(name, {}).get(metric), stage[metric]
+                if a:
+                    print(f"  {r['rows']:>10,} {name:<18} {metric:<13} {a:>14,} -> {b:>14,} ({(b - a) / a:+.1%})")
+        a, b = old.get("payload_parse_s"), r["payload_parse_s"]
+        if a:
+            print(f"  {r['rows']:>10,} {'payload parse':<18} {'wall_s':<13} {a:>14,} -> {b:>14,} ({(b - a) / a:+.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the dashboard build scripts on synthetic ledgers of several sizes.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, metavar="ROWS",
+                        help="ledger sizes to run (default: 10k, 100k, 1M and 5M rows)")
+    parser.add_argument("--seed", type=int, default=0, help="synthetic ledger seed")
+    parser.add_argument("--stream", action="store_true", help="benchmark the --stream build")
+    parser.add_argument("--output", default=results_path, help="results JSON to write")
+    parser.add_argument("--compare", metavar="JSON", help="earlier results to compare against")
+    args = parser.parse_args()
+
+    try:
+        os.makedirs(work_dir, exist_ok=True)
+        baseline = None
+        if args.compare:
+            with open(args.compare, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        results = {
+            "format": RESULTS_FORMAT,
+            "version": RESULTS_VERSION,
+            "commit": git_commit(),
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seed": args.seed,
+            "stream": args.stream,
+            "results": [],
+        }
+        for rows in args.sizes:
+            print(f"{rows:,} rows:")
+            results["results"].append(bench_size(rows, args.seed, args.stream))
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+        print(f"Wrote results to {args.output}")
+        if baseline:
+            compare(results, baseline)
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
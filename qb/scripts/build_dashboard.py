@@ -1,31 +1,432 @@
-
+import argparse
+import io
+import json
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from build_manifest import BuildManifest
+from gl_compress import COMPRESSED_FORMAT, ENCODINGS, SUFFIXES, iter_base64, iter_compressed, measure
+from gl_cube import SummaryCube
+from gl_delta import update_shards
+from gl_entities import entity_csvs, plan_entities, read_entity_index, write_entity_index
+from gl_ingest import GLIngest, RejectsFile
+from gl_payload import iter_payload_rows
+from gl_search import TextIndex
+from gl_shards import PARTITIONS, SHARD_INDEX_NAME
+from gl_sort import SortIndex
+from stage_profile import add_arguments, count, enable_from_args, iter_stage, stage
 
 csv_path = "../QB GL Python Print - public_csv.csv"
 template_path = "accounting_dashboard_template.html"
 output_path = "../index.html"
+# Rows the ingest stage can't parse are left out of the page and listed
+# here with the reason; the file only exists while there are any
+rejects_path = "../gl-rejects.csv"
+# Compressed builds also write the plain payload here, next to the page,
+# for browsers without DecompressionStream
+data_file = "gl-data.json"
+# Shard mode writes the GL here and embeds only the shard index
+shard_dir = "../data"
+# Row hashes of the last sharded build, so the next only rewrites changed shards
+row_store_dir = "../gl-store"
+# Multi-entity mode writes each entity's page to <entities_dir>/<key>/ and
+# the consolidated dashboard to <entities_dir>/index.html
+entities_dir = "../entities"
+
+PLACEHOLDER = "__GL_DATA_PLACEHOLDER__"
+
+# The script block the payload is embedded in; extract_template.py and
+# apply_pdf_changes.py find the data between these
+DATA_OPEN = '<script id="local-gl-data" type="application/json">'
+DATA_CLOSE = "</script>"
+
+# Escape only script tag closer since we are in a data script block
+SCRIPT_CLOSE = "</script"
+SCRIPT_CLOSE_ESCAPED = "<\\/script"
+
+# Build-time aggregates and indexes embedded alongside the rows
+payload_sections = [SummaryCube, TextIndex, SortIndex]
+# Merged shards are sorted in the browser, so shards have no sort index
+shard_sections = [SummaryCube, TextIndex]
+
+# Script sources are inputs too, so changing the build logic forces a rebuild
+build_sources = ["build_dashboard.py", "build_manifest.py", "gl_ingest.py", "gl_payload.py", "gl_cube.py",
+                 "gl_shards.py", "gl_compress.py", "gl_search.py", "gl_sort.py", "gl_entities.py", "gl_delta.py"]
+
+
+def escape_script_chunks(chunks):
+    """Yield `chunks` with every `</script` escaped, even when split across chunks.
 
-try:
-    with open(csv_path, "r", encoding="utf-8") as f:
-        # Read lines, maybe limit if too huge, but 6MB should be fine in memory
-        csv_content = f.read()
-        
-    # Escape backticks in CSV because we are putting it into a JS template string
-    # Escape only script tag closer since we are in a text/csv script block
-    csv_content = csv_content.replace("</script", "<\\/script")
+    A tail that could be the start of `</script` is held back and prepended
+    to the next chunk. Since `<` only appears at the start of the marker, a
+    full match can never straddle the held-back tail.
+    """
+    carry = ""
+    for chunk in chunks:
+        text = carry + chunk
+        keep = 0
+        for k in range(min(len(SCRIPT_CLOSE) - 1, len(text)), 0, -1):
+            if text.endswith(SCRIPT_CLOSE[:k]):
+                keep = k
+                break
+        carry = text[len(text) - keep:] if keep else ""
+        head = text[:len(text) - keep]
+        if head:
+            yield head.replace(SCRIPT_CLOSE, SCRIPT_CLOSE_ESCAPED)
+    if carry:
+        yield carry
+
+
+def split_template(html_content):
+    """Split the template into the text before and after the data placeholder."""
+    head, sep, tail = html_content.partition(PLACEHOLDER)
+    if not sep:
+        raise ValueError(f"{PLACEHOLDER} not found in {template_path}")
+    return head, tail
+
+
+def typed_payload(ingest, meta=None):
+    """Payload pieces for the typed rows of `ingest`."""
+    return iter_stage("encode", iter_payload_rows(ingest.fields, ingest, payload_sections, typed=True, meta=meta),
+                      count_out=True)
+
+
+def build_in_memory(rejects):
+    # Encode the CSV into the columnar payload
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        ingest = GLIngest(f, rejects)
+        payload = "".join(typed_payload(ingest))
+
+    with stage("escape"):
+        payload = payload.replace(SCRIPT_CLOSE, SCRIPT_CLOSE_ESCAPED)
 
     # Read template
-    with open(template_path, "r", encoding="utf-8") as f:
+    with stage("read template"), open(template_path, "r", encoding="utf-8") as f:
         html_content = f.read()
 
     # Replace logic
-    # We look for the exact string `__CSV_DATA_PLACEHOLDER__`
-    new_html = html_content.replace("__CSV_DATA_PLACEHOLDER__", csv_content)
+    # We look for the exact string `__GL_DATA_PLACEHOLDER__`
+    with stage("substitute"):
+        new_html = html_content.replace(PLACEHOLDER, payload)
 
-    with open(output_path, "w", encoding="utf-8") as f:
+    with stage("write"), open(output_path, "w", encoding="utf-8") as f:
         f.write(new_html)
 
-    print(f"Successfully created {output_path} with embedded CSV data.")
+    return ingest
+
+
+def build_streaming(rejects):
+    # The template is small; only the payload needs to be streamed
+    with stage("read template"), open(template_path, "r", encoding="utf-8") as f:
+        head, tail = split_template(f.read())
+
+    # Written aside and moved into place, so a server never sees half a page
+    tmp_path = output_path + ".tmp"
+    with stage("write"), open(csv_path, "r", encoding="utf-8", newline="") as src, \
+            open(tmp_path, "w", encoding="utf-8") as out:
+        ingest = GLIngest(src, rejects)
+        out.write(head)
+        for piece in iter_stage("escape", escape_script_chunks(typed_payload(ingest))):
+            out.write(piece)
+        out.write(tail)
+    os.replace(tmp_path, output_path)
+
+    return ingest
+
+
+def build_compressed(encoding, as_asset, rejects):
+    page_dir = os.path.dirname(output_path) or "."
+    plain_path = os.path.join(page_dir, data_file)
+    packed_path = plain_path + SUFFIXES[encoding]
+
+    with stage("read template"), open(template_path, "r", encoding="utf-8") as f:
+        head, tail = split_template(f.read())
+
+    sizes = {"plain": 0, "packed": 0}
+
+    def tee_plain(pieces, plain):
+        for piece in pieces:
+            plain.write(piece)
+            data = piece.encode("utf-8")
+            sizes["plain"] += len(data)
+            yield data
+
+    def count_packed(chunks):
+        for chunk in chunks:
+            sizes["packed"] += len(chunk)
+            yield chunk
+
+    envelope = {"format": COMPRESSED_FORMAT, "encoding": encoding, "fallback": data_file}
+    with stage("write"), open(csv_path, "r", encoding="utf-8", newline="") as src, \
+            open(plain_path, "w", encoding="utf-8") as plain, \
+            open(output_path, "w", encoding="utf-8") as out:
+        ingest = GLIngest(src, rejects)
+        plain_pieces = iter_stage("write fallback", tee_plain(typed_payload(ingest), plain))
+        packed = count_packed(iter_stage("compress", iter_compressed(plain_pieces, encoding), count_out=True))
+        out.write(head)
+        if as_asset:
+            with open(packed_path, "wb") as asset:
+                for chunk in packed:
+                    asset.write(chunk)
+            envelope["src"] = os.path.basename(packed_path)
+            out.write(json.dumps(envelope))
+        else:
+            # Base64 never contains `</script`, so no escaping is needed
+            out.write(json.dumps(envelope)[:-1] + ', "data": "')
+            for text in iter_stage("base64", iter_base64(packed), count_out=True):
+                out.write(text)
+            out.write('"}')
+        out.write(tail)
+
+    return sizes, ingest
+
+
+def report_compression(rows):
+    """Print payload sizes and zlib timings for a synthetic ledger of `rows` rows."""
+    from synthetic_ledger import write_csv
+
+    buf = io.StringIO(newline="")
+    write_csv(buf, rows)
+    csv_text = buf.getvalue()
+    print(f"Synthetic ledger: {rows:,} rows, {len(csv_text.encode('utf-8')):,} bytes of CSV")
+    for r in measure(csv_text, payload_sections):
+        print(f"  {r['encoding']:<12} {r['plain_bytes']:>12,} -> {r['compressed_bytes']:>11,} bytes "
+              f"({r['ratio']:.1f}x, base64 {r['base64_bytes']:,}); "
+              f"compress {r['compress_s'] * 1000:.0f} ms, decompress {r['decompress_s'] * 1000:.0f} ms")
+
+
+def build_sharded(partition, rejects, force):
+    # Shard URLs are resolved relative to the page
+    page_dir = os.path.dirname(output_path) or "."
+    base_url = os.path.relpath(shard_dir, page_dir).replace(os.sep, "/") + "/"
+    with stage("write shards"):
+        index, changed, ingest, delta = update_shards(csv_path, rejects, shard_dir, row_store_dir, partition,
+                                                      shard_sections, base_url, build_sources, force)
+
+    with stage("read template"), open(template_path, "r", encoding="utf-8") as f:
+        html_content = f.read()
+    index_json = json.dumps(index, separators=(",", ":")).replace(SCRIPT_CLOSE, SCRIPT_CLOSE_ESCAPED)
+    with stage("write"), open(output_path, "w", encoding="utf-8") as f:
+        f.write(html_content.replace(PLACEHOLDER, index_json))
+
+    return index, changed, ingest, delta
+
+
+def shard_outputs():
+    """Shard index and shard files from the last sharded build, if any."""
+    index_path = os.path.join(shard_dir, SHARD_INDEX_NAME)
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path, "r", encoding="utf-8") as f:
+        index = json.load(f)
+    return [index_path] + [os.path.join(shard_dir, s["file"]) for s in index["shards"]]
+
+
+def build_entity(name, entity_csv, entity_dir):
+    """Build one entity's page, plus its plain payload for the consolidated page.
+
+    Runs in a worker process; returns the entity's ingest figures.
+    """
+    os.makedirs(entity_dir, exist_ok=True)
+    with open(template_path, "r", encoding="utf-8") as f:
+        head, tail = split_template(f.read())
+
+    def tee_plain(pieces, plain):
+        for piece in pieces:
+            plain.write(piece)
+            yield piece
+
+    page_path = os.path.join(entity_dir, "index.html")
+    plain_path = os.path.join(entity_dir, data_file)
+    with open(entity_csv, "r", encoding="utf-8", newline="") as src, \
+            open(plain_path, "w", encoding="utf-8") as plain, \
+            open(page_path, "w", encoding="utf-8") as out, \
+            RejectsFile(os.path.join(entity_dir, os.path.basename(rejects_path))) as rejects:
+        ingest = GLIngest(src, rejects)
+        out.write(head)
+        # The entity key tells the page not to swap in the live sheet
+        for piece in escape_script_chunks(tee_plain(typed_payload(ingest, {"entity": name}), plain)):
+            out.write(piece)
+        out.write(tail)
+
+    return {
+        "fields": ingest.fields,
+        "rows": ingest.rows,
+        "rejected": ingest.rejected,
+        "bytes": os.path.getsize(plain_path),
+        "report": ingest.report(),
+    }
+
+
+def build_entities(patterns, jobs, force):
+    """Build a page per entity across a process pool, then the consolidated page.
+
+    Entities whose export, template and build scripts are unchanged since the
+    last run are not rebuilt. The consolidated page embeds only an index of
+    the entity payloads, which the dashboard merges with an Entity column.
+    """
+    entities = plan_entities(entity_csvs(patterns))
+    os.makedirs(entities_dir, exist_ok=True)
+    manifest = BuildManifest()
+    previous = read_entity_index(entities_dir)
+
+    entries = {}
+    todo = []
+    for key, name, entity_csv in entities:
+        entity_dir = os.path.join(entities_dir, key)
+        outputs = [os.path.join(entity_dir, "index.html"), os.path.join(entity_dir, data_file)]
+        inputs = [entity_csv, template_path] + build_sources
+        options = {"entity": name}
+        if not force and key in previous and all(manifest.is_fresh(p, inputs, options) for p in outputs):
+            entries[key] = previous[key]
+        else:
+            todo.append((key, name, entity_csv, entity_dir, outputs, inputs, options))
+
+    start = time.perf_counter()
+    if todo:
+        # Worker processes aren't profiled; their whole run is this one stage
+        with stage("build entities"), ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = pool.map(build_entity, [t[1] for t in todo], [t[2] for t in todo], [t[3] for t in todo])
+            for (key, name, entity_csv, entity_dir, outputs, inputs, options), result in zip(todo, results):
+                print(f"  {name}: {result['report']}")
+                if result["rejected"]:
+                    print(f"    see {os.path.join(entity_dir, os.path.basename(rejects_path))} for the rejected rows")
+                for path in outputs:
+                    manifest.record(path, inputs, options)
+                entries[key] = {
+                    "key": key,
+                    "entity": name,
+                    "file": f"{key}/{data_file}",
+                    "rows": result["rows"],
+                    "bytes": result["bytes"],
+                    "fields": result["fields"],
+                }
+    manifest.save()
+    elapsed = time.perf_counter() - start
+
+    index = write_entity_index([entries[key] for key, _, _ in entities], entities_dir, "./")
+    with open(template_path, "r", encoding="utf-8") as f:
+        html_content = f.read()
+    index_json = json.dumps(index, separators=(",", ":")).replace(SCRIPT_CLOSE, SCRIPT_CLOSE_ESCAPED)
+    with stage("write"), open(os.path.join(entities_dir, "index.html"), "w", encoding="utf-8") as f:
+        f.write(html_content.replace(PLACEHOLDER, index_json))
+
+    return len(todo), len(entities), index["rows"], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embed the QB GL data into the dashboard template.")
+    parser.add_argument("--stream", action="store_true",
+                        help="stream the encoded data into the output in chunks instead of building it in memory")
+    parser.add_argument("--force", action="store_true",
+                        help="rebuild even if the inputs and output match the last build")
+    parser.add_argument("--compress", choices=list(ENCODINGS),
+                        help="embed the payload compressed (base64) for the browser's DecompressionStream")
+    parser.add_argument("--compressed-asset", action="store_true",
+                        help=f"with --compress, write the compressed payload as a sibling {data_file}.gz/.deflate "
+                             "file instead of embedding it")
+    parser.add_argument("--measure-compression", type=int, metavar="ROWS",
+                        help="print compressed sizes and decompression time for a synthetic ledger and exit")
+    parser.add_argument("--shards", choices=PARTITIONS,
+                        help=f"write the GL as per-month or per-year shard files in {shard_dir} "
+                             "that the dashboard loads on demand")
+    parser.add_argument("--entities", nargs="+", metavar="CSV",
+                        help=f"build one dashboard per GL export (paths or globs) in {entities_dir}, in parallel, "
+                             "plus a consolidated dashboard with an Entity filter")
+    parser.add_argument("--jobs", type=int, help="worker processes for --entities (default: one per CPU)")
+    add_arguments(parser)
+    args = parser.parse_args()
+    enable_from_args(args)
+
+    if args.measure_compression:
+        report_compression(args.measure_compression)
+        return
+    if args.compress and args.shards:
+        parser.error("--compress applies to the single-file build, not --shards")
+    if args.compressed_asset and not args.compress:
+        parser.error("--compressed-asset needs --compress")
+    if args.entities and (args.compress or args.shards):
+        parser.error("--entities builds plain pages; it can't be combined with --compress or --shards")
+
+    if args.entities:
+        try:
+            built, total, rows, elapsed = build_entities(args.entities, args.jobs, args.force)
+            print(f"Built {built} of {total} entities in {elapsed:.2f}s ({total - built} up to date).")
+            print(f"Successfully created {os.path.join(entities_dir, 'index.html')} "
+                  f"consolidating {total} entities ({rows:,} rows).")
+        except Exception as e:
+            print(f"Error: {e}")
+        return
+
+    try:
+        manifest = BuildManifest()
+        inputs = [csv_path, template_path] + build_sources
+        options = {}
+        if args.shards:
+            options["shards"] = args.shards
+        if args.compress:
+            options["compress"] = args.compress
+            options["asset"] = args.compressed_asset
+
+        outputs = [output_path]
+        if args.compress:
+            page_dir = os.path.dirname(output_path) or "."
+            outputs.append(os.path.join(page_dir, data_file))
+            if args.compressed_asset:
+                outputs.append(os.path.join(page_dir, data_file + SUFFIXES[args.compress]))
+        if args.shards:
+            previous = shard_outputs()
+            outputs = outputs + previous if previous else None
+
+        with stage("manifest"):
+            fresh = not args.force and outputs and all(manifest.is_fresh(p, inputs, options) for p in outputs)
+        if fresh:
+            manifest.save()
+            print(f"{output_path} is up to date; nothing to rebuild.")
+            return
+
+        start = time.perf_counter()
+        with RejectsFile(rejects_path) as rejects:
+            if args.shards:
+                index, changed, ingest, delta = build_sharded(args.shards, rejects, args.force)
+                outputs = [output_path] + shard_outputs()
+            elif args.compress:
+                sizes, ingest = build_compressed(args.compress, args.compressed_asset, rejects)
+            elif args.stream:
+                ingest = build_streaming(rejects)
+            else:
+                ingest = build_in_memory(rejects)
+        elapsed = time.perf_counter() - start
+
+        with stage("manifest"):
+            for path in outputs:
+                manifest.record(path, inputs, options)
+            manifest.save()
+
+        if args.compress:
+            ratio = sizes["plain"] / sizes["packed"] if sizes["packed"] else 0
+            print(f"Payload {sizes['plain']:,} bytes -> {args.compress} {sizes['packed']:,} bytes ({ratio:.1f}x)"
+                  + ("" if args.compressed_asset else f", {(sizes['packed'] + 2) // 3 * 4:,} as base64"))
+        if args.shards:
+            print(f"Wrote {len(index['shards'])} {args.shards} shards to {shard_dir} "
+                  f"({changed} changed, {index['rows']:,} rows).")
+            print(delta.report())
+
+        print(ingest.report())
+        if ingest.rejected:
+            print(f"Left out {ingest.rejected:,} malformed rows; see {rejects_path} for the reasons.")
+
+        csv_bytes = os.path.getsize(csv_path)
+        count("ingest", bytes_in=csv_bytes)
+        count("write", bytes_out=sum(os.path.getsize(p) for p in outputs))
+        rate = csv_bytes / elapsed if elapsed > 0 else 0
+        print(f"Successfully created {output_path} with embedded GL data.")
+        print(f"Embedded {csv_bytes:,} bytes in {elapsed:.2f}s ({rate / 1e6:.1f} MB/s)")
+
+    except Exception as e:
+        print(f"Error: {e}")
+
 
-except Exception as e:
-    print(f"Error: {e}")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import hashlib
+import json
+import os
+
+# Lives next to the scripts; records what the last build consumed and produced
+MANIFEST_PATH = ".build_manifest.json"
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path):
+    """SHA-256 of a file, read in chunks so large CSVs don't load into memory."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class BuildManifest:
+    """Content hashes of every build's inputs and output.
+
+    Layout of the JSON file:
+
+        {
+          "files":   {path: {"size": .., "mtime_ns": .., "sha256": ..}},
+          "outputs": {output_path: {"sha256": .., "inputs": {path: sha256}, "options": {..}}}
+        }
+
+    `files` is a stat cache: a file whose size and mtime are unchanged since
+    it was last hashed is not re-read. `outputs` is keyed per output so a
+    build with several outputs only rewrites the ones whose inputs changed.
+    """
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        self.data = {"files": {}, "outputs": {}}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    loaded = json.load(f)
+                self.data["files"] = loaded.get("files", {})
+                self.data["outputs"] = loaded.get("outputs", {})
+            except (OSError, ValueError):
+                # A corrupt manifest just means a full rebuild
+                pass
+
+    def digest(self, path):
+        st = os.stat(path)
+        cached = self.data["files"].get(path)
+        if cached and cached["size"] == st.st_size and cached["mtime_ns"] == st.st_mtime_ns:
+            return cached["sha256"]
+        sha = file_digest(path)
+        self.data["files"][path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha}
+        return sha
+
+    def is_fresh(self, output, inputs, options=None):
+        """True if `output` was built from exactly these inputs and is untouched since."""
+        entry = self.data["outputs"].get(output)
+        if not entry or not os.path.exists(output):
+            return False
+        if entry.get("options", {}) != (options or {}):
+            return False
+        if set(entry["inputs"]) != set(inputs):
+            return False
+        for path in inputs:
+            if self.digest(path) != entry["inputs"][path]:
+                return False
+        return self.digest(output) == entry["sha256"]
+
+    def record(self, output, inputs, options=None):
+        self.data["outputs"][output] = {
+            "sha256": self.digest(output),
+            "inputs": {path: self.digest(path) for path in inputs},
+            "options": options or {},
+        }
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
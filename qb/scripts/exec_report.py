@@ -0,0 +1,373 @@
+import argparse
+import datetime
+import hashlib
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape
+
+import gl_db
+from gl_cube import NO_MONTH, SummaryCube
+from gl_ingest import GLIngest
+from gl_payload import ColumnarEncoder, days_to_date
+
+csv_path = "../QB GL Python Print - public_csv.csv"
+output_dir = "../reports"
+
+# Same parent mapping as categoryMap in the dashboard template
+CATEGORY_MAP = {
+    "Banking": "Accounting",
+    "Funding": "Balance Sheet",
+    "Accounting": "Accounting",
+    "Digital Distro Income": "Income",
+    "Asset": "Assets",
+    "Project COGS": "COGS",
+    "Expenses": "Expenses",
+    "D2C Physical Income": "Income",
+    "Income": "Income",
+    "Royalties": "Royalties",
+    "Transfers": "Accounting",
+    "Compensation": "Compensation",
+    "Income Distro OpEx": "Income_Contra",
+    "Freight COGS": "Freight COGS",
+    "Physical Distro Income": "Income",
+    "Sync Income": "Income",
+    "Income Reserves": "Income",
+    "Insurance": "Expenses",
+    "Other Income": "Income",
+    "Income Returns": "Income_Contra",
+    "Retained Earnings": "Equity",
+    "PRO Income": "Income",
+}
+
+# Report grouping -> position of its code in a cube cell key
+# (Class, Account, Category, Transaction Type, month)
+GROUPINGS = {"class": 0, "account": 1, "month": 4}
+
+# Same colours as the browser report
+COLOR_DARK = (15, 23, 42)
+COLOR_ACCENT = (79, 209, 197)
+COLOR_HEAD_TEXT = (11, 17, 32)
+
+
+def load_cube(path):
+    """Ingest the GL CSV once into summary cube cells.
+
+    Returns (strings, cells, ingest); malformed rows are left out and
+    counted in `ingest.rejected`.
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        ingest = GLIngest(f)
+        encoder = ColumnarEncoder(ingest.fields, typed=True)
+        cube = SummaryCube(encoder)
+        for row in ingest:
+            cube.add(encoder.encode(row))
+    return encoder.strings, cube.cells, ingest
+
+
+def summarize(cells, strings, keep):
+    """Fold the cube cells whose key passes `keep` into one report summary.
+
+    Mirrors the dashboard's addToSummary, but keeps amounts in cents.
+    """
+    s = {
+        "count": 0, "net": 0, "income": 0, "min_day": None, "max_day": None,
+        "by_class": {}, "by_account": {}, "by_category": {}, "income_by_category": {},
+    }
+    for key, (count, valued, total, pos, min_day, max_day) in cells.items():
+        if not keep(key):
+            continue
+        s["count"] += count
+        if valued:
+            cls = strings[key[0]] or "(No Class)"
+            acc = strings[key[1]] or "(No Account)"
+            cat = strings[key[2]]
+            s["net"] += total
+            s["income"] += pos
+            s["by_class"][cls] = s["by_class"].get(cls, 0) + total
+            s["by_account"][acc] = s["by_account"].get(acc, 0) + total
+            s["by_category"][cat] = s["by_category"].get(cat, 0) + total
+            if pos:
+                label = cat or "Uncategorized"
+                s["income_by_category"][label] = s["income_by_category"].get(label, 0) + pos
+        if min_day is not None and (s["min_day"] is None or min_day < s["min_day"]):
+            s["min_day"] = min_day
+        if max_day is not None and (s["max_day"] is None or max_day > s["max_day"]):
+            s["max_day"] = max_day
+    s["expense"] = s["net"] - s["income"]
+    return s
+
+
+def calculate_financials(category_totals):
+    """P&L and balance sheet lines from per-category totals, as calculateFinancials does."""
+    fin = dict.fromkeys(["Income", "COGS", "FreightCOGS", "Royalties", "Expenses", "Compensation",
+                         "Assets", "Liabilities", "Equity", "Funding"], 0)
+    parents = {"Income": "Income", "COGS": "COGS", "Freight COGS": "FreightCOGS", "Royalties": "Royalties",
+               "Expenses": "Expenses", "Compensation": "Compensation", "Assets": "Assets", "Equity": "Equity"}
+    for cat, amount in category_totals.items():
+        parent = CATEGORY_MAP.get(cat)
+        if parent == "Income_Contra":
+            fin["Income"] -= amount
+        elif parent in parents:
+            fin[parents[parent]] += amount
+        elif parent == "Balance Sheet" and cat == "Funding":
+            fin["Funding"] += amount
+    fin["GMBR"] = fin["Income"] - fin["COGS"] - fin["FreightCOGS"]
+    fin["GMAR"] = fin["GMBR"] - fin["Royalties"]
+    fin["OperatingIncome"] = fin["GMAR"] - fin["Expenses"]
+    fin["NetOperatingIncome"] = fin["OperatingIncome"] - fin["Compensation"]
+    return fin
+
+
+def month_label(month):
+    if month == NO_MONTH:
+        return "Undated"
+    year, m = divmod(month, 12)
+    return "%04d-%02d" % (year, m + 1)
+
+
+def parse_month(text):
+    """YYYY-MM -> months since year 0, as in the cube."""
+    m = re.match(r"^(\d{4})-(\d{1,2})$", text or "")
+    if not m or not 1 <= int(m.group(2)) <= 12:
+        raise ValueError(f"expected YYYY-MM, got {text!r}")
+    return int(m.group(1)) * 12 + int(m.group(2)) - 1
+
+
+def plan_reports(strings, cells, by, start=None, end=None):
+    """(file name, heading, summary) for every Class, Account or month.
+
+    `start`/`end` limit the months included, as the dashboard's whole-month
+    date filter does; like that filter, undated rows are always kept.
+    """
+    def in_range(month):
+        return month == NO_MONTH or ((start is None or month >= start) and (end is None or month <= end))
+
+    index = GROUPINGS[by]
+    groups = sorted({key[index] for key in cells if in_range(key[4])})
+    reports = []
+    used = set()
+    for code in groups:
+        if by == "month":
+            if code == NO_MONTH:
+                continue
+            label = month_label(code)
+        else:
+            label = strings[code] or ("(No Class)" if by == "class" else "(No Account)")
+        summary = summarize(cells, strings, lambda key: key[index] == code and in_range(key[4]))
+        slug = re.sub(r"[^A-Za-z0-9._-]+", "_", label).strip("_") or "blank"
+        # "A/B" and "A B" share a slug, and "A" and "a" a file on some systems
+        if slug != label or slug.casefold() in used:
+            slug += "_" + hashlib.blake2b(label.encode("utf-8"), digest_size=4).hexdigest()
+        used.add(slug.casefold())
+        reports.append((f"Executive_Report_{by}_{slug}.pdf", f"{by.title()}: {label}", summary))
+    return reports
+
+
+def money(cents):
+    """Cents -> "$1,234.56" / "-$1,234.56", like toLocaleString('en-US', USD)."""
+    dollars, rest = divmod(abs(cents), 100)
+    return "%s$%s.%02d" % ("-" if cents < 0 else "", f"{dollars:,}", rest)
+
+
+def require_reportlab():
+    try:
+        import reportlab  # noqa: F401
+    except ImportError:
+        raise ImportError("PDF output needs reportlab (pip install reportlab)") from None
+
+
+def render_report(path, heading, summary, top=15, logo=None, generated=None):
+    """Write one executive report PDF: title page, Executive Summary, P&L,
+    Balance Sheet and Top Classes/Accounts, laid out like generatePDF."""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.lib.units import mm
+    from reportlab.platypus import Image, PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    def rgb(c):
+        return colors.Color(*(v / 255 for v in c))
+
+    dark, accent, head_text, grey = rgb(COLOR_DARK), rgb(COLOR_ACCENT), rgb(COLOR_HEAD_TEXT), rgb((100, 100, 100))
+    band, noi_fill, noi_text = rgb((240, 240, 240)), rgb((230, 255, 250)), rgb((0, 100, 0))
+    generated = generated or datetime.date.today().strftime("%m/%d/%Y")
+
+    # Paragraph parses its text as markup; labels from the ledger are plain text
+    def centered(text, size, color):
+        return Paragraph(escape(text), ParagraphStyle("c", fontSize=size, leading=size * 1.2, alignment=1, textColor=color))
+
+    def title(text, size):
+        return Paragraph(escape(text), ParagraphStyle("t", fontSize=size, leading=size * 1.3, textColor=dark,
+                                              spaceBefore=4 * mm, spaceAfter=3 * mm))
+
+    def table(rows, widths, head_fill, head_color, extra=(), size=10, pad=4, grid=False, striped=False):
+        t = Table(rows, colWidths=widths, repeatRows=1, hAlign="LEFT")
+        style = [
+            ("BACKGROUND", (0, 0), (-1, 0), head_fill),
+            ("TEXTCOLOR", (0, 0), (-1, 0), head_color),
+            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+            ("FONTSIZE", (0, 0), (-1, -1), size),
+            ("ALIGN", (1, 0), (1, -1), "RIGHT"),
+            ("TOPPADDING", (0, 0), (-1, -1), pad),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), pad),
+            ("LEFTPADDING", (0, 0), (-1, -1), pad),
+            ("RIGHTPADDING", (0, 0), (-1, -1), pad),
+        ]
+        if grid:
+            style.append(("GRID", (0, 0), (-1, -1), 0.25, colors.lightgrey))
+        if striped:
+            style.append(("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, rgb((245, 245, 245))]))
+        t.setStyle(TableStyle(style + list(extra)))
+        return t
+
+    story = []
+
+    # --- PAGE 1: TITLE PAGE ---
+    story.append(Spacer(1, 40 * mm))
+    if logo:
+        img = Image(logo)
+        img.drawHeight = img.drawHeight * 50 * mm / img.drawWidth
+        img.drawWidth = 50 * mm
+        story.append(img)
+    else:
+        story.append(centered("Mexican Summer", 24, dark))
+    story += [
+        Spacer(1, 35 * mm),
+        centered("Quickbooks Transaction History", 26, dark),
+        Spacer(1, 6 * mm),
+        centered(heading, 16, dark),
+        Spacer(1, 6 * mm),
+        centered(f"Report Generated: {generated}", 14, grey),
+        Spacer(1, 100 * mm),
+        centered("Internal Executive Report", 10, grey),
+        PageBreak(),
+    ]
+
+    # --- PAGE 2: EXECUTIVE SUMMARY ---
+    story.append(title("Executive Summary", 22))
+    if summary["min_day"] is not None and summary["max_day"] is not None:
+        date_range = f"{days_to_date(summary['min_day'])} to {days_to_date(summary['max_day'])}"
+    else:
+        date_range = "All Time"
+    rows = [
+        ["Metric", "Value"],
+        ["Report Date Range", date_range],
+        ["Total Transactions", f"{summary['count']:,}"],
+        ["Total Income", money(summary["income"])],
+    ]
+    breakdown = sorted(summary["income_by_category"].items(), key=lambda kv: -kv[1])
+    rows += [[f"   {cat}", money(val)] for cat, val in breakdown]
+    rows += [["Total Expenses", money(summary["expense"])], ["Net Amount", money(summary["net"])]]
+    first, last = 4, 3 + len(breakdown)
+    story.append(table(rows, [100 * mm, 82 * mm], dark, colors.white, size=11, pad=6, striped=True, extra=[
+        ("FONTNAME", (0, 1), (0, -1), "Helvetica-Bold"),
+        ("FONTNAME", (0, first), (0, last), "Helvetica-Oblique"),
+        ("TEXTCOLOR", (0, first), (-1, last), grey),
+        ("FONTSIZE", (1, first), (1, last), 9),
+    ] if breakdown else [("FONTNAME", (0, 1), (0, -1), "Helvetica-Bold")]))
+
+    fin = calculate_financials(summary["by_category"])
+
+    def bold(r, fill):
+        return [("FONTNAME", (0, r), (-1, r), "Helvetica-Bold"), ("BACKGROUND", (0, r), (-1, r), fill)]
+
+    story.append(title("Profit & Loss Statement", 14))
+    pnl = [
+        ["Metric", "Value"],
+        ["Income", money(fin["Income"])],
+        ["   COGS", money(-fin["COGS"])],
+        ["   Freight COGS", money(-fin["FreightCOGS"])],
+        ["Gross Margin Before Royalties", money(fin["GMBR"])],
+        ["   Royalties", money(-fin["Royalties"])],
+        ["Gross Margin After Royalties", money(fin["GMAR"])],
+        ["   Expenses (Op & Ins)", money(-fin["Expenses"])],
+        ["Operating Income", money(fin["OperatingIncome"])],
+        ["   Compensation", money(-fin["Compensation"])],
+        ["Net Operating Income", money(fin["NetOperatingIncome"])],
+    ]
+    story.append(table(pnl, [120 * mm, 62 * mm], accent, head_text, extra=(
+        bold(4, band) + bold(6, band) + bold(8, band) + bold(10, noi_fill) + [("TEXTCOLOR", (0, 10), (-1, 10), noi_text)]
+    )))
+
+    story.append(title("Balance Sheet", 14))
+    bs = [
+        ["Item", "Value"],
+        ["Assets", money(fin["Assets"])],
+        ["   Liabilities", money(fin["Liabilities"])],
+        ["Equity (Retained Earnings)", money(fin["Equity"])],
+        ["Funding", money(fin["Funding"])],
+    ]
+    story.append(table(bs, [120 * mm, 62 * mm], accent, head_text, extra=(
+        [("FONTNAME", (0, 1), (0, 1), "Helvetica-Bold"), ("FONTNAME", (0, 3), (0, 3), "Helvetica-Bold")] + bold(4, band)
+    )))
+
+    for label, totals in (("Class", summary["by_class"]), ("Account", summary["by_account"])):
+        ranked = sorted(totals.items(), key=lambda kv: -abs(kv[1]))[:top]
+        story.append(title(f"Top {label}{'es' if label == 'Class' else 's'} (By Magnitude)", 14))
+        story.append(table([[label, "Total Amount"]] + [[k, money(v)] for k, v in ranked],
+                           [130 * mm, 52 * mm], accent, head_text, grid=True))
+
+    doc = SimpleDocTemplate(path, pagesize=A4, leftMargin=14 * mm, rightMargin=14 * mm,
+                            topMargin=14 * mm, bottomMargin=17 * mm, title=f"Executive Report - {heading}")
+    doc.build(story)
+    return path
+
+
+def _render_job(job):
+    path, heading, summary, top, logo, generated = job
+    return render_report(path, heading, summary, top, logo, generated)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render executive summary PDFs, one per Class, Account or month.")
+    parser.add_argument("--by", choices=list(GROUPINGS), required=True, help="one report per distinct value of this")
+    parser.add_argument("--csv", default=csv_path, help="GL CSV export to read")
+    parser.add_argument("--db", nargs="?", const=gl_db.db_path, metavar="SQLITE",
+                        help=f"read the GL from the SQLite store (default {gl_db.db_path}) instead of the CSV")
+    parser.add_argument("--output-dir", default=output_dir)
+    parser.add_argument("--start", help="first month to include, YYYY-MM")
+    parser.add_argument("--end", help="last month to include, YYYY-MM")
+    parser.add_argument("--top", type=int, default=15, help="rows in the Top Classes/Accounts tables")
+    parser.add_argument("--logo", help="PNG to place on the title page")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="worker processes")
+    args = parser.parse_args()
+
+    try:
+        require_reportlab()
+        start = parse_month(args.start) if args.start else None
+        end = parse_month(args.end) if args.end else None
+
+        t0 = time.perf_counter()
+        if args.db:
+            source = args.db
+            strings, cells = gl_db.cube_cells(gl_db.connect(args.db))
+        else:
+            source = args.csv
+            strings, cells, ingest = load_cube(args.csv)
+            if ingest.rejected:
+                print(f"Skipped {ingest.rejected:,} malformed rows; run gl_ingest.py {args.csv} to list them")
+        reports = plan_reports(strings, cells, args.by, start, end)
+        t1 = time.perf_counter()
+        print(f"Read {source} into {len(cells):,} cube cells in {t1 - t0:.2f}s; rendering {len(reports)} reports")
+
+        os.makedirs(args.output_dir, exist_ok=True)
+        generated = datetime.date.today().strftime("%m/%d/%Y")
+        jobs = [(os.path.join(args.output_dir, name), heading, summary, args.top, args.logo, generated)
+                for name, heading, summary in reports]
+        if args.jobs > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+                written = list(pool.map(_render_job, jobs, chunksize=max(1, len(jobs) // (args.jobs * 4))))
+        else:
+            written = [_render_job(job) for job in jobs]
+        print(f"Wrote {len(written)} PDFs to {args.output_dir} in {time.perf_counter() - t1:.2f}s")
+
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
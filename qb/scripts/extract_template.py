@@ -1,23 +1,15 @@
-
-import re
+from build_dashboard import DATA_CLOSE, DATA_OPEN, PLACEHOLDER
+from marker_split import find_region, mapped, splice
 
 input_path = "../index.html"
 output_path = "accounting_dashboard_template.html"
 
-with open(input_path, "r", encoding="utf-8") as f:
-    content = f.read()
-
-# Regex to find the variable and its backticked content
-# const LOCAL_CSV_DATA = `...`;
-# We use non-greedy match for the content
-pattern = r'(const LOCAL_CSV_DATA = `)([\s\S]*?)(`;)'
-
-def replace_fn(match):
-    return match.group(1) + "__CSV_DATA_PLACEHOLDER__" + match.group(3)
-
-new_content = re.sub(pattern, replace_fn, content)
-
-with open(output_path, "w", encoding="utf-8") as f:
-    f.write(new_content)
+# Find the embedded data block by its markers and swap the payload for the
+# placeholder; the page is memory-mapped and copied through in chunks
+# <script id="local-gl-data" type="application/json">...</script>
+with mapped(input_path) as buf:
+    start, end = find_region(buf, DATA_OPEN.encode(), DATA_CLOSE.encode())
+    with open(output_path, "wb") as out:
+        splice(buf, [(start, end, PLACEHOLDER.encode())], out.write)
 
 print(f"Extracted template to {output_path}")
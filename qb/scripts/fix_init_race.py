@@ -1,4 +1,4 @@
-import os
+from patch_engine import Patch, patch_file
 
 file_path = "/Users/warren/Desktop/web-apps (EMAILED JAN 29)/QB Tool/accounting_dashboard_v2.html"
 
@@ -18,9 +18,6 @@ file_path = "/Users/warren/Desktop/web-apps (EMAILED JAN 29)/QB Tool/accounting_
 
 # We will wrap the top part.
 
-with open(file_path, 'r', encoding='utf-8') as f:
-    content = f.read()
-
 # Target the start of the logic
 start_target = """try {
         // User Guide Modal
@@ -58,11 +55,11 @@ replacement_end = """    fetchCSV();
         });
         } catch (err) {"""
 
-# Apply changes
-content = content.replace(start_target, replacement_start)
-content = content.replace(end_target, replacement_end)
-
-with open(file_path, 'w', encoding='utf-8') as f:
-    f.write(content)
+PATCHES = [
+    Patch("fix_init_race: DOMContentLoaded start", start_target, replacement_start),
+    Patch("fix_init_race: DOMContentLoaded end", end_target, replacement_end),
+]
 
-print("Successfully wrapped initialization in DOMContentLoaded.")
+if __name__ == "__main__":
+    patch_file(file_path, PATCHES)
+    print("Successfully wrapped initialization in DOMContentLoaded.")
@@ -1,16 +1,14 @@
-import os
+from patch_engine import Patch, patch_file
 
 file_path = "/Users/warren/Desktop/web-apps (EMAILED JAN 29)/QB Tool/accounting_dashboard_v2.html"
 
 target = "populateFilters(rawData); initTable();"
 replacement = "populateFilters(rawData); initTable(); renderSummaries(rawData);"
 
-with open(file_path, 'r', encoding='utf-8') as f:
-    content = f.read()
+PATCHES = [
+    Patch("fix_summary_init: renderSummaries on load", target, replacement),
+]
 
-new_content = content.replace(target, replacement)
-
-with open(file_path, 'w', encoding='utf-8') as f:
-    f.write(new_content)
-
-print("Successfully updated initialization logic.")
+if __name__ == "__main__":
+    patch_file(file_path, PATCHES)
+    print("Successfully updated initialization logic.")
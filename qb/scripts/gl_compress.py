@@ -0,0 +1,95 @@
+import base64
+import io
+import os
+import time
+import zlib
+
+from gl_payload import iter_payload
+
+# DecompressionStream format name -> zlib wbits
+ENCODINGS = {
+    "gzip": 31,
+    "deflate-raw": -15,
+}
+
+# Suffix of the sibling asset written with --compressed-asset
+SUFFIXES = {
+    "gzip": ".gz",
+    "deflate-raw": ".deflate",
+}
+
+COMPRESSED_FORMAT = "gl-compressed"
+
+
+def iter_compressed(byte_chunks, encoding, level=6):
+    """Compress an iterable of bytes incrementally with gzip or raw deflate."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, ENCODINGS[encoding])
+    for chunk in byte_chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def iter_base64(byte_chunks):
+    """Base64-encode an iterable of bytes, carrying leftovers to keep 3-byte alignment."""
+    carry = b""
+    for chunk in byte_chunks:
+        data = carry + chunk
+        cut = len(data) - len(data) % 3
+        carry = data[cut:]
+        if cut:
+            yield base64.b64encode(data[:cut]).decode("ascii")
+    if carry:
+        yield base64.b64encode(carry).decode("ascii")
+
+
+def decompress(data, encoding):
+    return zlib.decompress(data, ENCODINGS[encoding])
+
+
+def read_envelope(envelope, page_dir="."):
+    """Decompressed payload bytes of an embedded gl-compressed envelope.
+
+    Inline envelopes carry base64 `data`; asset builds point `src` at a
+    file next to the page in `page_dir`.
+    """
+    if "data" in envelope:
+        packed = base64.b64decode(envelope["data"])
+    else:
+        with open(os.path.join(page_dir, envelope["src"]), "rb") as f:
+            packed = f.read()
+    return decompress(packed, envelope["encoding"])
+
+
+def measure(csv_text, sections=(), repeat=5):
+    """Plain vs compressed payload sizes and timings for a CSV held in memory.
+
+    Returns one dict per encoding; decompression time is the best of
+    `repeat` runs, which is close to what DecompressionStream costs since
+    both are zlib underneath.
+    """
+    plain = "".join(iter_payload(io.StringIO(csv_text, newline=""), sections)).encode("utf-8")
+    results = []
+    for encoding in ENCODINGS:
+        start = time.perf_counter()
+        packed = b"".join(iter_compressed([plain], encoding))
+        compress_s = time.perf_counter() - start
+
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            decompress(packed, encoding)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        results.append({
+            "encoding": encoding,
+            "plain_bytes": len(plain),
+            "compressed_bytes": len(packed),
+            "base64_bytes": (len(packed) + 2) // 3 * 4,
+            "ratio": len(plain) / len(packed) if packed else 0,
+            "compress_s": compress_s,
+            "decompress_s": best,
+        })
+    return results
@@ -0,0 +1,70 @@
+from gl_payload import AMOUNT_FIELD, DATE_FIELD, days_to_date
+
+# Dimensions the dashboard summaries can be answered from, besides the month
+CUBE_DIMS = ["Class", "Account", "Category", "Transaction Type"]
+
+# Rows without a parseable date land in this month bucket; like the row
+# filter, the dashboard keeps them whatever the date range
+NO_MONTH = -1
+
+# Per-cell layout after the dimension codes and month:
+# rows, rows with an amount, sum of cents, sum of positive cents, min day, max day
+CELL_FIELDS = CUBE_DIMS + ["month", "count", "valued", "sum", "pos", "min_day", "max_day"]
+
+_month_cache = {}
+
+
+def month_of(days):
+    """Epoch days -> months since year 0 (year * 12 + month - 1)."""
+    if days is None:
+        return NO_MONTH
+    month = _month_cache.get(days)
+    if month is None:
+        d = days_to_date(days)
+        month = _month_cache[days] = d.year * 12 + d.month - 1
+    return month
+
+
+class SummaryCube:
+    """Class x Account x Category x Transaction Type x month sums and counts.
+
+    Fed one encoded row at a time while the payload is written, so the
+    dashboard's Class/Account/P&L summaries and the PDF executive summary
+    can be answered in O(cells) instead of O(rows).
+    """
+
+    # Key of this section in the payload object
+    name = "cube"
+
+    def __init__(self, encoder):
+        fields = encoder.fields
+        self.dim_index = [fields.index(f) if f in fields else None for f in CUBE_DIMS]
+        self.amount_index = fields.index(AMOUNT_FIELD) if AMOUNT_FIELD in fields else None
+        self.date_index = fields.index(DATE_FIELD) if DATE_FIELD in fields else None
+        self.cells = {}
+
+    def add(self, row):
+        cents = None if self.amount_index is None else row[self.amount_index]
+        days = None if self.date_index is None else row[self.date_index]
+        key = tuple(0 if j is None else row[j] for j in self.dim_index) + (month_of(days),)
+        cell = self.cells.get(key)
+        if cell is None:
+            cell = self.cells[key] = [0, 0, 0, 0, None, None]
+        cell[0] += 1
+        if cents is not None:
+            cell[1] += 1
+            cell[2] += cents
+            if cents > 0:
+                cell[3] += cents
+        if days is not None:
+            if cell[4] is None or days < cell[4]:
+                cell[4] = days
+            if cell[5] is None or days > cell[5]:
+                cell[5] = days
+
+    def to_json(self):
+        flat = []
+        for key, cell in self.cells.items():
+            flat.extend(key)
+            flat.extend(cell)
+        return {"fields": CELL_FIELDS, "cells": flat}
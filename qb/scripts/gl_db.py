@@ -0,0 +1,291 @@
+import argparse
+import datetime
+import os
+import sqlite3
+import sys
+import time
+
+from gl_ingest import GLIngest, RejectsFile
+from gl_payload import AMOUNT_FIELD, DATE_FIELD, EPOCH_ORDINAL, days_to_date, format_cents
+from gl_search import TEXT_INDEX_FIELDS
+
+csv_path = "../QB GL Python Print - public_csv.csv"
+db_path = "../gl.sqlite"
+rejects_path = "../gl-rejects.csv"
+
+TABLE = "gl"
+TEXT_TABLE = "gl_text"
+META_TABLE = "gl_meta"
+
+# Columns with a B-tree index; the others are scanned
+INDEXED_FIELDS = [DATE_FIELD, "Class", "Account", "Transaction Type"]
+
+# `totals --by` -> SQL grouping expression
+GROUPINGS = {
+    "class": '"Class"',
+    "account": '"Account"',
+    "category": '"Category"',
+    "type": '"Transaction Type"',
+    "month": 'substr("Date", 1, 7)',
+}
+
+# `totals` filter options -> column, matched like the dashboard's filter inputs:
+# rows whose value contains the option (LIKE, so case folds for ASCII only)
+FILTER_FIELDS = {
+    "class": "Class",
+    "account": "Account",
+    "type": "Transaction Type",
+    "category": "Category",
+    "master": "Master_Vertical",
+}
+
+# Trigram tokens give the dashboard's substring matching (SQLite 3.34+)
+FTS_TOKENIZERS = ["trigram", "unicode61"]
+
+
+def quote(name):
+    return '"%s"' % name.replace('"', '""')
+
+
+def to_sql_row(row, date_index):
+    """A typed ingest row as stored: Date as ISO text, Amount as integer cents."""
+    if date_index is not None and row[date_index] is not None:
+        row[date_index] = days_to_date(row[date_index]).isoformat()
+    return row
+
+
+def load(csv_file, path, rejects=None):
+    """Load the GL CSV into a fresh SQLite database at `path`.
+
+    Rows go in through one `executemany` in a single transaction, and the
+    indexes and full-text index are built after the insert, which is much
+    faster than maintaining them row by row. The database is written
+    aside and moved into place, so a reader never sees half a load.
+    Returns the ingest.
+    """
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        # A failed load leaves only the temporary file, so no journal is needed
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        with open(csv_file, "r", encoding="utf-8", newline="") as f:
+            ingest = GLIngest(f, rejects)
+            fields = ingest.fields
+            columns = []
+            for field in fields:
+                kind = "INTEGER" if field == AMOUNT_FIELD else "TEXT"
+                columns.append(f"{quote(field)} {kind}")
+            with conn:
+                conn.execute(f"CREATE TABLE {TABLE} (id INTEGER PRIMARY KEY, {', '.join(columns)})")
+                placeholders = ", ".join("?" * len(fields))
+                date_index = ingest.date_index
+                conn.executemany(
+                    f"INSERT INTO {TABLE} ({', '.join(map(quote, fields))}) VALUES ({placeholders})",
+                    (to_sql_row(row, date_index) for row in ingest))
+
+                for field in INDEXED_FIELDS:
+                    if field in fields:
+                        name = "%s_%s" % (TABLE, "".join(c if c.isalnum() else "_" for c in field.lower()))
+                        # Text filters match case-insensitively, like the dashboard's
+                        collate = "" if field == DATE_FIELD else " COLLATE NOCASE"
+                        conn.execute(f"CREATE INDEX {name} ON {TABLE} ({quote(field)}{collate})")
+
+                text_fields = [f for f in TEXT_INDEX_FIELDS if f in fields]
+                for tokenizer in FTS_TOKENIZERS:
+                    try:
+                        conn.execute(f"CREATE VIRTUAL TABLE {TEXT_TABLE} USING fts5("
+                                     f"{', '.join(map(quote, text_fields))}, content={TABLE}, content_rowid=id, "
+                                     f"tokenize='{tokenizer}')")
+                        break
+                    except sqlite3.OperationalError:
+                        continue
+                conn.execute(f"INSERT INTO {TEXT_TABLE}({TEXT_TABLE}) VALUES ('rebuild')")
+
+                conn.execute(f"CREATE TABLE {META_TABLE} (key TEXT PRIMARY KEY, value TEXT)")
+                conn.executemany(f"INSERT INTO {META_TABLE} VALUES (?, ?)", [
+                    ("source", os.path.abspath(csv_file)),
+                    ("rows", str(ingest.rows)),
+                    ("rejected", str(ingest.rejected)),
+                    ("tokenizer", tokenizer),
+                    ("loaded", datetime.datetime.now().isoformat(timespec="seconds")),
+                ])
+            conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+    return ingest
+
+
+def connect(path=db_path):
+    """Read-only connection to a loaded GL database."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found; run `python3 gl_db.py load` first")
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+
+def meta(conn):
+    return dict(conn.execute(f"SELECT key, value FROM {META_TABLE}"))
+
+
+def columns(conn):
+    return [r[1] for r in conn.execute(f"PRAGMA table_info({TABLE})")][1:]
+
+
+def like_pattern(text):
+    """LIKE pattern for values containing `text`, with its wildcards escaped."""
+    return "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def text_match(conn, text):
+    """WHERE clause and parameters for rows whose Name, Vendor or Memo contain `text`.
+
+    The trigram index needs three characters; shorter text is scanned.
+    """
+    if meta(conn).get("tokenizer") == "trigram" and len(text) >= 3:
+        return f"id IN (SELECT rowid FROM {TEXT_TABLE} WHERE {TEXT_TABLE} MATCH ?)", ['"%s"' % text.replace('"', '""')]
+    fields = [f for f in TEXT_INDEX_FIELDS if f in columns(conn)]
+    return "(" + " OR ".join(f"{quote(f)} LIKE ? ESCAPE '\\'" for f in fields) + ")", [like_pattern(text)] * len(fields)
+
+
+def where(conn, filters):
+    """WHERE clause and parameters for `filters` (start, end, name, exact, and FILTER_FIELDS keys).
+
+    With `exact`, FILTER_FIELDS values must match whole (ignoring case),
+    which seeks the column indexes instead of scanning every row.
+    """
+    clauses, params = [], []
+    if filters.get("start") or filters.get("end"):
+        # Like the dashboard, rows without a date are kept by a date range
+        clauses.append('("Date" BETWEEN ? AND ? OR "Date" IS NULL)')
+        params.extend([filters.get("start") or "", filters.get("end") or "9999-12-31"])
+    for key, field in FILTER_FIELDS.items():
+        value = (filters.get(key) or "").strip()
+        if not value:
+            continue
+        if filters.get("exact"):
+            clauses.append(f"{quote(field)} = ? COLLATE NOCASE")
+            params.append(value)
+        else:
+            clauses.append(f"{quote(field)} LIKE ? ESCAPE '\\'")
+            params.append(like_pattern(value))
+    if filters.get("name"):
+        clause, extra = text_match(conn, filters["name"])
+        clauses.append(clause)
+        params.extend(extra)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def totals(conn, by, filters):
+    """(group, rows, net cents, income cents) per value of `by`, largest net first."""
+    sql_where, params = where(conn, filters)
+    group = GROUPINGS[by]
+    return conn.execute(
+        f"SELECT {group}, COUNT(*), COALESCE(SUM({quote(AMOUNT_FIELD)}), 0), "
+        f"COALESCE(SUM(CASE WHEN {quote(AMOUNT_FIELD)} > 0 THEN {quote(AMOUNT_FIELD)} END), 0) "
+        f"FROM {TABLE}{sql_where} GROUP BY 1 ORDER BY 3 DESC", params).fetchall()
+
+
+def cube_cells(conn):
+    """Summary cube cells (see gl_cube.SummaryCube) grouped in SQL.
+
+    Returns (strings, cells) with the same shape exec_report builds from
+    the CSV: cells keyed by (Class, Account, Category, Type codes, month).
+    """
+    epoch = datetime.date.fromordinal(EPOCH_ORDINAL).isoformat()
+    day = f"CAST(julianday(\"Date\") - julianday('{epoch}') AS INTEGER)"
+    amount = quote(AMOUNT_FIELD)
+    rows = conn.execute(
+        f'SELECT "Class", "Account", "Category", "Transaction Type", '
+        f'COALESCE(CAST(substr("Date", 1, 4) AS INTEGER) * 12 + CAST(substr("Date", 6, 2) AS INTEGER) - 1, -1), '
+        f"COUNT(*), COUNT({amount}), COALESCE(SUM({amount}), 0), "
+        f"COALESCE(SUM(CASE WHEN {amount} > 0 THEN {amount} END), 0), MIN({day}), MAX({day}) "
+        f"FROM {TABLE} GROUP BY 1, 2, 3, 4, 5")
+    strings = [""]
+    codes = {"": 0}
+    cells = {}
+    for r in rows:
+        key = []
+        for text in r[:4]:
+            code = codes.get(text)
+            if code is None:
+                code = codes[text] = len(strings)
+                strings.append(text)
+            key.append(code)
+        key.append(r[4])
+        cells[tuple(key)] = list(r[5:])
+    return strings, cells
+
+
+def search(conn, text, limit):
+    sql_where, params = where(conn, {"name": text})
+    return conn.execute(f"SELECT * FROM {TABLE}{sql_where} ORDER BY id LIMIT ?", params + [limit])
+
+
+def print_rows(cursor):
+    print("\t".join(d[0] for d in cursor.description))
+    for row in cursor:
+        print("\t".join("" if v is None else str(v) for v in row))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load the GL into SQLite and query it.")
+    parser.add_argument("--db", default=db_path, help="database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("load", help="(re)load the database from a GL CSV export")
+    p.add_argument("--csv", default=csv_path, help="GL CSV export to load")
+    p.add_argument("--rejects", default=rejects_path, help="CSV to list rejected rows in")
+
+    p = commands.add_parser("totals", help="row counts and totals grouped by a column")
+    p.add_argument("--by", choices=list(GROUPINGS), required=True)
+    p.add_argument("--start", help="first date, YYYY-MM-DD")
+    p.add_argument("--end", help="last date, YYYY-MM-DD")
+    for key in FILTER_FIELDS:
+        p.add_argument(f"--{key}", help=f"only rows whose {FILTER_FIELDS[key]} contains this")
+    p.add_argument("--exact", action="store_true",
+                   help="match the --class/--account/... values whole (uses the indexes) instead of as substrings")
+    p.add_argument("--name", help="only rows whose Name, Vendor or Memo contains this")
+
+    p = commands.add_parser("search", help="rows whose Name, Vendor or Memo contains TEXT")
+    p.add_argument("text")
+    p.add_argument("--limit", type=int, default=50)
+
+    p = commands.add_parser("sql", help=f"run a query against the {TABLE} table and print the rows")
+    p.add_argument("query")
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == "load":
+            start = time.perf_counter()
+            with RejectsFile(args.rejects) as rejects:
+                ingest = load(args.csv, args.db, rejects)
+            print(ingest.report())
+            if ingest.rejected:
+                print(f"Left out {ingest.rejected:,} malformed rows; see {args.rejects} for the reasons.")
+            print(f"Loaded {args.db} in {time.perf_counter() - start:.2f}s")
+            return
+
+        conn = connect(args.db)
+        start = time.perf_counter()
+        if args.command == "totals":
+            filters = {k: getattr(args, k) for k in ["start", "end", "name", "exact"] + list(FILTER_FIELDS)}
+            result = totals(conn, args.by, filters)
+            elapsed = time.perf_counter() - start
+            for group, count, net, income in result:
+                print(f"{group or '(none)':<40} {count:>9,} {format_cents(net):>16} {format_cents(income):>16}")
+            print(f"{len(result)} groups in {elapsed * 1000:.1f} ms")
+        elif args.command == "search":
+            print_rows(search(conn, args.text, args.limit))
+        else:
+            print_rows(conn.execute(args.query))
+    except (OSError, sqlite3.Error, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
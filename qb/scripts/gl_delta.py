@@ -0,0 +1,251 @@
+import hashlib
+import json
+import os
+import zlib
+from array import array
+
+from build_manifest import file_digest
+from gl_ingest import GLIngest
+from gl_payload import DATE_FIELD
+from gl_shards import SHARD_INDEX_NAME, partition_of, shard_file_name, write_shards
+
+ROW_STORE_FORMAT = "gl-row-store"
+ROW_STORE_VERSION = 1
+ROW_STORE_NAME = "gl-rows.json"
+
+# A row keeps its identity through an edit if these cells are unchanged, so
+# a removed and an added row sharing them count as one changed row
+IDENTITY_FIELDS = ["Transaction Type", "Num", "Name", "Account"]
+
+
+def row_hash(row):
+    """Stable 64-bit hash of a typed row's content.
+
+    Typed Amount and Date are hashed as cents and days, so reformatting
+    them in the export (1,234.00 vs 1234) doesn't count as a change.
+    """
+    text = "\x1f".join("" if v is None else str(v) for v in row)
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def rows_file_name(key):
+    return "gl-rows-%s.bin" % key
+
+
+class PartitionRows:
+    """Content and identity hashes of one partition's rows."""
+
+    def __init__(self):
+        self.hashes = array("Q")
+        self.identities = array("L")
+
+    def add(self, h, identity):
+        self.hashes.append(h)
+        self.identities.append(identity)
+
+    def sort(self):
+        """Order by content hash, so two exports' partitions compare as bytes."""
+        order = sorted(range(len(self.hashes)), key=self.hashes.__getitem__)
+        self.hashes = array("Q", map(self.hashes.__getitem__, order))
+        self.identities = array("L", map(self.identities.__getitem__, order))
+        return self
+
+    def to_bytes(self):
+        return self.hashes.tobytes() + self.identities.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data, n):
+        part = cls()
+        part.hashes.frombytes(data[:n * part.hashes.itemsize])
+        part.identities.frombytes(data[n * part.hashes.itemsize:])
+        return part
+
+
+def scan(ingest, partition):
+    """Hash every typed row of `ingest` into its month/year partition."""
+    fields = ingest.fields
+    date_index = fields.index(DATE_FIELD) if DATE_FIELD in fields else None
+    identity_index = [fields.index(f) for f in IDENTITY_FIELDS if f in fields]
+    parts = {}
+    for row in ingest:
+        key = partition_of(row[date_index] if date_index is not None else None, partition)[0]
+        part = parts.get(key)
+        if part is None:
+            part = parts[key] = PartitionRows()
+        identity = zlib.crc32("\x1f".join(row[j] for j in identity_index).encode("utf-8"))
+        part.add(row_hash(row), identity)
+    return {key: part.sort() for key, part in parts.items()}
+
+
+def _diff(old, new):
+    """Identities of the rows only in `old` and only in `new` (both sorted by hash)."""
+    removed, added = [], []
+    i = j = 0
+    a, b = old.hashes, new.hashes
+    while i < len(a) or j < len(b):
+        if j == len(b) or (i < len(a) and a[i] < b[j]):
+            removed.append(old.identities[i])
+            i += 1
+        elif i == len(a) or b[j] < a[i]:
+            added.append(new.identities[j])
+            j += 1
+        else:
+            i += 1
+            j += 1
+    return removed, added
+
+
+class RowStore:
+    """Hashes of the rows behind the last sharded build, one file per partition.
+
+    `gl-rows.json` records the partition scheme, columns, payload sections
+    and build-script digest the shards were encoded with; if any of them
+    differ, every partition is rebuilt.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self.meta = {}
+        path = os.path.join(store_dir, ROW_STORE_NAME)
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                if meta.get("format") == ROW_STORE_FORMAT and meta.get("version") == ROW_STORE_VERSION:
+                    self.meta = meta
+            except (OSError, ValueError):
+                # A corrupt store just means a full rebuild
+                pass
+
+    def matches(self, settings):
+        return bool(self.meta) and all(self.meta.get(k) == v for k, v in settings.items())
+
+    def keys(self):
+        return set(self.meta.get("partitions", {}))
+
+    def load(self, key):
+        n = self.meta["partitions"][key]
+        try:
+            with open(os.path.join(self.store_dir, rows_file_name(key)), "rb") as f:
+                return PartitionRows.from_bytes(f.read(), n)
+        except OSError:
+            return None
+
+    def save(self, settings, parts, written):
+        """Record `parts` as the current rows; only partitions in `written` are rewritten."""
+        os.makedirs(self.store_dir, exist_ok=True)
+        for key in written:
+            with open(os.path.join(self.store_dir, rows_file_name(key)), "wb") as f:
+                f.write(parts[key].to_bytes())
+        for key in self.keys() - set(parts):
+            path = os.path.join(self.store_dir, rows_file_name(key))
+            if os.path.exists(path):
+                os.remove(path)
+        self.meta = dict(settings, format=ROW_STORE_FORMAT, version=ROW_STORE_VERSION,
+                         partitions={key: len(part.hashes) for key, part in sorted(parts.items())})
+        tmp_path = os.path.join(self.store_dir, ROW_STORE_NAME + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, indent=1)
+        os.replace(tmp_path, os.path.join(self.store_dir, ROW_STORE_NAME))
+
+
+class Delta:
+    """Row changes between the last build and this export."""
+
+    def __init__(self):
+        self.added = self.removed = self.changed = 0
+        self.affected = set()
+        self.partitions = 0
+        self.full = False
+
+    def report(self):
+        if self.full:
+            return f"Rebuilt all {self.partitions} partitions (no usable row store)."
+        return (f"Delta: {self.added:,} added, {self.changed:,} changed, {self.removed:,} removed rows; "
+                f"rewrote {len(self.affected)} of {self.partitions} partitions.")
+
+
+def sources_digest(paths):
+    h = hashlib.sha256()
+    for path in sorted(paths):
+        h.update(file_digest(path).encode("ascii"))
+    return h.hexdigest()
+
+
+def update_shards(csv_file, rejects, shard_dir, store_dir, partition, sections, base_url, sources, force=False):
+    """Bring the shards in `shard_dir` up to date with `csv_file`, rewriting only what changed.
+
+    The export is read once and every row hashed. Each partition's hashes
+    are compared with the row store; a partition is rewritten if its rows
+    differ, or if its shard is missing or not the size the last index says.
+    Only then is the export read a second time, skipping the rows of every
+    other partition, so a day's new transactions re-encode one shard (with
+    its cube and text index) rather than the ledger. `force` rewrites all.
+
+    Returns (shard index, changed shard files, ingest of the first pass, Delta).
+    """
+    with open(csv_file, "r", encoding="utf-8", newline="") as src:
+        ingest = GLIngest(src, rejects)
+        parts = scan(ingest, partition)
+
+    settings = {
+        "partition": partition,
+        "fields": ingest.fields,
+        "sections": [s.name for s in sections],
+        "base": base_url,
+        "sources": sources_digest(sources),
+    }
+    store = RowStore(store_dir)
+    previous = {}
+    index_path = os.path.join(shard_dir, SHARD_INDEX_NAME)
+    if not force and store.matches(settings) and os.path.exists(index_path):
+        with open(index_path, "r", encoding="utf-8") as f:
+            previous = {e["key"]: e for e in json.load(f).get("shards", []) if "max_day" in e}
+
+    delta = Delta()
+    delta.partitions = len(parts)
+    delta.full = not previous
+    removed, added = [], []
+    for key in sorted(set(parts) | store.keys()):
+        new = parts.get(key)
+        entry = previous.get(key)
+        old = store.load(key) if entry and key in store.keys() else None
+        if new is None:
+            # Every row of this partition is gone; its shard is dropped
+            if old is not None:
+                removed.extend(old.identities)
+            continue
+        shard_path = os.path.join(shard_dir, shard_file_name(key))
+        intact = entry is not None and os.path.exists(shard_path) and os.path.getsize(shard_path) == entry["bytes"]
+        if old is not None and old.hashes == new.hashes and intact:
+            continue
+        delta.affected.add(key)
+        if old is None:
+            added.extend(new.identities)
+        else:
+            r, a = _diff(old, new)
+            removed.extend(r)
+            added.extend(a)
+
+    # A removed and an added row with the same identity were one row, edited
+    unmatched = {}
+    for identity in removed:
+        unmatched[identity] = unmatched.get(identity, 0) + 1
+    for identity in added:
+        if unmatched.get(identity):
+            unmatched[identity] -= 1
+            delta.changed += 1
+    delta.added = len(added) - delta.changed
+    delta.removed = len(removed) - delta.changed
+
+    kept = [previous[key] for key in sorted(parts) if key not in delta.affected]
+    if delta.affected:
+        with open(csv_file, "r", encoding="utf-8", newline="") as src:
+            rows = GLIngest(src)
+            index, changed = write_shards(ingest.fields, rows, shard_dir, partition, sections, base_url,
+                                          only=delta.affected, kept=kept)
+    else:
+        index, changed = write_shards(ingest.fields, (), shard_dir, partition, sections, base_url, only=set(), kept=kept)
+
+    store.save(settings, parts, delta.affected)
+    return index, changed, ingest, delta
@@ -0,0 +1,94 @@
+import glob
+import json
+import os
+import re
+
+from gl_shards import SHARD_INDEX_FORMAT, SHARD_INDEX_NAME, SHARD_INDEX_VERSION
+
+# Partition name of a consolidated index; the dashboard adds this column
+# to the merged rows, one value per entity payload
+ENTITY_PARTITION = "entity"
+ENTITY_FIELD = "Entity"
+
+
+def entity_csvs(patterns):
+    """GL exports matching any of `patterns` (paths or globs), sorted and de-duplicated."""
+    found = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern)
+        if not matches:
+            raise ValueError(f"no GL export matches {pattern!r}")
+        found.update(matches)
+    return sorted(found)
+
+
+def entity_name(csv_file):
+    """Entity label for a GL export: its file name without the extension."""
+    return os.path.splitext(os.path.basename(csv_file))[0]
+
+
+def entity_key(name):
+    """Directory-safe key for an entity name, e.g. "Acme Music LLC" -> "acme-music-llc"."""
+    key = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+    if not key:
+        raise ValueError(f"can't make a directory name from entity {name!r}")
+    return key
+
+
+def plan_entities(csv_files):
+    """(key, name, csv) for each export; two exports may not share a key."""
+    planned = {}
+    for csv_file in csv_files:
+        name = entity_name(csv_file)
+        key = entity_key(name)
+        if key in planned:
+            raise ValueError(f"{csv_file} and {planned[key][2]} would both build entity {key!r}")
+        planned[key] = (key, name, csv_file)
+    return [planned[key] for key in sorted(planned)]
+
+
+def read_entity_index(index_dir):
+    """Entries of the last consolidated index in `index_dir`, by key."""
+    path = os.path.join(index_dir, SHARD_INDEX_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        index = json.load(f)
+    if index.get("partition") != ENTITY_PARTITION:
+        return {}
+    return {entry["key"]: entry for entry in index["shards"]}
+
+
+def write_entity_index(entries, index_dir, base_url=""):
+    """Write the consolidated index over per-entity payload files.
+
+    It has the same shape as a shard index, so the dashboard loads it
+    through the same shard path. Entity shards have no date bounds, so
+    every one is always loaded, and `max_day` is left out so the
+    consolidated page opens on the full history like a single-entity page.
+    """
+    fields = []
+    for entry in entries:
+        fields.extend(f for f in entry["fields"] if f not in fields)
+    index = {
+        "format": SHARD_INDEX_FORMAT,
+        "version": SHARD_INDEX_VERSION,
+        "partition": ENTITY_PARTITION,
+        "base": base_url,
+        "fields": fields,
+        "max_day": None,
+        "rows": sum(e["rows"] for e in entries),
+        "shards": [{
+            "key": e["key"],
+            "entity": e["entity"],
+            "file": e["file"],
+            "start": None,
+            "end": None,
+            "rows": e["rows"],
+            "bytes": e["bytes"],
+            "fields": e["fields"],
+        } for e in entries],
+    }
+    with open(os.path.join(index_dir, SHARD_INDEX_NAME), "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1)
+    return index
@@ -0,0 +1,178 @@
+import argparse
+import csv
+import os
+import time
+
+from gl_payload import AMOUNT_FIELD, DATE_FIELD, days_to_date, format_cents, parse_amount_cents, parse_date_days
+from stage_profile import iter_stage
+
+CHUNK_ROWS = 5000
+
+REJECT_FIELDS = ["line", "reason"]
+
+
+class RejectsFile:
+    """CSV side file of rejected rows, only created once there is a reject.
+
+    A clean run removes a rejects file left by an earlier run, so its
+    presence always means the last ingest found bad rows. The header is the
+    GL's own, set by the GLIngest it is given to, after the line and reason.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.fields = []
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    def write(self, line, reason, row):
+        if self._file is None:
+            self._file = open(self.path, "w", encoding="utf-8", newline="")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(REJECT_FIELDS + self.fields)
+        self._writer.writerow([line, reason] + row)
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        elif os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class GLIngest:
+    """Streams a QB GL export as typed rows, setting malformed rows aside.
+
+    Iterating yields rows as lists in `fields` order with Amount as integer
+    cents and Date as days since 1970-01-01 (None where the cell is blank);
+    every other column stays text. A row is rejected, with its line number
+    and reason passed to `rejects.write`, if it has the wrong number of
+    cells (usually a stray quote merging lines) or a non-blank Amount or
+    Date that doesn't parse.
+
+    Rows are handed on `chunk_rows` at a time, so memory stays flat for
+    any size of export. `rows`, `rejected` and `elapsed` are updated as it
+    goes.
+    """
+
+    def __init__(self, csv_file, rejects=None, chunk_rows=CHUNK_ROWS):
+        self.reader = csv.reader(csv_file)
+        self.fields = next(self.reader, [])
+        self.rejects = rejects
+        if rejects is not None:
+            rejects.fields = self.fields
+        self.chunk_rows = chunk_rows
+        self.rows = 0
+        self.rejected = 0
+        self.elapsed = 0.0
+        fields = self.fields
+        self.amount_index = fields.index(AMOUNT_FIELD) if AMOUNT_FIELD in fields else None
+        self.date_index = fields.index(DATE_FIELD) if DATE_FIELD in fields else None
+
+    def _reject(self, line, reason, row):
+        self.rejected += 1
+        if self.rejects is not None:
+            self.rejects.write(line, reason, row)
+
+    def chunks(self):
+        """Yield lists of up to `chunk_rows` typed rows."""
+        reader = self.reader
+        width = len(self.fields)
+        ai, di = self.amount_index, self.date_index
+        start = time.perf_counter()
+        typed = []
+        last_line = reader.line_num
+        for row in reader:
+            first_line = last_line + 1
+            last_line = reader.line_num
+            if not row:
+                continue
+            if len(row) != width:
+                # A row spanning several lines is usually a stray quote
+                line = first_line if first_line == last_line else f"{first_line}-{last_line}"
+                self._reject(line, f"expected {width} cells, got {len(row)}", row)
+                continue
+            cents = days = None
+            if ai is not None:
+                text = row[ai]
+                cents = parse_amount_cents(text)
+                if cents is None and text.strip():
+                    self._reject(last_line, f"unparseable {AMOUNT_FIELD} {text!r}", row)
+                    continue
+            if di is not None:
+                text = row[di]
+                days = parse_date_days(text)
+                if days is None and text.strip():
+                    self._reject(last_line, f"unparseable {DATE_FIELD} {text!r}", row)
+                    continue
+            # Only convert once the row is known good, so rejects keep the text
+            if ai is not None:
+                row[ai] = cents
+            if di is not None:
+                row[di] = days
+            typed.append(row)
+            if len(typed) >= self.chunk_rows:
+                self.rows += len(typed)
+                self.elapsed = time.perf_counter() - start
+                yield typed
+                typed = []
+        self.rows += len(typed)
+        self.elapsed = time.perf_counter() - start
+        if typed:
+            yield typed
+
+    def __iter__(self):
+        for chunk in iter_stage("ingest", self.chunks()):
+            yield from chunk
+
+    def report(self):
+        rate = self.rows / self.elapsed if self.elapsed > 0 else 0
+        return (f"Ingested {self.rows:,} rows ({self.rejected:,} rejected) in {self.elapsed:.2f}s "
+                f"({rate:,.0f} rows/s)")
+
+
+def untyped(row, amount_index, date_index):
+    """A typed row back as CSV text: plain decimal amount, ISO date."""
+    out = list(row)
+    if amount_index is not None:
+        out[amount_index] = format_cents(row[amount_index])
+    if date_index is not None:
+        days = row[date_index]
+        out[date_index] = "" if days is None else days_to_date(days).isoformat()
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate and normalize a QB GL export, setting malformed rows aside.")
+    parser.add_argument("csv", help="GL CSV export")
+    parser.add_argument("--rejects", default="gl-rejects.csv", help="where to write rejected rows with reasons")
+    parser.add_argument("--output", help="also write the normalized rows (plain amounts, ISO dates) as CSV here")
+    args = parser.parse_args()
+
+    with open(args.csv, "r", encoding="utf-8", newline="") as src:
+        with RejectsFile(args.rejects) as rejects:
+            ingest = GLIngest(src, rejects)
+            if args.output:
+                with open(args.output, "w", encoding="utf-8", newline="") as out:
+                    writer = csv.writer(out)
+                    writer.writerow(ingest.fields)
+                    for chunk in ingest.chunks():
+                        writer.writerows(untyped(r, ingest.amount_index, ingest.date_index) for r in chunk)
+            else:
+                for _ in ingest.chunks():
+                    pass
+
+    print(ingest.report())
+    if ingest.rejected:
+        print(f"Rejected rows written to {args.rejects}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+import csv
+import datetime
+import json
+import re
+from decimal import Decimal, ROUND_HALF_UP
+
+# Columns with a typed encoding; every other column is dictionary-encoded
+AMOUNT_FIELD = "Amount"
+DATE_FIELD = "Date"
+
+PAYLOAD_FORMAT = "gl-columnar"
+PAYLOAD_VERSION = 1
+
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+_US_DATE = re.compile(r"^(\d{1,2})/(\d{1,2})/(\d{2}|\d{4})$")
+_ISO_DATE = re.compile(r"^(\d{4})-(\d{1,2})-(\d{1,2})$")
+_CENT = Decimal(1)
+# Cents past the 28 digits of the default Decimal context are rejected either way
+_MAX_CENTS = 10 ** 28
+_PLAIN_AMOUNT = re.compile(r"^(-?)([0-9]+)(?:\.([0-9]{0,2}))?$")
+# Other decimal text the dashboard's parseCents also accepts: sign, exponent
+_DECIMAL_AMOUNT = re.compile(r"^[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][+-]?[0-9]+)?$")
+
+
+def parse_amount_cents(text):
+    """QB amount text -> integer cents, or None if it isn't a number.
+
+    Handles thousands separators, a leading `$` and accounting-style
+    parentheses for negatives: "(1,234.50)" -> -123450.
+    """
+    s = (text or "").strip().replace(",", "").replace("$", "")
+    if not s:
+        return None
+    negative = s.startswith("(") and s.endswith(")")
+    if negative:
+        s = s[1:-1].strip()
+        if s[:1] in ("-", "+"):
+            # "(-5)" is ambiguous; don't guess which sign was meant
+            return None
+    m = _PLAIN_AMOUNT.match(s)
+    if m:
+        # Fast path for the usual "-1234.5" shape: exact integer arithmetic
+        cents = int(m.group(2)) * 100 + int((m.group(3) or "").ljust(2, "0"))
+        if m.group(1):
+            cents = -cents
+        if abs(cents) >= _MAX_CENTS:
+            return None
+    elif _DECIMAL_AMOUNT.match(s):
+        try:
+            value = Decimal(s)
+            cents = int((value * 100).quantize(_CENT, rounding=ROUND_HALF_UP))
+        except ArithmeticError:
+            return None
+    else:
+        # NaN, Infinity, hex, underscores and the like
+        return None
+    return -cents if negative else cents
+
+
+_date_cache = {}
+
+
+def parse_date_days(text):
+    """MM/DD/YYYY, MM/DD/YY or YYYY-MM-DD -> days since 1970-01-01, or None.
+
+    Ledgers repeat the same few thousand dates, so results are memoized.
+    """
+    s = (text or "").strip()
+    try:
+        return _date_cache[s]
+    except KeyError:
+        pass
+
+    days = None
+    m = _US_DATE.match(s)
+    if m:
+        month, day, year = int(m.group(1)), int(m.group(2)), int(m.group(3))
+        if len(m.group(3)) == 2:
+            # Same pivot as strptime's %y
+            year += 2000 if year < 69 else 1900
+    else:
+        m = _ISO_DATE.match(s)
+        if m:
+            year, month, day = int(m.group(1)), int(m.group(2)), int(m.group(3))
+    if m:
+        try:
+            days = datetime.date(year, month, day).toordinal() - EPOCH_ORDINAL
+        except ValueError:
+            days = None
+
+    _date_cache[s] = days
+    return days
+
+
+def days_to_date(days):
+    return datetime.date.fromordinal(days + EPOCH_ORDINAL)
+
+
+def _as_is(value):
+    return value
+
+
+class ColumnarEncoder:
+    """Turns GL rows into the flat integer rows of the columnar payload.
+
+    Text columns become codes into one shared string table (code 0 is the
+    empty string), Amount becomes integer cents and Date becomes epoch
+    days. Unparseable amounts and dates are encoded as None (JSON null).
+
+    With `typed=True` rows come from gl_ingest with Amount and Date already
+    converted, and those cells are passed through as they are.
+    """
+
+    def __init__(self, fields, typed=False):
+        self.fields = list(fields)
+        self.strings = [""]
+        self._codes = {"": 0}
+        self._encoders = [
+            (_as_is if typed else parse_amount_cents) if field == AMOUNT_FIELD
+            else (_as_is if typed else parse_date_days) if field == DATE_FIELD
+            else self.code
+            for field in self.fields
+        ]
+
+    def kinds(self):
+        kinds = {}
+        if AMOUNT_FIELD in self.fields:
+            kinds[AMOUNT_FIELD] = "cents"
+        if DATE_FIELD in self.fields:
+            kinds[DATE_FIELD] = "days"
+        return kinds
+
+    def code(self, text):
+        code = self._codes.get(text)
+        if code is None:
+            code = len(self.strings)
+            self._codes[text] = code
+            self.strings.append(text)
+        return code
+
+    def encode(self, row):
+        """Encode one CSV row, given as a list in `fields` order."""
+        out = [encode(value) for encode, value in zip(self._encoders, row)]
+        if len(row) < len(self.fields):
+            # Short row: missing trailing cells are blank
+            out.extend(encode("") for encode in self._encoders[len(row):])
+        return out
+
+
+def _json_ints(values):
+    return ",".join("null" if v is None else str(v) for v in values)
+
+
+class PayloadWriter:
+    """Writes one columnar payload JSON object through `write`, row by row.
+
+    Rows are written as soon as they are encoded; only the string table is
+    held until `close()`, which is why it comes last in the object.
+
+    `sections` are classes built from the encoder that see every encoded
+    row via `add(row)` and contribute `to_json()` under their `name` key,
+    e.g. the summary cube. `typed` is passed on to the encoder, and `meta`
+    keys (e.g. the entity of a multi-entity build) go in the header.
+    """
+
+    def __init__(self, fields, write, sections=(), rows_per_piece=2000, typed=False, meta=None):
+        self.encoder = ColumnarEncoder(fields, typed)
+        self.extras = [section(self.encoder) for section in sections]
+        self.write = write
+        self.rows_per_piece = rows_per_piece
+        self.n = 0
+        self._batch = []
+
+        extra = "".join("%s:%s," % (json.dumps(k), json.dumps(v)) for k, v in (meta or {}).items())
+        self.write(
+            '{"format":%s,"version":%d,%s"fields":%s,"kinds":%s,"rows":['
+            % (json.dumps(PAYLOAD_FORMAT), PAYLOAD_VERSION, extra,
+               json.dumps(self.encoder.fields), json.dumps(self.encoder.kinds()))
+        )
+
+    def add(self, row):
+        encoded = self.encoder.encode(row)
+        for extra in self.extras:
+            extra.add(encoded)
+        self._batch.append(_json_ints(encoded))
+        self.n += 1
+        if len(self._batch) >= self.rows_per_piece:
+            self._flush()
+
+    def _flush(self):
+        if self._batch:
+            self.write(("," if self.n > len(self._batch) else "") + ",".join(self._batch))
+            self._batch = []
+
+    def close(self):
+        self._flush()
+        self.write('],"n":%d' % self.n)
+        for extra in self.extras:
+            self.write(',%s:%s' % (json.dumps(extra.name), json.dumps(extra.to_json(), separators=(",", ":"))))
+        self.write(',"strings":%s}' % json.dumps(self.encoder.strings, ensure_ascii=False))
+
+
+def format_cents(cents):
+    if cents is None:
+        return ""
+    return "%s%d.%02d" % ("-" if cents < 0 else "", abs(cents) // 100, abs(cents) % 100)
+
+
+_day_text_cache = {}
+
+
+def format_days(days):
+    if days is None:
+        return ""
+    text = _day_text_cache.get(days)
+    if text is None:
+        text = _day_text_cache[days] = days_to_date(days).strftime("%m/%d/%Y")
+    return text
+
+
+_ROWS_KEY = b'"rows":['
+_ROWS_END = b'],"n":'
+_STRINGS_KEY = b',"strings":'
+
+
+def iter_decoded_rows(buf, start=0, end=None, chunk_size=1 << 20):
+    """Yield the fields, then every row as text, of a payload held in `buf`.
+
+    `buf` is any bytes-like object with find/rfind, such as an mmap of a
+    built page, and [start, end) is where the payload sits in it. Only the
+    header and the string table are parsed as JSON; the row numbers are
+    read in chunks, so the rows are never copied whole. Amounts come back
+    as plain decimals ("-1234.50") and dates as MM/DD/YYYY.
+    """
+    end = len(buf) if end is None else end
+    rows_at = buf.find(_ROWS_KEY, start, end)
+    if rows_at == -1:
+        raise ValueError("not a columnar GL payload")
+    header = json.loads(bytes(buf[start:rows_at]).decode("utf-8") + '"rows":[]}')
+    if header.get("format") != PAYLOAD_FORMAT:
+        raise ValueError(f"unexpected payload format {header.get('format')!r}")
+
+    rows_start = rows_at + len(_ROWS_KEY)
+    rows_end = buf.find(_ROWS_END, rows_start, end)
+    # The string table is the last key; its quotes would be escaped inside a string
+    strings_at = buf.rfind(_STRINGS_KEY, rows_end, end)
+    if rows_end == -1 or strings_at == -1:
+        raise ValueError("truncated columnar GL payload")
+    strings = json.loads(bytes(buf[strings_at + len(_STRINGS_KEY):end]).decode("utf-8").rstrip()[:-1])
+
+    fields = header["fields"]
+    kinds = header.get("kinds", {})
+    decoders = [
+        format_cents if kinds.get(field) == "cents"
+        else format_days if kinds.get(field) == "days"
+        else strings.__getitem__
+        for field in fields
+    ]
+    yield fields
+
+    width = len(fields)
+    values = []
+    carry = b""
+    for pos in range(rows_start, rows_end, chunk_size):
+        tokens = (carry + buf[pos:min(pos + chunk_size, rows_end)]).split(b",")
+        carry = tokens.pop()
+        for token in tokens:
+            values.append(None if token == b"null" else int(token))
+            if len(values) == width:
+                yield [decode(v) for decode, v in zip(decoders, values)]
+                values = []
+    if carry:
+        values.append(None if carry == b"null" else int(carry))
+    if values:
+        if len(values) != width:
+            raise ValueError("truncated columnar GL payload")
+        yield [decode(v) for decode, v in zip(decoders, values)]
+
+
+def iter_payload(csv_file, sections=(), rows_per_piece=2000):
+    """Yield the columnar payload JSON for an open CSV file, piece by piece."""
+    reader = csv.reader(csv_file)
+    fields = next(reader, [])
+    return iter_payload_rows(fields, (row for row in reader if row), sections, rows_per_piece)
+
+
+def iter_payload_rows(fields, rows, sections=(), rows_per_piece=2000, typed=False, meta=None):
+    """Yield the columnar payload JSON for `rows` in `fields` order, piece by piece.
+
+    Pass `typed=True` for the typed rows of a gl_ingest.GLIngest.
+    """
+    pieces = []
+    writer = PayloadWriter(fields, pieces.append, sections, rows_per_piece, typed, meta)
+    for row in rows:
+        writer.add(row)
+        if pieces:
+            yield from pieces
+            pieces.clear()
+    writer.close()
+    yield from pieces
@@ -0,0 +1,73 @@
+import base64
+
+# Fields the dashboard's Name/Desc box searches
+TEXT_INDEX_FIELDS = ["Name", "Vendor", "Memo/Description"]
+
+GRAM = 3
+
+
+def grams_of(text):
+    """Distinct lowercase trigrams of `text` (by code point, as the dashboard splits them)."""
+    s = text.lower()
+    return {s[i:i + GRAM] for i in range(len(s) - GRAM + 1)}
+
+
+def _varints(values, out):
+    """Append delta-coded LEB128 varints of ascending `values` to `out`."""
+    prev = 0
+    for v in values:
+        d = v - prev
+        prev = v
+        while d >= 0x80:
+            out.append((d & 0x7F) | 0x80)
+            d >>= 7
+        out.append(d)
+
+
+class TextIndex:
+    """Trigram -> string codes index over the Name, Vendor and Memo fields.
+
+    Postings are string codes rather than rows: every distinct value is
+    indexed once, however many rows share it. The dashboard intersects the
+    posting lists of a query's trigrams to get candidate strings, verifies
+    those with a substring test, then checks rows by code lookup.
+    """
+
+    # Key of this section in the payload object
+    name = "text_index"
+
+    def __init__(self, encoder):
+        self.encoder = encoder
+        fields = encoder.fields
+        self.field_index = [fields.index(f) for f in TEXT_INDEX_FIELDS if f in fields]
+        self.codes = set()
+
+    def add(self, row):
+        for j in self.field_index:
+            self.codes.add(row[j])
+
+    def to_json(self):
+        strings = self.encoder.strings
+        postings = {}
+        for code in sorted(self.codes):
+            for gram in grams_of(strings[code]):
+                posting = postings.get(gram)
+                if posting is None:
+                    postings[gram] = [code]
+                else:
+                    posting.append(code)
+
+        grams = sorted(postings)
+        data = bytearray()
+        ends = []
+        for gram in grams:
+            _varints(postings[gram], data)
+            ends.append(len(data))
+        return {
+            "fields": TEXT_INDEX_FIELDS,
+            "gram": GRAM,
+            "grams": grams,
+            # Byte offset where each gram's posting list ends in `postings`
+            "ends": ends,
+            "postings": base64.b64encode(bytes(data)).decode("ascii"),
+        }
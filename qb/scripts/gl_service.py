@@ -0,0 +1,481 @@
+import argparse
+import bisect
+import datetime
+import hmac
+import json
+import os
+import re
+import secrets
+import threading
+import time
+import urllib.parse
+from array import array
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from gl_cube import CUBE_DIMS, NO_MONTH, SummaryCube, month_of
+from gl_ingest import GLIngest
+from gl_payload import AMOUNT_FIELD, DATE_FIELD, ColumnarEncoder, EPOCH_ORDINAL, format_cents, format_days, \
+    parse_date_days
+from gl_search import GRAM, TEXT_INDEX_FIELDS, grams_of
+from gl_sort import text_order
+
+csv_path = "../QB GL Python Print - public_csv.csv"
+
+DEFAULT_PORT = 8001
+
+# Query parameter -> column, one per dashboard filter input
+FILTER_PARAMS = {
+    "class": "Class",
+    "account": "Account",
+    "type": "Transaction Type",
+    "category": "Category",
+    "master": "Master_Vertical",
+}
+
+# Same sentinel as the dashboard's NO_DATE, so summaries can be used as is
+NO_DATE = -2147483648
+
+# Page origins allowed to read replies. file:// pages send "null", but so can
+# any site (a sandboxed iframe), so the API also wants the run's token
+LOCAL_ORIGIN = re.compile(r"null|http://(localhost|127\.0\.0\.1)(:\d+)?")
+# Host headers accepted; anything else is a DNS-rebound name for this address
+LOCAL_HOST = re.compile(r"(localhost|127\.0\.0\.1|\[::1\])(:\d+)?")
+TOKEN_HEADER = "X-GL-Token"
+
+PAGE_LIMIT = 5000
+RESULT_CACHE_ENTRIES = 32
+
+
+class Summary:
+    """Totals for a set of rows, built like the dashboard's addToSummary.
+
+    Amounts are folded in as cents; `to_json` gives the dashboard's
+    currentSummary shape in dollars.
+    """
+
+    def __init__(self, strings):
+        self.strings = strings
+        self.count = self.net = self.income = 0
+        self.min_day = self.max_day = None
+        self.by_class, self.by_account, self.by_category, self.income_by_category = {}, {}, {}, {}
+
+    def add(self, cls_code, acc_code, cat_code, count, valued, total, pos, min_day, max_day):
+        self.count += count
+        if valued:
+            strings = self.strings
+            cls = strings[cls_code] or "(No Class)"
+            acc = strings[acc_code] or "(No Account)"
+            cat = strings[cat_code]
+            self.net += total
+            self.income += pos
+            self.by_class[cls] = self.by_class.get(cls, 0) + total
+            self.by_account[acc] = self.by_account.get(acc, 0) + total
+            self.by_category[cat] = self.by_category.get(cat, 0) + total
+            if pos > 0:
+                self.income_by_category[cat] = self.income_by_category.get(cat, 0) + pos
+        if min_day is not None and (self.min_day is None or min_day < self.min_day):
+            self.min_day = min_day
+        if max_day is not None and (self.max_day is None or max_day > self.max_day):
+            self.max_day = max_day
+
+    def to_json(self):
+        dollars = lambda totals: {k: v / 100 for k, v in totals.items()}
+        return {
+            "count": self.count,
+            "net": self.net / 100,
+            "income": self.income / 100,
+            "expense": (self.net - self.income) / 100,
+            "minDay": NO_DATE if self.min_day is None else self.min_day,
+            "maxDay": NO_DATE if self.max_day is None else self.max_day,
+            "byEntity": {},
+            "byClass": dollars(self.by_class),
+            "byAccount": dollars(self.by_account),
+            "byCategory": dollars(self.by_category),
+            "incomeByCategory": dollars(self.income_by_category),
+        }
+
+
+class GLStore:
+    """The GL held once in memory as typed columns, with indexes for the dashboard's filters.
+
+    - Text columns are string codes (the payload's dictionary encoding);
+      each filterable column has a posting list of rows per code.
+    - Rows are also kept in date order, so a date range is two bisects.
+    - Name/Vendor/Memo values have a trigram -> codes index, as in the
+      embedded payload.
+    - The summary cube answers totals when the filters allow, as in the
+      dashboard's cubeCanAnswer.
+
+    A query starts from whichever filter selects the fewest rows and checks
+    the others row by row. Results are cached, so paging and re-sorting the
+    same filters only costs the slice.
+    """
+
+    def __init__(self, ingest):
+        encoder = ColumnarEncoder(ingest.fields, typed=True)
+        cube = SummaryCube(encoder)
+        fields = encoder.fields
+        self.fields = fields
+        self.amount_index = fields.index(AMOUNT_FIELD) if AMOUNT_FIELD in fields else None
+        self.date_index = fields.index(DATE_FIELD) if DATE_FIELD in fields else None
+        columns = [array("q") if j == self.amount_index else array("i") for j in range(len(fields))]
+        valued = bytearray()
+        for row in ingest:
+            encoded = encoder.encode(row)
+            cube.add(encoded)
+            for j, value in enumerate(encoded):
+                if j == self.amount_index:
+                    valued.append(value is not None)
+                    columns[j].append(value or 0)
+                elif j == self.date_index:
+                    columns[j].append(NO_DATE if value is None else value)
+                else:
+                    columns[j].append(value)
+
+        self.n = len(columns[0]) if columns else 0
+        self.strings = encoder.strings
+        self.lower = [s.lower() for s in self.strings]
+        # Text columns sort by the build's sort-index collation
+        self.text_rank = text_order(self.strings)
+        self.columns = dict(zip(fields, columns))
+        self.valued = valued
+        self.cube = cube.cells
+        self.blank = array("i", bytes(4 * self.n))
+
+        # Rows per code of every filterable and searchable column
+        self.postings = {}
+        for field in list(FILTER_PARAMS.values()) + TEXT_INDEX_FIELDS:
+            col = self.columns.get(field)
+            if col is None:
+                continue
+            postings = {}
+            for i, code in enumerate(col):
+                rows = postings.get(code)
+                if rows is None:
+                    rows = postings[code] = array("i")
+                rows.append(i)
+            self.postings[field] = postings
+
+        # Dated rows in date order; undated rows pass every date filter
+        days = self.columns.get(DATE_FIELD)
+        if days is not None:
+            dated = sorted((i for i in range(self.n) if days[i] != NO_DATE), key=days.__getitem__)
+            self.by_day = array("i", dated)
+            self.sorted_days = array("i", (days[i] for i in dated))
+            self.undated = array("i", (i for i in range(self.n) if days[i] == NO_DATE))
+        else:
+            self.by_day = self.sorted_days = array("i")
+            self.undated = array("i", range(self.n))
+
+        name_codes = set()
+        for field in TEXT_INDEX_FIELDS:
+            name_codes.update(self.postings.get(field, ()))
+        self.name_codes = sorted(name_codes)
+        self.grams = {}
+        for code in self.name_codes:
+            for gram in grams_of(self.strings[code]):
+                self.grams.setdefault(gram, []).append(code)
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    # -- filters ---------------------------------------------------------
+
+    def match_codes(self, field, query):
+        """Codes of the distinct `field` values containing `query` (lowercase)."""
+        lower = self.lower
+        return [code for code in self.postings.get(field, ()) if query in lower[code]]
+
+    def name_match_codes(self, query):
+        """Codes of Name/Vendor/Memo values containing `query`, via the trigram index."""
+        lower = self.lower
+        if len(query) < GRAM:
+            return [code for code in self.name_codes if query in lower[code]]
+        lists = []
+        for gram in grams_of(query):
+            codes = self.grams.get(gram)
+            if not codes:
+                return []
+            lists.append(codes)
+        # Like the dashboard, intersect only the two rarest grams and verify
+        lists.sort(key=len)
+        candidates = set(lists[0]).intersection(*lists[1:2])
+        return [code for code in candidates if query in lower[code]]
+
+    def select(self, filters):
+        """Row ids matching `filters`, in ledger order."""
+        start, end, text, name = filters["start"], filters["end"], filters["text"], filters["name"]
+        days = self.columns.get(DATE_FIELD)
+        drivers = []
+        tests = []
+
+        if (start is not None or end is not None) and days is not None:
+            lo = 0 if start is None else bisect.bisect_left(self.sorted_days, start)
+            hi = len(self.by_day) if end is None else bisect.bisect_right(self.sorted_days, end)
+            drivers.append((hi - lo + len(self.undated), lambda: list(self.by_day[lo:hi]) + list(self.undated)))
+            lo_day = NO_DATE + 1 if start is None else start
+            hi_day = 2 ** 31 - 1 if end is None else end
+            tests.append(lambda i: days[i] == NO_DATE or lo_day <= days[i] <= hi_day)
+
+        for field, query in text:
+            codes = self.match_codes(field, query)
+            postings = self.postings.get(field, {})
+            hits = bytearray(len(self.strings))
+            for code in codes:
+                hits[code] = 1
+            col = self.columns.get(field, self.blank)
+            drivers.append((sum(len(postings[c]) for c in codes),
+                            lambda postings=postings, codes=codes: [i for c in codes for i in postings[c]]))
+            tests.append(lambda i, hits=hits, col=col: hits[col[i]])
+
+        if name:
+            codes = self.name_match_codes(name)
+            hits = bytearray(len(self.strings))
+            for code in codes:
+                hits[code] = 1
+            cols = [self.columns.get(f, self.blank) for f in TEXT_INDEX_FIELDS]
+            lower = self.lower
+            if " " in name:
+                # A query with a space can also match across the joined fields
+                tests.append(lambda i: hits[cols[0][i]] or hits[cols[1][i]] or hits[cols[2][i]]
+                             or name in " ".join((lower[cols[0][i]], lower[cols[1][i]], lower[cols[2][i]])))
+            else:
+                lists = [(self.postings.get(f, {}), c) for f in TEXT_INDEX_FIELDS for c in codes]
+                drivers.append((sum(len(p.get(c, ())) for p, c in lists),
+                                lambda: [i for p, c in lists for i in p.get(c, ())]))
+                tests.append(lambda i: hits[cols[0][i]] or hits[cols[1][i]] or hits[cols[2][i]])
+
+        if not drivers:
+            candidates = range(self.n)
+        else:
+            size, produce = min(drivers, key=lambda d: d[0])
+            candidates = sorted(set(produce()))
+        if not tests:
+            return list(candidates)
+        return [i for i in candidates if all(test(i) for test in tests)]
+
+    def cube_can_answer(self, filters):
+        """Whether the cube holds the totals for `filters`, as in the dashboard."""
+        if filters["name"] or not all(field in CUBE_DIMS for field, _ in filters["text"]):
+            return False
+        start, end = filters["start"], filters["end"]
+        if start is not None and datetime.date.fromordinal(start + EPOCH_ORDINAL).day != 1:
+            return False
+        if end is not None and datetime.date.fromordinal(end + 1 + EPOCH_ORDINAL).day != 1:
+            return False
+        return True
+
+    def summarize(self, filters, ids):
+        s = Summary(self.strings)
+        if self.cube_can_answer(filters):
+            m_start = NO_MONTH if filters["start"] is None else month_of(filters["start"])
+            m_end = NO_MONTH if filters["end"] is None else month_of(filters["end"])
+            tests = []
+            for field, query in filters["text"]:
+                hits = bytearray(len(self.strings))
+                for code in self.match_codes(field, query):
+                    hits[code] = 1
+                tests.append((CUBE_DIMS.index(field), hits))
+            for key, (count, valued, total, pos, min_day, max_day) in self.cube.items():
+                month = key[-1]
+                if month != NO_MONTH and ((m_start != NO_MONTH and month < m_start)
+                                          or (m_end != NO_MONTH and month > m_end)):
+                    continue
+                if all(hits[key[at]] for at, hits in tests):
+                    s.add(key[0], key[1], key[2], count, valued, total, pos, min_day, max_day)
+            return s.to_json()
+
+        cls, acc, cat = (self.columns.get(f, self.blank) for f in ("Class", "Account", "Category"))
+        amounts = self.columns.get(AMOUNT_FIELD)
+        days = self.columns.get(DATE_FIELD)
+        valued = self.valued
+        for i in ids:
+            v = amounts is not None and valued[i]
+            cents = amounts[i] if v else 0
+            day = days[i] if days is not None and days[i] != NO_DATE else None
+            s.add(cls[i], acc[i], cat[i], 1, v, cents, cents if cents > 0 else 0, day, day)
+        return s.to_json()
+
+    # -- queries ---------------------------------------------------------
+
+    def sort_key(self, field):
+        """Sort key per row id for a column, matching the dashboard's sortBy."""
+        col = self.columns[field]
+        if field in (AMOUNT_FIELD, DATE_FIELD):
+            return col.__getitem__
+        rank = self.text_rank
+        return lambda i: rank[col[i]]
+
+    def query(self, filters, sort=None, descending=False):
+        """(row ids, summary) for `filters` in the requested order, cached."""
+        key = (json.dumps(filters, sort_keys=True), sort, descending)
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+                return hit
+
+        base_key = (key[0], None, False)
+        with self._lock:
+            base = self._cache.get(base_key)
+        if base is None:
+            ids = self.select(filters)
+            base = (ids, self.summarize(filters, ids))
+        result = base
+        if sort in self.columns:
+            result = (sorted(base[0], key=self.sort_key(sort), reverse=descending), base[1])
+
+        with self._lock:
+            self._cache[base_key] = base
+            self._cache[key] = result
+            while len(self._cache) > RESULT_CACHE_ENTRIES:
+                self._cache.popitem(last=False)
+        return result
+
+    def row_text(self, i):
+        """Row `i` as the dashboard shows it: plain decimal amount, MM/DD/YYYY date."""
+        out = []
+        for field in self.fields:
+            col = self.columns[field]
+            if field == AMOUNT_FIELD:
+                out.append(format_cents(col[i]) if self.valued[i] else "")
+            elif field == DATE_FIELD:
+                out.append(format_days(None if col[i] == NO_DATE else col[i]))
+            else:
+                out.append(self.strings[col[i]])
+        return out
+
+    def options(self):
+        """Distinct non-empty values of each filter column, for the datalists."""
+        return {field: sorted(s for s in (self.strings[c] for c in self.postings[field]) if s)
+                for field in FILTER_PARAMS.values() if field in self.postings}
+
+
+def parse_filters(params):
+    """Query string parameters -> the filters GLStore.select takes."""
+    get = lambda name: (params.get(name) or [""])[0].strip()
+    return {
+        # Dates come from the dashboard's date inputs as YYYY-MM-DD
+        "start": parse_date_days(get("start")) if get("start") else None,
+        "end": parse_date_days(get("end")) if get("end") else None,
+        "text": [[field, get(name).lower()] for name, field in FILTER_PARAMS.items() if get(name)],
+        "name": get("name").lower(),
+    }
+
+
+class GLRequestHandler(BaseHTTPRequestHandler):
+    """JSON API over a GLStore: /api/meta and /api/query."""
+
+    store = None
+    token = None
+
+    def send_cors(self):
+        # Only local pages may read the GL, never a site the user happens to visit
+        origin = self.headers.get("Origin")
+        if origin and LOCAL_ORIGIN.fullmatch(origin):
+            self.send_header("Access-Control-Allow-Origin", origin)
+            self.send_header("Vary", "Origin")
+
+    def send_json(self, status, body):
+        data = json.dumps(body, separators=(",", ":")).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        # The dashboard is usually opened from file:// or another port
+        self.send_cors()
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_cors()
+        self.send_header("Access-Control-Allow-Methods", "GET")
+        self.send_header("Access-Control-Allow-Headers", TOKEN_HEADER)
+        self.end_headers()
+
+    def allowed(self):
+        """Whether the request names this machine and carries the run's token."""
+        if not LOCAL_HOST.fullmatch(self.headers.get("Host") or ""):
+            self.send_json(403, {"error": "requests must be addressed to localhost"})
+            return False
+        if not hmac.compare_digest(self.headers.get(TOKEN_HEADER) or "", self.token):
+            self.send_json(403, {"error": f"missing or wrong {TOKEN_HEADER}"})
+            return False
+        return True
+
+    def do_GET(self):
+        if not self.allowed():
+            return
+        url = urllib.parse.urlsplit(self.path)
+        params = urllib.parse.parse_qs(url.query)
+        store = self.store
+        if url.path == "/api/meta":
+            days = store.sorted_days
+            self.send_json(200, {
+                "fields": store.fields,
+                "n": store.n,
+                "min_day": days[0] if days else None,
+                "max_day": days[-1] if days else None,
+                "options": store.options(),
+            })
+        elif url.path == "/api/query":
+            start = time.perf_counter()
+            try:
+                offset = max(0, int((params.get("offset") or ["0"])[0]))
+                limit = min(PAGE_LIMIT, max(0, int((params.get("limit") or [str(PAGE_LIMIT)])[0])))
+            except ValueError:
+                self.send_json(400, {"error": "offset and limit must be integers"})
+                return
+            sort = (params.get("sort") or [None])[0]
+            descending = (params.get("dir") or ["asc"])[0] == "desc"
+            ids, summary = store.query(parse_filters(params), sort, descending)
+            self.send_json(200, {
+                "fields": store.fields,
+                "total": len(ids),
+                "offset": offset,
+                "rows": [store.row_text(i) for i in ids[offset:offset + limit]],
+                "summary": summary,
+                "ms": round((time.perf_counter() - start) * 1000, 1),
+            })
+        else:
+            self.send_json(404, {"error": f"unknown endpoint {url.path}"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve filtered pages and totals of the GL to the dashboard.")
+    parser.add_argument("--csv", default=csv_path, help="GL CSV export to load")
+    parser.add_argument("--host", default="localhost", help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on")
+    parser.add_argument("--token", help="token the dashboard must send (default: a new random one per run)")
+    args = parser.parse_args()
+
+    try:
+        start = time.perf_counter()
+        with open(args.csv, "r", encoding="utf-8", newline="") as f:
+            ingest = GLIngest(f)
+            store = GLStore(ingest)
+        print(ingest.report())
+        print(f"Indexed {store.n:,} rows in {time.perf_counter() - start:.2f}s")
+        GLRequestHandler.store = store
+        GLRequestHandler.token = args.token or secrets.token_urlsafe(18)
+        server = ThreadingHTTPServer((args.host, args.port), GLRequestHandler)
+    except Exception as e:
+        print(f"Error: {e}")
+        return
+    print(f"Serving the GL at http://{args.host}:{args.port}/api/query; Ctrl+C to stop")
+    page = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "index.html"))
+    params = {"token": GLRequestHandler.token}
+    if args.port != DEFAULT_PORT:
+        params["service"] = f"http://localhost:{args.port}"
+    query = urllib.parse.urlencode(params)
+    print(f"Open the dashboard with its token: file://{urllib.parse.quote(page)}?{query}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
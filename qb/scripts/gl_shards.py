@@ -0,0 +1,147 @@
+import datetime
+import glob
+import json
+import os
+
+from build_manifest import file_digest
+from gl_payload import DATE_FIELD, EPOCH_ORDINAL, PayloadWriter, days_to_date
+
+SHARD_INDEX_FORMAT = "gl-shard-index"
+SHARD_INDEX_VERSION = 1
+SHARD_INDEX_NAME = "gl-index.json"
+
+PARTITIONS = ("month", "year")
+
+# Rows without a parseable date go to their own shard, which the dashboard
+# always loads (the date filter keeps undated rows)
+UNDATED = "undated"
+
+
+def _to_days(d):
+    return d.toordinal() - EPOCH_ORDINAL
+
+
+_bounds_cache = {}
+
+
+def partition_of(days, partition):
+    """Epoch days -> (shard key, first day, last day) of its month or year."""
+    if days is None:
+        return UNDATED, None, None
+    cache_key = (days, partition)
+    bounds = _bounds_cache.get(cache_key)
+    if bounds is None:
+        d = days_to_date(days)
+        if partition == "year":
+            start = datetime.date(d.year, 1, 1)
+            end = datetime.date(d.year + 1, 1, 1)
+            key = "%04d" % d.year
+        else:
+            start = datetime.date(d.year, d.month, 1)
+            end = datetime.date(d.year + (d.month == 12), d.month % 12 + 1, 1)
+            key = "%04d-%02d" % (d.year, d.month)
+        bounds = _bounds_cache[cache_key] = (key, _to_days(start), _to_days(end) - 1)
+    return bounds
+
+
+def shard_file_name(key):
+    return "gl-%s.json" % key
+
+
+def _replace_if_changed(tmp_path, path):
+    """Move `tmp_path` over `path` unless the content is identical.
+
+    Unchanged shards keep their mtime, so browsers and the build manifest
+    see them as untouched.
+    """
+    if os.path.exists(path) and file_digest(path) == file_digest(tmp_path):
+        os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, path)
+    return True
+
+
+def write_shards(fields, rows, shard_dir, partition="month", sections=(), base_url="", only=None, kept=()):
+    """Split typed GL rows into one columnar payload per month/year in `shard_dir`.
+
+    `rows` are the typed rows of a gl_ingest.GLIngest, read once and routed
+    to their partition's writer. Returns the shard index (also written to
+    `shard_dir/gl-index.json`) and the number of shard files whose content
+    changed.
+
+    For an incremental build (see gl_delta.py), `only` is the set of shard
+    keys to write; rows of other partitions are skipped, and `kept` lists
+    the previous index entries of the shards left as they are.
+    """
+    if partition not in PARTITIONS:
+        raise ValueError(f"partition must be one of {PARTITIONS}, not {partition!r}")
+    os.makedirs(shard_dir, exist_ok=True)
+
+    shards = {}
+    date_index = fields.index(DATE_FIELD) if DATE_FIELD in fields else None
+    try:
+        for row in rows:
+            days = row[date_index] if date_index is not None else None
+            key, start, end = partition_of(days, partition)
+            if only is not None and key not in only:
+                continue
+
+            shard = shards.get(key)
+            if shard is None:
+                tmp_path = os.path.join(shard_dir, shard_file_name(key) + ".tmp")
+                out = open(tmp_path, "w", encoding="utf-8")
+                shard = shards[key] = {
+                    "key": key, "start": start, "end": end, "max_day": None,
+                    "tmp_path": tmp_path, "out": out,
+                    "writer": PayloadWriter(fields, out.write, sections, typed=True),
+                }
+            shard["writer"].add(row)
+            if days is not None and (shard["max_day"] is None or days > shard["max_day"]):
+                shard["max_day"] = days
+    finally:
+        for shard in shards.values():
+            shard["out"].close()
+
+    entries = list(kept)
+    changed = 0
+    for key in sorted(shards):
+        shard = shards[key]
+        # Re-open in append mode to finish the payload (string table, sections)
+        with open(shard["tmp_path"], "a", encoding="utf-8") as out:
+            shard["writer"].write = out.write
+            shard["writer"].close()
+        path = os.path.join(shard_dir, shard_file_name(key))
+        changed += _replace_if_changed(shard["tmp_path"], path)
+        entries.append({
+            "key": key,
+            "file": shard_file_name(key),
+            "start": shard["start"],
+            "end": shard["end"],
+            "rows": shard["writer"].n,
+            "bytes": os.path.getsize(path),
+            "max_day": shard["max_day"],
+        })
+    entries.sort(key=lambda e: e["key"])
+
+    # Drop shards left over from an earlier build (e.g. a partition switch)
+    keep = {entry["file"] for entry in entries}
+    for path in glob.glob(os.path.join(shard_dir, "gl-*.json")):
+        name = os.path.basename(path)
+        if name != SHARD_INDEX_NAME and name not in keep:
+            os.remove(path)
+
+    dated = [e for e in entries if e["key"] != UNDATED]
+    index = {
+        "format": SHARD_INDEX_FORMAT,
+        "version": SHARD_INDEX_VERSION,
+        "partition": partition,
+        "base": base_url,
+        "fields": fields,
+        # Latest transaction date, used by the dashboard's default range
+        "max_day": dated[-1]["max_day"] if dated else None,
+        "rows": sum(e["rows"] for e in entries),
+        "shards": entries,
+    }
+    with open(os.path.join(shard_dir, SHARD_INDEX_NAME), "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1)
+    return index, changed
@@ -0,0 +1,86 @@
+import base64
+from array import array
+
+from gl_payload import AMOUNT_FIELD, DATE_FIELD
+
+# Columns the dashboard sorts from the index; others keep the comparator sort
+SORT_FIELDS = ["Date", "Class", "Account", "Transaction Type", "Name", "Amount"]
+
+# Stands in for a blank Amount or Date, which sort first like empty text
+_MISSING = -(1 << 62)
+
+
+def _utf16(text):
+    # Big-endian UTF-16 bytes sort like JavaScript's < on strings (by code unit)
+    return text.encode("utf-16-be", "surrogatepass")
+
+
+def text_order(strings):
+    """Rank of every string code: lower-cased, then exact text, blank first.
+
+    The same collation as the dashboard's compareText, so a column sorts
+    the same whether or not the page has this index.
+    """
+    order = sorted(range(len(strings)), key=lambda code: (_utf16(strings[code].lower()), _utf16(strings[code])))
+    rank = array("l", bytes(array("l").itemsize * len(strings)))
+    for r, code in enumerate(order):
+        rank[code] = r
+    return rank
+
+
+def _zigzag_varints(values, out):
+    """Append delta-coded, zigzag-signed LEB128 varints of `values` to `out`."""
+    prev = 0
+    for v in values:
+        d = v - prev
+        prev = v
+        d = (d << 1) if d >= 0 else ((-d << 1) - 1)
+        while d >= 0x80:
+            out.append((d & 0x7F) | 0x80)
+            d >>= 7
+        out.append(d)
+
+
+class SortIndex:
+    """Row order of the table sorted by each of SORT_FIELDS, ascending.
+
+    Ties keep row order, so within one value the rows ascend and their
+    deltas stay small. Clicking a column header in the dashboard then walks
+    the column's permutation and keeps the rows that pass the filters,
+    instead of sorting them with a comparator.
+    """
+
+    # Key of this section in the payload object
+    name = "sort_index"
+
+    def __init__(self, encoder):
+        self.encoder = encoder
+        fields = encoder.fields
+        self.fields = [f for f in SORT_FIELDS if f in fields]
+        self.field_index = [fields.index(f) for f in self.fields]
+        self.values = [array("q") for _ in self.fields]
+
+    def add(self, row):
+        for j, values in zip(self.field_index, self.values):
+            v = row[j]
+            values.append(_MISSING if v is None else v)
+
+    def to_json(self):
+        rank = None
+        data = bytearray()
+        ends = []
+        for field, values in zip(self.fields, self.values):
+            if field in (AMOUNT_FIELD, DATE_FIELD):
+                keys = values
+            else:
+                if rank is None:
+                    rank = text_order(self.encoder.strings)
+                keys = array("l", map(rank.__getitem__, values))
+            _zigzag_varints(sorted(range(len(keys)), key=keys.__getitem__), data)
+            ends.append(len(data))
+        return {
+            "fields": self.fields,
+            # Byte offset where each field's permutation ends in `orders`
+            "ends": ends,
+            "orders": base64.b64encode(bytes(data)).decode("ascii"),
+        }
@@ -0,0 +1,57 @@
+import mmap
+import os
+from contextlib import contextmanager
+
+CHUNK_SIZE = 1 << 20
+
+
+@contextmanager
+def mapped(path):
+    """Read-only memory map of `path`, usable wherever bytes are (find, slicing)."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # mmap can't map an empty file
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+
+def find_region(buf, start_marker, end_marker, pos=0):
+    """Offsets (start, end) of the bytes between `start_marker` and the next `end_marker`.
+
+    Two plain substring searches from `pos`; the markers themselves are
+    not part of the region. Raises ValueError naming the missing marker.
+    """
+    i = buf.find(start_marker, pos)
+    if i == -1:
+        raise ValueError(f"marker {start_marker.decode()!r} not found")
+    start = i + len(start_marker)
+    end = buf.find(end_marker, start)
+    if end == -1:
+        raise ValueError(f"marker {end_marker.decode()!r} not found after {start_marker.decode()!r}")
+    return start, end
+
+
+def iter_slices(buf, start, end, chunk_size=CHUNK_SIZE):
+    """Yield buf[start:end] in chunks of at most `chunk_size` bytes."""
+    for pos in range(start, end, chunk_size):
+        yield buf[pos:min(pos + chunk_size, end)]
+
+
+def splice(buf, edits, write, chunk_size=CHUNK_SIZE):
+    """Write `buf` through `write` with each (start, end, replacement) region swapped.
+
+    `edits` must not overlap. Untouched spans are copied in chunks, so the
+    whole file is never held in memory at once.
+    """
+    pos = 0
+    for start, end, replacement in sorted(edits, key=lambda e: e[0]):
+        if start < pos:
+            raise ValueError("splice regions overlap")
+        for chunk in iter_slices(buf, pos, start, chunk_size):
+            write(chunk)
+        write(replacement)
+        pos = end
+    for chunk in iter_slices(buf, pos, len(buf), chunk_size):
+        write(chunk)
@@ -1,13 +1,9 @@
-import os
+from patch_engine import Patch, patch_file
 
 file_path = '/Users/warren/Desktop/web-apps (EMAILED JAN 29)/QB Tool/accounting_dashboard_v2.html'
 
-try:
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    # Define the new logic with robust download and button state
-    pdf_logic = r"""
+# Define the new logic with robust download and button state
+pdf_logic = r"""
         /* PDF GENERATION LOGIC */
         async function generatePDF() {
             const btn = document.getElementById('export-pdf-btn');
@@ -229,16 +225,16 @@ try:
         setupPdfBtn();
     """
 
-    if "/* PDF GENERATION LOGIC */" in content:
-        start_idx = content.find("/* PDF GENERATION LOGIC */")
-        end_idx = content.find("</script>", start_idx)
-        if start_idx != -1 and end_idx != -1:
-            content = content[:start_idx] + pdf_logic + content[end_idx:]
-            print("Updated existing PDF logic")
+# Everything from the marker up to the closing script tag
+pdf_target = r"(?s:/\* PDF GENERATION LOGIC \*/.*?(?=</script>))"
 
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(content)
-    print("File updated successfully.")
+PATCHES = [
+    Patch("modify_dashboard: PDF generation logic", pdf_target, pdf_logic, regex=True),
+]
 
-except Exception as e:
-    print(f"Error: {e}")
+if __name__ == "__main__":
+    try:
+        patch_file(file_path, PATCHES)
+        print("Updated existing PDF logic")
+    except Exception as e:
+        print(f"Error: {e}")
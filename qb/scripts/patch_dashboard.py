@@ -0,0 +1,48 @@
+import argparse
+import sys
+
+import add_columns
+import add_debug
+import add_summaries
+import add_user_guide
+import apply_filters
+import fix_init_race
+import fix_summary_init
+import modify_dashboard
+from patch_engine import PatchError, patch_file
+from stage_profile import add_arguments, enable_from_args
+
+# The patch scripts in the order they were first run; later ones target
+# text the earlier ones insert
+PATCH_SCRIPTS = [
+    apply_filters,
+    add_summaries,
+    add_columns,
+    add_user_guide,
+    add_debug,
+    fix_init_race,
+    fix_summary_init,
+    modify_dashboard,
+]
+
+DASHBOARD_PATCHES = [patch for script in PATCH_SCRIPTS for patch in script.PATCHES]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply every dashboard patch script to a page in one read and one write.")
+    parser.add_argument("input", help="HTML page to patch")
+    parser.add_argument("-o", "--output", help="Write the result here instead of patching in place")
+    add_arguments(parser)
+    args = parser.parse_args()
+    enable_from_args(args)
+
+    try:
+        found = patch_file(args.input, DASHBOARD_PATCHES, args.output)
+    except (OSError, PatchError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Applied {len(DASHBOARD_PATCHES)} patches ({sum(found)} edits) to {args.output or args.input}")
+
+
+if __name__ == "__main__":
+    main()
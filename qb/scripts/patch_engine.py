@@ -0,0 +1,82 @@
+import os
+import re
+
+from stage_profile import stage
+
+
+class PatchError(Exception):
+    pass
+
+
+class Patch:
+    """One declarative edit: replace `target` with `replacement`, `count` times.
+
+    `target` is literal text unless `regex=True`. Patches in a list are
+    applied one after another, so `count` is the number of matches left
+    once the earlier patches have run, and a patch may target text that
+    an earlier patch in the same set inserts.
+    """
+
+    def __init__(self, name, target, replacement, count=1, regex=False):
+        if not target:
+            raise ValueError(f"patch {name!r} has an empty target")
+        self.name = name
+        self.target = target
+        self.replacement = replacement
+        self.count = count
+        self.regex = regex
+        self.pattern = re.compile(target) if regex else None
+
+    def __repr__(self):
+        return f"Patch({self.name!r}, count={self.count})"
+
+    def apply(self, text):
+        """(`text` with every match replaced, number of matches)."""
+        if self.regex:
+            return self.pattern.subn(lambda m: self.replacement, text)
+        n = text.count(self.target)
+        return (text.replace(self.target, self.replacement) if n else text), n
+
+
+def apply_patches(text, patches):
+    """Apply the patches to `text` in order; returns (new text, match counts).
+
+    Each patch is a str.replace over the result of the ones before it, all
+    in memory. Raises PatchError, listing every offender, if any patch
+    matched a different number of times than its `count`.
+    """
+    patches = list(patches)
+    found = []
+    with stage("apply patches"):
+        for patch in patches:
+            text, n = patch.apply(text)
+            found.append(n)
+
+    problems = [
+        f"{patch.name}: expected {patch.count} match{'es' if patch.count != 1 else ''}, found {n}"
+        for patch, n in zip(patches, found) if n != patch.count
+    ]
+    if problems:
+        raise PatchError("Patch targets drifted:\n  " + "\n  ".join(problems))
+    return text, found
+
+
+def patch_file(path, patches, output_path=None):
+    """Read `path` once, apply all patches in memory, write the result once.
+
+    Nothing is written if any patch fails its count. The write goes
+    through a temporary file so an interrupted run never leaves a
+    half-patched page.
+    """
+    with stage("read") as s, open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+        s.add(bytes_in=f.tell())
+    out, found = apply_patches(text, patches)
+
+    output_path = output_path or path
+    tmp_path = output_path + ".tmp"
+    with stage("write") as s, open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(out)
+        s.add(bytes_out=f.tell())
+    os.replace(tmp_path, output_path)
+    return found
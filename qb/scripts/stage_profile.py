@@ -0,0 +1,277 @@
+import atexit
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+# Set to 1 (or a JSON path) to profile any of the scripts; the build and
+# patch_dashboard.py also take --profile
+PROFILE_ENV = "QB_PROFILE"
+# Also dump cProfile stats here
+CPROFILE_ENV = "QB_CPROFILE"
+# Per-stage Python heap peaks via tracemalloc; slows allocation-heavy stages
+MEMORY_ENV = "QB_PROFILE_MEMORY"
+
+# Default JSON path, per script, next to the page like gl-rejects.csv
+default_json_path = "../profile-{script}.json"
+
+_profiler = None
+
+
+def rss_mb():
+    """High-water RSS of this process so far."""
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2 ** 20
+
+
+class StageStats:
+    __slots__ = ("name", "calls", "seconds", "bytes_in", "bytes_out", "rss_growth_mb", "heap_peak_mb")
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.seconds = 0.0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.rss_growth_mb = 0.0
+        self.heap_peak_mb = None
+
+    def to_json(self):
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "seconds": round(self.seconds, 6),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "rss_growth_mb": round(self.rss_growth_mb, 1),
+            "heap_peak_mb": None if self.heap_peak_mb is None else round(self.heap_peak_mb, 1),
+        }
+
+
+class Profiler:
+    """Wall time, bytes and peak memory per named stage.
+
+    Stages nest, and a stage's time excludes the stages opened inside it,
+    so the stages of a streamed build (reading, encoding, escaping and
+    writing, interleaved piece by piece) each get their own share and the
+    times add up to the run. Entering a stage again adds to its totals.
+
+    Memory is charged the same way: a stage's RSS growth is how much the
+    process's high-water mark rose while it was running, so the stages
+    that set the peak stand out. With `trace_memory`, each stage also gets
+    the Python heap peak while it was open, nested stages included.
+    """
+
+    def __init__(self, json_path=None, cprofile_path=None, trace_memory=False):
+        self.json_path = json_path
+        self.cprofile_path = cprofile_path
+        self.trace_memory = trace_memory
+        self.stats = {}
+        # Open stages: [stats, time and RSS high-water when it last started running, heap peak so far]
+        self.stack = []
+        self.cprofile = None
+        if trace_memory:
+            import tracemalloc
+            self.tracemalloc = tracemalloc
+            tracemalloc.start()
+        if cprofile_path:
+            import cProfile
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        self.started = time.perf_counter()
+
+    def enter(self, name):
+        now = time.perf_counter()
+        rss = rss_mb()
+        if self.stack:
+            parent = self.stack[-1]
+            parent[0].seconds += now - parent[1]
+            parent[0].rss_growth_mb += rss - parent[2]
+            if self.trace_memory:
+                parent[3] = max(parent[3], self.tracemalloc.get_traced_memory()[1])
+        if self.trace_memory:
+            self.tracemalloc.reset_peak()
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = StageStats(name)
+        stats.calls += 1
+        self.stack.append([stats, now, rss, 0])
+
+    def exit(self):
+        now = time.perf_counter()
+        rss = rss_mb()
+        stats, since, rss_since, peak = self.stack.pop()
+        stats.seconds += now - since
+        stats.rss_growth_mb += rss - rss_since
+        if self.trace_memory:
+            peak = max(peak, self.tracemalloc.get_traced_memory()[1])
+            stats.heap_peak_mb = max(stats.heap_peak_mb or 0, peak / 2 ** 20)
+            if self.stack:
+                # The parent's peak includes this stage's
+                self.stack[-1][3] = max(self.stack[-1][3], peak)
+        if self.stack:
+            self.stack[-1][1] = now
+            self.stack[-1][2] = rss
+
+    def add(self, bytes_in=0, bytes_out=0):
+        if self.stack:
+            stats = self.stack[-1][0]
+            stats.bytes_in += bytes_in
+            stats.bytes_out += bytes_out
+
+    def to_json(self):
+        return {
+            "script": os.path.basename(sys.argv[0]),
+            "argv": sys.argv[1:],
+            "total_s": round(time.perf_counter() - self.started, 6),
+            "peak_rss_mb": round(rss_mb(), 1),
+            "trace_memory": self.trace_memory,
+            "stages": [s.to_json() for s in self.stats.values()],
+        }
+
+    def report(self):
+        """Stop profiling, print the stage table and write the JSON and cProfile files."""
+        if self.cprofile:
+            self.cprofile.disable()
+        result = self.to_json()
+        total = result["total_s"]
+        other = total - sum(s["seconds"] for s in result["stages"])
+        print(f"\nProfile of {result['script']} ({total:.3f}s, peak RSS {result['peak_rss_mb']:.1f} MB):")
+        print(f"  {'stage':<20} {'calls':>7} {'seconds':>9} {'share':>6} {'bytes in':>14} {'bytes out':>14} "
+              f"{'RSS +MB':>8}" + (f" {'heap peak MB':>12}" if self.trace_memory else ""))
+        for s in result["stages"]:
+            share = s["seconds"] / total if total else 0
+            heap = f" {s['heap_peak_mb']:>12.1f}" if s["heap_peak_mb"] is not None else ""
+            print(f"  {s['name']:<20} {s['calls']:>7,} {s['seconds']:>9.3f} {share:>6.1%} "
+                  f"{s['bytes_in']:>14,} {s['bytes_out']:>14,} {s['rss_growth_mb']:>8.1f}{heap}")
+        print(f"  {'(outside stages)':<20} {'':>7} {other:>9.3f} {other / total if total else 0:>6.1%}")
+        if self.json_path:
+            with open(self.json_path, "w", encoding="utf-8") as f:
+                json.dump(result, f, indent=1)
+            print(f"Wrote the profile to {self.json_path}")
+        if self.cprofile:
+            self.cprofile.dump_stats(self.cprofile_path)
+            print(f"Wrote cProfile stats to {self.cprofile_path}")
+
+
+class _Stage:
+    __slots__ = ("profiler", "name")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler.enter(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.exit()
+        return False
+
+    def add(self, bytes_in=0, bytes_out=0):
+        self.profiler.add(bytes_in, bytes_out)
+
+
+class _NoStage:
+    """What `stage` returns while profiling is off: does nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, bytes_in=0, bytes_out=0):
+        pass
+
+
+_NO_STAGE = _NoStage()
+
+
+def enabled():
+    return _profiler is not None
+
+
+def stage(name):
+    """Context manager timing a stage; `.add(bytes_in=, bytes_out=)` counts its I/O."""
+    return _Stage(_profiler, name) if _profiler else _NO_STAGE
+
+
+def iter_stage(name, iterable, count_out=False):
+    """`iterable`, with the time spent producing each item charged to `name`.
+
+    With `count_out`, the size of each item (bytes, or UTF-8 bytes of str)
+    is added to the stage's bytes out. Returns `iterable` itself while
+    profiling is off.
+    """
+    if _profiler is None:
+        return iterable
+    return _iter_stage(_profiler, name, iter(iterable), count_out)
+
+
+def _iter_stage(profiler, name, it, count_out):
+    while True:
+        profiler.enter(name)
+        try:
+            item = next(it)
+        except StopIteration:
+            return
+        finally:
+            profiler.exit()
+        if count_out:
+            stats = profiler.stats[name]
+            stats.bytes_out += len(item.encode("utf-8")) if isinstance(item, str) else len(item)
+        yield item
+
+
+def count(name, bytes_in=0, bytes_out=0):
+    """Add to a stage's byte counts from outside it (e.g. a file's size once it is read)."""
+    if _profiler:
+        stats = _profiler.stats.get(name)
+        if stats is None:
+            stats = _profiler.stats[name] = StageStats(name)
+        stats.bytes_in += bytes_in
+        stats.bytes_out += bytes_out
+
+
+def enable(json_path=None, cprofile_path=None, trace_memory=False):
+    """Start profiling this process; the report is printed when it exits.
+
+    `json_path` "1" (as in QB_PROFILE=1) means the default path for this script.
+    """
+    global _profiler
+    if _profiler:
+        return _profiler
+    if json_path == "1":
+        script = os.path.splitext(os.path.basename(sys.argv[0]))[0] or "python"
+        json_path = default_json_path.format(script=script)
+    _profiler = Profiler(json_path, cprofile_path, trace_memory)
+    atexit.register(_profiler.report)
+    return _profiler
+
+
+def add_arguments(parser):
+    """--profile/--cprofile/--profile-memory options for a script's CLI."""
+    parser.add_argument("--profile", nargs="?", const="1", metavar="JSON",
+                        help="print time, bytes and memory per stage and write them as JSON "
+                             f"(default {default_json_path}); same as {PROFILE_ENV}=1")
+    parser.add_argument("--cprofile", metavar="PROF", help="also dump cProfile stats to PROF")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="record per-stage Python heap peaks with tracemalloc (slower)")
+
+
+def enable_from_args(args):
+    if args.profile or args.cprofile or args.profile_memory:
+        enable(args.profile or "1", args.cprofile, args.profile_memory)
+
+
+# Pool workers inherit the environment; only the main process reports
+if (os.environ.get(PROFILE_ENV) or os.environ.get(CPROFILE_ENV)) and multiprocessing.parent_process() is None:
+    enable(os.environ.get(PROFILE_ENV) or "1", os.environ.get(CPROFILE_ENV),
+           os.environ.get(MEMORY_ENV, "") not in ("", "0"))
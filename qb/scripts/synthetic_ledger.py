@@ -0,0 +1,97 @@
+import argparse
+import csv
+import datetime
+import random
+
+# Same header as the QB GL export the dashboard is built from
+FIELDS = [
+    "Date", "Transaction Type", "Num", "Name", "Class", "Memo/Description",
+    "Account", "Category", "Master_Vertical", "Vendor", "Amount",
+]
+
+# Category -> Master_Vertical, using the categories the dashboard maps
+CATEGORIES = {
+    "Digital Distro Income": "Income",
+    "D2C Physical Income": "Income",
+    "Physical Distro Income": "Income",
+    "Sync Income": "Income",
+    "PRO Income": "Income",
+    "Other Income": "Income",
+    "Income Distro OpEx": "Income",
+    "Income Returns": "Income",
+    "Project COGS": "COGS",
+    "Freight COGS": "COGS",
+    "Royalties": "Royalties",
+    "Expenses": "OpEx",
+    "Insurance": "OpEx",
+    "Compensation": "OpEx",
+    "Banking": "Balance Sheet",
+    "Transfers": "Balance Sheet",
+    "Asset": "Balance Sheet",
+    "Funding": "Balance Sheet",
+    "Retained Earnings": "Balance Sheet",
+}
+
+TRANSACTION_TYPES = ["Bill", "Check", "Deposit", "Expense", "Invoice", "Journal Entry", "Payment", "Transfer", "Credit Card Expense"]
+MEMO_WORDS = ["royalty", "advance", "pressing", "freight", "mastering", "tour", "sync", "license", "Q1", "Q2", "Q3", "Q4",
+              "reimbursement", "vinyl", "CD", "marketing", "PR", "video", "distribution", "fee", "statement", "adj"]
+
+
+def generate_rows(n, seed=0, n_classes=150, n_accounts=300, n_names=5000, years=10):
+    """Yield `n` synthetic GL rows (lists in FIELDS order).
+
+    Cardinalities default to roughly what our real ledgers have: a few
+    hundred accounts, ~150 classes (releases/projects) and thousands of
+    payees. Amounts are skewed so most lines are small.
+    """
+    rng = random.Random(seed)
+    categories = list(CATEGORIES)
+    accounts = [(f"{4000 + i} {rng.choice(MEMO_WORDS).title()} {i}", rng.choice(categories)) for i in range(n_accounts)]
+    classes = [f"Release {i:03d}" if i % 5 else f"Artist {i:03d}:Tour" for i in range(n_classes)]
+    names = [f"Payee {i:05d}" for i in range(n_names)]
+    vendors = [f"Vendor {i:04d}" for i in range(max(1, n_names // 10))]
+    end = datetime.date(2025, 12, 31)
+    span = years * 365
+
+    for i in range(n):
+        account, category = accounts[int(rng.paretovariate(1.2)) % n_accounts]
+        d = end - datetime.timedelta(days=int(span * rng.random() ** 0.7))
+        amount = rng.lognormvariate(5, 1.6)
+        if CATEGORIES[category] != "Income" or category in ("Income Distro OpEx", "Income Returns"):
+            amount = -amount if rng.random() < 0.8 else amount
+        memo = " ".join(rng.choice(MEMO_WORDS) for _ in range(rng.randint(1, 5)))
+        yield [
+            d.strftime("%m/%d/%Y"),
+            rng.choice(TRANSACTION_TYPES),
+            str(10000 + i),
+            names[int(rng.paretovariate(1.1)) % n_names],
+            classes[rng.randrange(n_classes)] if rng.random() < 0.9 else "",
+            f"{memo} #{rng.randrange(100000)}",
+            account,
+            category,
+            CATEGORIES[category],
+            vendors[rng.randrange(len(vendors))] if rng.random() < 0.6 else "",
+            f"{amount:,.2f}",
+        ]
+
+
+def write_csv(f, n, seed=0, **kwargs):
+    writer = csv.writer(f)
+    writer.writerow(FIELDS)
+    writer.writerows(generate_rows(n, seed, **kwargs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic QB GL export for testing and benchmarks.")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("output")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with open(args.output, "w", encoding="utf-8", newline="") as f:
+        write_csv(f, args.rows, args.seed)
+    print(f"Wrote {args.rows:,} synthetic GL rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+import argparse
+import datetime
+import gzip
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import build_dashboard
+from build_manifest import BuildManifest
+from marker_split import find_region, iter_slices, mapped
+
+# Served content types worth compressing; anything else is sent as is
+GZIP_TYPES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+GZIP_MIN_BYTES = 1024
+GZIP_CACHE_ENTRIES = 16
+# Fast level: on a dev machine compression time matters more than size
+GZIP_LEVEL = 1
+
+
+def log(message):
+    print(f"[{datetime.datetime.now():%H:%M:%S}] {message}", flush=True)
+
+
+class GzipCache:
+    """Compressed bodies of recently served files, keyed by path and ETag.
+
+    Compressing a large page takes longer than sending it over loopback, so
+    it happens on a background thread; until it is done the file is served
+    uncompressed.
+    """
+
+    def __init__(self, entries=GZIP_CACHE_ENTRIES):
+        self.entries = entries
+        self._items = OrderedDict()
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def get(self, path, etag):
+        """The gzip body for this version of `path`, or None while it is being made."""
+        with self._lock:
+            hit = self._items.get(path)
+            if hit and hit[0] == etag:
+                self._items.move_to_end(path)
+                return hit[1]
+            if (path, etag) in self._pending:
+                return None
+            self._pending.add((path, etag))
+        threading.Thread(target=self._compress, args=(path, etag), daemon=True).start()
+        return None
+
+    def _compress(self, path, etag):
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+                st = os.fstat(f.fileno())
+            # A rebuild may have replaced the file since it was stat'ed
+            if gzip_etag(st) == etag:
+                body = gzip.compress(data, compresslevel=GZIP_LEVEL)
+                with self._lock:
+                    self._items[path] = (etag, body)
+                    self._items.move_to_end(path)
+                    while len(self._items) > self.entries:
+                        self._items.popitem(last=False)
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                self._pending.discard((path, etag))
+
+
+def file_etag(st):
+    return '"%x-%x"' % (st.st_mtime_ns, st.st_size)
+
+
+def gzip_etag(st):
+    return '"%x-%x-gz"' % (st.st_mtime_ns, st.st_size)
+
+
+class DevRequestHandler(SimpleHTTPRequestHandler):
+    """Static files with ETag revalidation and gzip, for the dashboard's own origin.
+
+    Pages are sent with `Cache-Control: no-cache`, so the browser always
+    revalidates and an unchanged page costs a 304 rather than a download.
+    """
+
+    gzip_cache = GzipCache()
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            index = os.path.join(path, "index.html")
+            if not self.path.split("?", 1)[0].endswith("/") or not os.path.exists(index):
+                # Directory redirect or listing
+                return super().send_head()
+            path = index
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.send_error(404, "File not found")
+            return None
+
+        ctype = self.guess_type(path)
+        compressible = ctype.startswith(GZIP_TYPES)
+        wants_gzip = (compressible and st.st_size >= GZIP_MIN_BYTES
+                      and "gzip" in self.headers.get("Accept-Encoding", ""))
+
+        # Either variant of the current version is good for a 304
+        if {file_etag(st), gzip_etag(st)} & {t.strip() for t in self.headers.get("If-None-Match", "").split(",")}:
+            self.send_response(304)
+            self.send_header("ETag", gzip_etag(st) if wants_gzip else file_etag(st))
+            self.end_headers()
+            return None
+
+        body = self.gzip_cache.get(path, gzip_etag(st)) if wants_gzip else None
+        use_gzip = body is not None
+        etag = gzip_etag(st) if use_gzip else file_etag(st)
+        f = None if use_gzip else open(path, "rb")
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body) if use_gzip else st.st_size))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", self.date_time_string(st.st_mtime))
+        self.send_header("Cache-Control", "no-cache")
+        if compressible:
+            self.send_header("Vary", "Accept-Encoding")
+        if use_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        if use_gzip:
+            return BytesIO(body)
+        return f
+
+
+def splice_template():
+    """Rebuild the page from the template around the payload already in it.
+
+    The payload only depends on the CSV and the build scripts, so a
+    template edit needs no re-encoding: the new head and tail are written
+    around the existing data block, copied from a memory map. The result
+    is what a full build would write, so the manifest records it as one.
+    """
+    with open(build_dashboard.template_path, "r", encoding="utf-8") as f:
+        head, tail = build_dashboard.split_template(f.read())
+    if not head.endswith(build_dashboard.DATA_OPEN):
+        raise ValueError(f"{build_dashboard.PLACEHOLDER} is not directly inside the data script block")
+
+    output = build_dashboard.output_path
+    tmp_path = output + ".tmp"
+    with mapped(output) as buf:
+        start, end = find_region(buf, build_dashboard.DATA_OPEN.encode("utf-8"),
+                                 build_dashboard.DATA_CLOSE.encode("utf-8"))
+        with open(tmp_path, "wb") as out:
+            out.write(head.encode("utf-8"))
+            for chunk in iter_slices(buf, start, end):
+                out.write(chunk)
+            out.write(tail.encode("utf-8"))
+    os.replace(tmp_path, output)
+
+    manifest = BuildManifest()
+    inputs = [build_dashboard.csv_path, build_dashboard.template_path] + build_dashboard.build_sources
+    manifest.record(output, inputs)
+    manifest.save()
+
+
+def run_script(args):
+    """Run a sibling script in a fresh interpreter (so edits to it take effect).
+
+    Its output is echoed indented; returns False if it reported an error.
+    """
+    proc = subprocess.run([sys.executable] + args, capture_output=True, text=True)
+    lines = (proc.stdout + proc.stderr).splitlines()
+    for line in lines:
+        print("    " + line)
+    return proc.returncode == 0 and not any(line.startswith("Error:") for line in lines)
+
+
+class Watcher:
+    """Polls the dashboard's inputs and rebuilds the page when they change."""
+
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self.full_inputs = [build_dashboard.csv_path] + build_dashboard.build_sources
+        self.template_inputs = [build_dashboard.template_path]
+        self.state = self.snapshot()
+
+    def snapshot(self):
+        state = {}
+        for path in self.full_inputs + self.template_inputs:
+            try:
+                st = os.stat(path)
+                state[path] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                state[path] = None
+        return state
+
+    def changes(self):
+        """Paths changed since the last call, once they have stopped changing."""
+        current = self.snapshot()
+        if current == self.state:
+            return []
+        # Editors often write in several steps; wait for the files to settle
+        while True:
+            time.sleep(self.interval / 4)
+            settled = self.snapshot()
+            if settled == current:
+                break
+            current = settled
+        changed = [p for p in current if current[p] != self.state.get(p)]
+        self.state = current
+        return changed
+
+    def rebuild(self, changed):
+        start = time.perf_counter()
+        # On startup the build's own manifest check decides whether anything is stale
+        full = not changed or not os.path.exists(build_dashboard.output_path) \
+            or any(p in self.full_inputs for p in changed)
+        if full:
+            ok = run_script(["build_dashboard.py", "--stream"])
+            what = "full build"
+        else:
+            try:
+                splice_template()
+                ok = True
+            except (OSError, ValueError) as e:
+                print(f"    Error: {e}")
+                ok = False
+            what = "template splice"
+        elapsed = (time.perf_counter() - start) * 1000
+        if ok:
+            # Start compressing now rather than on the browser's first request
+            st = os.stat(build_dashboard.output_path)
+            DevRequestHandler.gzip_cache.get(build_dashboard.output_path, gzip_etag(st))
+        reason = ", ".join(changed) if changed else "startup"
+        log(f"{reason}: {what} {'done' if ok else 'FAILED'} in {elapsed:.0f} ms")
+
+    def run(self):
+        self.rebuild([])
+        while True:
+            changed = self.changes()
+            if changed:
+                self.rebuild(changed)
+            time.sleep(self.interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the dashboard when its inputs change and serve it locally.")
+    parser.add_argument("--host", default="localhost", help="address to serve on")
+    parser.add_argument("--port", type=int, default=8000, help="port to serve on")
+    parser.add_argument("--interval", type=float, default=0.2, help="seconds between checks for changes")
+    parser.add_argument("--no-serve", action="store_true", help="only watch and rebuild")
+    args = parser.parse_args()
+
+    page_dir = os.path.dirname(os.path.abspath(build_dashboard.output_path))
+    if not args.no_serve:
+        handler = lambda *a, **kw: DevRequestHandler(*a, directory=page_dir, **kw)
+        server = ThreadingHTTPServer((args.host, args.port), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        page = os.path.basename(build_dashboard.output_path)
+        log(f"Serving {page_dir} at http://{args.host}:{args.port}/{page}")
+
+    watcher = Watcher(args.interval)
+    log(f"Watching {len(watcher.state)} files; Ctrl+C to stop")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+from exec_report import render_report, summarize  # noqa: E402
+
+
+def test_label_markup_is_printed_as_text(tmp_path, monkeypatch):
+    rl_config = pytest.importorskip("reportlab.rl_config")
+    monkeypatch.setattr(rl_config, "pageCompression", 0)
+    strings = ["", "R&D <Dept> <b>", "4000 Sales", "Income", "Invoice"]
+    cells = {(1, 2, 3, 4, 24000): (2, True, 12345, 12345, 19000, 19010)}
+    summary = summarize(cells, strings, lambda key: True)
+
+    path = render_report(str(tmp_path / "report.pdf"), "Class: R&D <Dept> <b>", summary, generated="01/01/2024")
+
+    with open(path, "rb") as f:
+        pdf = f.read()
+    assert b"Class: R&D <Dept> <b>" in pdf
@@ -0,0 +1,40 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+from gl_payload import parse_amount_cents, parse_date_days  # noqa: E402
+
+
+@pytest.mark.parametrize("text, cents", [
+    ("-1234.5", -123450),
+    ("$1,234.50", 123450),
+    ("(1,234.50)", -123450),
+    ("+5", 500),
+    (".5", 50),
+    ("1e3", 100000),
+    ("2.345", 235),
+    ("-2.345", -235),
+    ("", None),
+    ("NaN", None),
+    ("Infinity", None),
+    ("0x10", None),
+    ("1_000", None),
+    ("(-5)", None),
+    ("(+5)", None),
+    ("1e999999999", None),
+])
+def test_parse_amount_cents(text, cents):
+    assert parse_amount_cents(text) == cents
+
+
+@pytest.mark.parametrize("text, valid", [
+    ("2024-01-05", True),
+    ("1/5/24", True),
+    ("2024-01-05junk", False),
+    ("2024-02-30", False),
+])
+def test_parse_date_days(text, valid):
+    assert (parse_date_days(text) is not None) == valid
@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+from patch_engine import Patch, PatchError, apply_patches, patch_file  # noqa: E402
+
+
+def test_target_spanning_an_earlier_replacement():
+    text, found = apply_patches("xfoo", [Patch("a", "foo", "bar"), Patch("b", "xfoo", "?", count=0)])
+    assert (text, found) == ("xbar", [1, 0])
+
+
+def test_target_made_of_two_earlier_replacements():
+    patches = [Patch("a", "abc", "x", count=2), Patch("b", "xx", "y")]
+    assert apply_patches("abcabc", patches) == ("y", [2, 1])
+
+
+def test_target_straddling_replacements_and_original_text():
+    patches = [Patch("a", "foo", "f", count=2), Patch("b", "f f", "z")]
+    assert apply_patches("foo foo", patches) == ("z", [2, 1])
+
+
+def test_regex_patch_replacement_is_literal():
+    patches = [Patch("a", r"(?s)<b>.*?</b>", r"\1<i/>", regex=True)]
+    assert apply_patches("<b>\n</b>", patches) == (r"\1<i/>", [1])
+
+
+def test_every_count_mismatch_is_listed():
+    patches = [Patch("A", "foo", "f", count=2), Patch("B", "bar", "b")]
+    with pytest.raises(PatchError) as e:
+        apply_patches("foo", patches)
+    assert "A: expected 2 matches, found 1" in str(e.value)
+    assert "B: expected 1 match, found 0" in str(e.value)
+
+
+def test_patch_file_leaves_page_untouched_on_mismatch(tmp_path):
+    page = tmp_path / "page.html"
+    page.write_text("<p>foo</p>", encoding="utf-8")
+    with pytest.raises(PatchError):
+        patch_file(str(page), [Patch("a", "bar", "baz")])
+    assert page.read_text(encoding="utf-8") == "<p>foo</p>"
+
+    assert patch_file(str(page), [Patch("a", "foo", "bar")]) == [1]
+    assert page.read_text(encoding="utf-8") == "<p>bar</p>"
@@ -218,27 +218,35 @@ document.addEventListener('DOMContentLoaded', function () {
     }, true);
 
     // --- Monte Carlo ---
+    // Fixed seed: redrawing the curve or moving the slider reuses the same draws
+    const SIM_SEED = 1;
+    // Paths come in pairs: the second takes the first's shocks negated
+    const ANTITHETIC = true;
+
     function runMonteCarlo() {
         const sims = 1000;
         const confidence = parseInt(document.getElementById('confidenceSlider').value) || 80;
         const sigma = (100 - confidence) / 100 / Math.sqrt(52);
         const sigmaSq_half = 0.5 * sigma * sigma; // Drift correction
         const base = chart.data.datasets[0].data;
-        const paths = [];
+        const p5 = Array.from({ length: 53 }, () => createP2Quantile(0.05));
+        const p95 = Array.from({ length: 53 }, () => createP2Quantile(0.95));
         for (let s = 0; s < sims; s++) {
-            const p = new Array(53); let m = 1.0;
+            // Path s draws from its own stream; antithetic pairs share one
+            const random = createRandomStream(SIM_SEED, ANTITHETIC ? Math.floor(s / 2) : s);
+            const sign = ANTITHETIC && s % 2 === 1 ? -1 : 1;
+            let m = 1.0;
             for (let w = 0; w < 53; w++) {
-                let u = 0, v = 0; while (u === 0) u = Math.random(); while (v === 0) v = Math.random();
-                const Z = Math.sqrt(-2 * Math.log(u)) * Math.cos(2 * Math.PI * v);
+                let u = 0, v = 0; while (u === 0) u = random(); while (v === 0) v = random();
+                const Z = sign * Math.sqrt(-2 * Math.log(u)) * Math.cos(2 * Math.PI * v);
                 m *= Math.exp(sigma * Z - sigmaSq_half);
-                p[w] = Math.max(0, Math.round(base[w] * m));
+                const x = Math.max(0, Math.round(base[w] * m));
+                p5[w].add(x); p95[w].add(x);
             }
-            paths.push(p);
         }
         for (let w = 0; w < 53; w++) {
-            const vals = paths.map(p => p[w]).sort((a, b) => a - b);
-            p5Points[w] = vals[Math.floor(sims * 0.05)];
-            p95Points[w] = vals[Math.floor(sims * 0.95)];
+            p5Points[w] = Math.round(p5[w].value());
+            p95Points[w] = Math.round(p95[w].value());
         }
         confidenceChart.data.datasets[0].data = [...p95Points];
         confidenceChart.data.datasets[1].data = [...base];